@@ -1,56 +1,23 @@
 import pandas as pd
 import os
+import sys
 from typing import Dict, List
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'web_app'))
+from money import from_cents, progressive_cents, to_cents  # noqa: E402
+from payroll_history import resolve_period  # noqa: E402
+from salary_rules import apply_rules, load_rules  # noqa: E402
+
 class OnlyBeautySalaryCalculator:
     def __init__(self):
-        # 團體業績獎金等級表
-        self.performance_bonus_levels = [
-            (1800000, 2500000, 0.005),
-            (2500001, 4000000, 0.01),
-            (4000001, 6000000, 0.025),
-            (6000001, 8000000, 0.045)
-        ]
-        
-        # 團體消耗獎金等級表
-        self.consumption_bonus_levels = [
-            (0, 1500000, 0.006),
-            (1500001, 2500000, 0.01),
-            (2500001, float('inf'), 0.015)
-        ]
-        
-        # 個人業績獎金等級表
-        self.manager_performance_levels = [
-            (0, 1000000, 0.008),
-            (1000001, 1600000, 0.01),
-            (1600001, 2100000, 0.016),
-            (2100001, float('inf'), 0.021)
-        ]
-        
-        self.consultant_performance_levels = [
-            (0, 600000, 0.004),
-            (600001, 1200000, 0.007),
-            (1200001, 1700000, 0.008),
-            (1700001, float('inf'), 0.012)
-        ]
-        
-        # 個人消耗獎金等級表
-        self.manager_consumption_levels = [
-            (0, 500000, 0.012),
-            (500001, 1000000, 0.015),
-            (1000001, float('inf'), 0.024)
-        ]
-        
-        self.consultant_consumption_levels = [
-            (0, 300000, 0.006),
-            (300001, 600000, 0.008),
-            (600001, float('inf'), 0.012)
-        ]
+        # 級距表、分配比例與門檻由 web_app/salary_rules.json 載入 (載入檔案後再依期間套用對應版本)
+        apply_rules(self, load_rules().for_period())
         
         self.excel_data = None
         self.consultant_count = 0
         self.staff_count = 0
         self.manager_name = None  # 店長名稱
+        self.sheet_name = None  # 實際使用的工作表名稱
         
     def load_excel(self, file_path: str) -> bool:
         """載入Excel檔案並找出數字最大的工作表"""
@@ -102,6 +69,7 @@ class OnlyBeautySalaryCalculator:
             # 找出最大的數字工作表
             max_sheet = str(max(numeric_sheets))
             print(f"使用工作表: {max_sheet}")
+            self.sheet_name = max_sheet
             
             # 讀取該工作表
             self.excel_data = pd.read_excel(expanded_path, sheet_name=max_sheet, header=None)
@@ -193,9 +161,9 @@ class OnlyBeautySalaryCalculator:
         print(f"總業績 (E5): {total_performance:,.0f}")
         print(f"總消耗 (E7): {total_consumption:,.0f}")
         # 業績獎金累進制
-        consultant_performance_pool = self.calc_progressive_bonus(total_performance, self.performance_bonus_levels) * 0.7
+        consultant_performance_pool = self.calc_progressive_bonus(total_performance, self.performance_bonus_levels) * self.rules.consultant_performance_share
         # 消耗獎金累進制
-        consultant_consumption_pool = self.calc_progressive_bonus(total_consumption, self.consumption_bonus_levels) * 0.4
+        consultant_consumption_pool = self.calc_progressive_bonus(total_consumption, self.consumption_bonus_levels) * self.rules.consultant_consumption_share
         print(f"顧問團體業績獎金池(累進): {consultant_performance_pool:,.0f}")
         print(f"顧問團體消耗獎金池(累進): {consultant_consumption_pool:,.0f}")
         total_consultant_performance = sum(c['performance'] for c in consultants)
@@ -207,8 +175,8 @@ class OnlyBeautySalaryCalculator:
                 product_qualified = product_bonuses[consultant['name']]['qualified']
             
             # 達標才分配
-            perf_ok = consultant['performance'] >= 1680000
-            cons_ok = consultant['performance'] >= 1200000
+            perf_ok = consultant['performance'] >= self.rules.performance_bonus_gate
+            cons_ok = consultant['performance'] >= self.rules.consumption_bonus_gate
             
             # 如果產品未達標，清零所有獎金
             if not product_qualified:
@@ -246,9 +214,9 @@ class OnlyBeautySalaryCalculator:
         total_performance = self.excel_data.iloc[4, 4] if not pd.isna(self.excel_data.iloc[4, 4]) else 0  # E5
         total_consumption = self.excel_data.iloc[6, 4] if not pd.isna(self.excel_data.iloc[6, 4]) else 0  # E7
         # 業績獎金累進制
-        staff_performance_pool = self.calc_progressive_bonus(total_performance, self.performance_bonus_levels) * 0.3
+        staff_performance_pool = self.calc_progressive_bonus(total_performance, self.performance_bonus_levels) * self.rules.staff_performance_share
         # 消耗獎金累進制
-        staff_consumption_pool = self.calc_progressive_bonus(total_consumption, self.consumption_bonus_levels) * 0.6
+        staff_consumption_pool = self.calc_progressive_bonus(total_consumption, self.consumption_bonus_levels) * self.rules.staff_consumption_share
         performance_bonus_per_person = staff_performance_pool / self.staff_count
         consumption_bonus_per_person = staff_consumption_pool / self.staff_count
         return {
@@ -363,20 +331,16 @@ class OnlyBeautySalaryCalculator:
             print(f"每人總獎金: {staff_bonuses['total_bonus_per_person']:,.0f}")
     
     def calc_progressive_bonus(self, amount: float, levels: List[tuple], show_detail: bool = True) -> float:
-        """累進制計算獎金，levels=[(min,max,rate), ...]"""
-        total = 0
+        """累進制計算獎金，levels=[(min,max,rate), ...]（以分計算後四捨五入）"""
         for min_val, max_val, rate in levels:
             if amount > min_val:
                 # 計算這個區間的獎金
-                upper_bound = min(amount, max_val)
-                taxable_amount = upper_bound - min_val
-                bonus_for_this_level = taxable_amount * rate
-                total += bonus_for_this_level
+                taxable_amount = min(amount, max_val) - min_val
                 if show_detail:
-                    print(f"  階段 ({min_val:,}-{max_val:,}): {taxable_amount:,.0f} × {rate:.3f} = {bonus_for_this_level:,.2f}")
+                    print(f"  階段 ({min_val:,}-{max_val:,}): {taxable_amount:,.0f} × {rate:.3f} = {taxable_amount * rate:,.2f}")
             if amount <= max_val:
                 break
-        return total
+        return from_cents(progressive_cents(to_cents(amount), levels, self.rules.rounding_for()))
     
     def get_product_sales_statistics(self, file_path: str) -> Dict:
         """統計所有顧問的產品銷售組數"""
@@ -437,14 +401,14 @@ class OnlyBeautySalaryCalculator:
         
         for consultant, sales_count in product_sales.items():
             # 達到30組以上就有2000元獎金
-            bonus = 2000 if sales_count >= 30 else 0
+            bonus = self.rules.product_target_bonus if sales_count >= self.rules.product_target_sets else 0
             product_bonuses[consultant] = {
                 'sales_count': sales_count,
                 'bonus': bonus,
-                'qualified': sales_count >= 30
+                'qualified': sales_count >= self.rules.product_target_sets
             }
             
-            status = "✓ 達標" if sales_count >= 30 else "✗ 未達標"
+            status = "✓ 達標" if sales_count >= self.rules.product_target_sets else "✗ 未達標"
             print(f"{consultant}: {sales_count} 組 → {bonus:,}元 {status}")
         
         return product_bonuses
@@ -476,6 +440,9 @@ class OnlyBeautySalaryCalculator:
                     break
                 print("請重新輸入正確的檔案路徑\n")
             
+            # 依工作表的計算期間套用當時的薪資規則,重算歷史月份時不會套用今天的版本
+            apply_rules(self, load_rules().for_period(resolve_period(None, self.sheet_name)))
+            
             # 步驟2: 輸入美容師/護士人數
             while True:
                 try:
@@ -32,9 +32,8 @@ def main():
     
     # 導入並執行主程式
     try:
-        from salary_calculator import OnlyBeautySalaryCalculator
-        calculator = OnlyBeautySalaryCalculator()
-        calculator.run()
+        from salary_calculator import main as run_calculator
+        run_calculator([])
     except Exception as e:
         print(f"❌ 程式執行錯誤: {e}")
         print("請檢查程式檔案是否完整")
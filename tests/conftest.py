@@ -0,0 +1,64 @@
+import os
+import sys
+
+import openpyxl
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "web_app"))
+
+CONSULTANTS = ["王小美", "李大華", "陳怡君"]
+
+
+def build_workbook(path, days=3, product_rows=None, extra_sheets=()):
+    """建立與門市日報相同版面的測試活頁簿
+
+    每個數字工作表:E5/E7 為當月累計業績/消耗,A9 起為顧問,K/N/Q 欄為員工,
+    第17列起為交易明細 (D=VIP 標記, E=項目, F=類別, O=顧問代號)。
+    product_rows 預設每張表每位顧問各 3 組「購產品」與 1 筆 VIP 療程。
+    """
+    wb = openpyxl.Workbook()
+    wb.remove(wb.active)
+    for day in range(1, days + 1):
+        ws = wb.create_sheet(str(day))
+        ws["E5"] = 1500000 * day
+        ws["E7"] = 700000 * day
+        for i, name in enumerate(CONSULTANTS + ["公司"]):
+            ws.cell(row=9 + i, column=1, value=name)
+            ws.cell(row=9 + i, column=3, value=(600000 - i * 100000) * day)
+            ws.cell(row=9 + i, column=7, value=(300000 - i * 50000) * day)
+        ws["K9"] = "美容甲"
+        ws["M9"] = 3000
+        ws["N9"] = "美容乙"
+        ws["O9"] = 32000
+        ws["P9"] = 1000
+        ws["Q9"] = "護理丙"
+        ws["S9"] = 500
+        ws["Q12"] = "櫃檯丁"
+        rows = product_rows if product_rows is not None else [
+            ("一般", "保養品", "購產品", code) for code in CONSULTANTS for _ in range(3)
+        ] + [("VIP", "玻尿酸", "購療程", CONSULTANTS[0])]
+        for offset, (vip, item, category, code) in enumerate(rows):
+            r = 17 + offset
+            ws.cell(row=r, column=4, value=vip)
+            ws.cell(row=r, column=5, value=item)
+            ws.cell(row=r, column=6, value=category)
+            ws.cell(row=r, column=7, value=1000)
+            ws.cell(row=r, column=15, value=code)
+    for title in extra_sheets:
+        wb.create_sheet(title)["A1"] = "說明"
+    wb.save(path)
+    return path
+
+
+@pytest.fixture
+def workbook_path(tmp_path):
+    return build_workbook(str(tmp_path / "store.xlsx"))
+
+
+@pytest.fixture(autouse=True)
+def history_db(tmp_path, monkeypatch):
+    """每個測試使用獨立的薪資歷史資料庫,不寫入 web_app/payroll_history.db"""
+    path = str(tmp_path / "history.db")
+    monkeypatch.setenv("SALARY_HISTORY_DB", path)
+    return path
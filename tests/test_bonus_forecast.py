@@ -0,0 +1,86 @@
+import time
+
+import numpy as np
+import pytest
+
+import streamlit_app
+from bonus_forecast import (
+    forecast_bonuses,
+    full_amount_bonus,
+    next_tier_floor,
+    progressive_bonus,
+    project_product_qualified,
+    read_daily_snapshots,
+)
+from conftest import CONSULTANTS, build_workbook
+
+
+@pytest.fixture
+def calculator():
+    return streamlit_app.OnlyBeautySalaryCalculator()
+
+
+@pytest.mark.parametrize("levels", ["performance_bonus_levels", "consumption_bonus_levels",
+                                    "manager_performance_levels", "deputy_consumption_levels"])
+def test_vectorized_tiers_match_calculator(calculator, levels):
+    table = getattr(calculator, levels)
+    amounts = np.concatenate([np.random.default_rng(0).uniform(0, 9000000, 500),
+                              [level[0] for level in table], [level[1] for level in table if level[1] != float("inf")]])
+    expected_progressive = [calculator.calc_progressive_bonus(a, table) for a in amounts]
+    expected_full = [calculator.calc_full_amount_bonus(a, table) for a in amounts]
+    np.testing.assert_allclose(progressive_bonus(amounts, table), expected_progressive)
+    np.testing.assert_allclose(full_amount_bonus(amounts, table), expected_full)
+
+
+def test_read_daily_snapshots(tmp_path):
+    path = build_workbook(str(tmp_path / "store.xlsx"), days=3, extra_sheets=("202412",))
+    snapshots = read_daily_snapshots(path)
+    assert snapshots.days.tolist() == [1, 2, 3]
+    assert snapshots.consultants == CONSULTANTS
+    assert snapshots.store[:, 0].tolist() == [1500000, 3000000, 4500000]
+    assert snapshots.performance[:, 1].tolist() == [500000, 1000000, 1500000]
+
+
+def test_completed_month_matches_calculator(tmp_path, calculator):
+    path = build_workbook(str(tmp_path / "store.xlsx"), days=3)
+    with open(path, "rb") as f:
+        calculator.load_excel_from_bytes(f.read())
+    role_config = {CONSULTANTS[1]: {"role": "副店長", "mode": "全額"}}
+    consultant_bonuses, _, _ = calculator.calculate_consultant_bonus()
+    individual = calculator.calculate_individual_bonus(consultant_bonuses, 4000000, role_config)
+
+    # 最後一天就是月底:每條路徑都等於實際結果
+    result = forecast_bonuses(calculator, read_daily_snapshots(path), days_in_month=3, high_target=4000000,
+                              role_config=role_config, paths=50, seed=1)
+    frame = result.consultant_frame().set_index("name")
+    for name in CONSULTANTS:
+        expected = (consultant_bonuses[name]["total_bonus"] + individual[name]["individual_total"]
+                    + individual[name]["performance_incentive_bonus"])
+        assert frame.loc[name, "p10"] == pytest.approx(expected)
+        assert frame.loc[name, "p90"] == pytest.approx(expected)
+
+
+def test_partial_month_forecast(tmp_path, calculator):
+    snapshots = read_daily_snapshots(build_workbook(str(tmp_path / "store.xlsx"), days=3))
+    started = time.perf_counter()
+    result = forecast_bonuses(calculator, snapshots, days_in_month=30, high_target=40000000,
+                              product_qualified={CONSULTANTS[2]: False}, paths=5000, seed=7)
+    assert time.perf_counter() - started < 1
+
+    # 每天增量相同,月底必為 30 天的累計
+    summary = result.store_summary()
+    assert summary["performance"]["p10"] == summary["performance"]["p90"] == 45000000
+    assert summary["performance"]["next_tier"] == 6000001
+    assert summary["performance"]["next_tier_probability"] == 1.0
+    assert summary["high_target_probability"] == 1.0
+    frame = result.consultant_frame().set_index("name")
+    assert frame.loc[CONSULTANTS[2], "team_performance_bonus"] == 0
+    assert frame.loc[CONSULTANTS[0], "threshold_probability"] == 1.0
+
+
+def test_next_tier_and_product_projection(calculator):
+    assert next_tier_floor(1000000, calculator.performance_bonus_levels) == 1800000
+    assert next_tier_floor(9000000, calculator.performance_bonus_levels) == 10000001
+    assert next_tier_floor(11000000, calculator.performance_bonus_levels) is None
+    assert project_product_qualified({"a": 10, "b": 9}, elapsed_days=10, days_in_month=30,
+                                     target_sets=30) == {"a": True, "b": False}
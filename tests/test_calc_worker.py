@@ -0,0 +1,118 @@
+import threading
+
+from calc_worker import CANCELLED, DONE, FAILED, CalcWorker, job_key
+
+
+def _blocking_stages(gate, log):
+    def first(ctx):
+        log.append("first")
+        gate.wait(5)
+
+    def second(ctx):
+        log.append("second")
+        ctx["result"] = 42
+
+    return [("第一階段", first), ("第二階段", second)]
+
+
+def test_job_key_ignores_dict_order():
+    assert job_key({"a": 1, "b": {"x": 1, "y": 2}}) == job_key({"b": {"y": 2, "x": 1}, "a": 1})
+    assert job_key({"a": 1}) != job_key({"a": 2})
+
+
+def test_stages_run_in_background_and_duplicates_are_ignored():
+    gate, log = threading.Event(), []
+    worker = CalcWorker()
+    job, started = worker.submit("k", _blocking_stages(gate, log))
+    assert started and worker.busy
+    again, started_again = worker.submit("k", _blocking_stages(gate, log))
+    assert again is job and not started_again
+
+    gate.set()
+    assert job.join(5)
+    assert job.state == DONE and job.progress() == (2, 2)
+    assert job.context["result"] == 42 and log == ["first", "second"]
+    # 已完成的相同輸入也不重算
+    assert worker.submit("k", _blocking_stages(gate, log)) == (job, False)
+
+
+def test_cancel_stops_before_next_stage():
+    gate, log = threading.Event(), []
+    worker = CalcWorker()
+    job, _ = worker.submit("k", _blocking_stages(gate, log))
+    worker.cancel()
+    gate.set()
+    job.join(5)
+    assert job.state == CANCELLED and log == ["first"] and "result" not in job.context
+    # 取消後相同輸入可以重新送出
+    retry, started = worker.submit("k", _blocking_stages(gate, log))
+    assert started and retry.join(5) and retry.state == DONE
+
+
+def test_new_inputs_cancel_running_job_and_failures_are_reported():
+    gate, log = threading.Event(), []
+    worker = CalcWorker()
+    old, _ = worker.submit("old", _blocking_stages(gate, log))
+
+    def broken(ctx):
+        raise ValueError("壞掉了")
+
+    new, started = worker.submit("new", [("會失敗的階段", broken)])
+    gate.set()
+    assert started and old.join(5) and new.join(5)
+    assert old.state == CANCELLED
+    assert new.state == FAILED and isinstance(new.error, ValueError) and new.stage_label == "會失敗的階段"
+
+
+def test_statistics_errors_fail_the_calculation_job(workbook_path, history_db):
+    import streamlit_app
+    from payroll_history import PayrollHistory
+
+    calculator = streamlit_app.OnlyBeautySalaryCalculator()
+    assert not calculator.load_excel_from_bytes(b"junk") and calculator.load_error
+    with open(workbook_path, "rb") as f:
+        assert calculator.load_excel_from_bytes(f.read()) and calculator.load_error is None
+    calculator.staff_count = 3
+    # 沒有上傳儲存區可取得交易明細總表:統計階段失敗,錯誤由工作回報而不是回傳空統計
+    job, _ = CalcWorker().submit("k", streamlit_app.calculation_stages(
+        calculator, None, {}, PayrollHistory(history_db), "新竹店", "2024-12", "store.xlsx"))
+    assert job.join(5)
+    assert job.state == FAILED and job.stage_label == "統計 VIP 項目" and job.error is not None
+    assert "results" not in job.context
+
+
+def test_store_batch_can_be_cancelled_between_stores(workbook_path, history_db, monkeypatch):
+    import streamlit_app
+    from payroll_history import PayrollHistory
+    from upload_store import UploadStore
+
+    started, gate = threading.Event(), threading.Event()
+
+    class SlowCalculator(streamlit_app.OnlyBeautySalaryCalculator):
+        def get_vip_statistics(self, file_bytes=None):
+            started.set()
+            gate.wait(5)
+            return super().get_vip_statistics(file_bytes)
+
+    monkeypatch.setattr(streamlit_app, "default_workers", lambda jobs: 1)
+    with open(workbook_path, "rb") as f:
+        uploads = UploadStore()
+        upload = uploads.put(f.read())
+    jobs = []
+    for store in ("新竹店", "台中店", "台南店"):
+        calculator = SlowCalculator()
+        assert calculator.load_upload(uploads, upload.digest)
+        calculator.staff_count = 3
+        jobs.append({"calculator": calculator, "high_target_amount": None, "store": store, "period": "2024-12",
+                     "filename": f"{store}.xlsx"})
+    stages = streamlit_app.store_batch_stages(jobs, PayrollHistory(history_db))
+    assert [label for label, _ in stages] == ["計算門店: 新竹店", "計算門店: 台中店", "計算門店: 台南店", "產生跨門店彙總"]
+
+    job, _ = CalcWorker().submit("k", stages)
+    assert started.wait(5)
+    job.cancel()
+    gate.set()
+    assert job.join(5)
+    # 取消在第一家門店算完後生效,其餘門店不再計算
+    assert job.state == CANCELLED and job.progress() == (1, 4)
+    assert [(outcome["store"], outcome["success"]) for outcome in job.context["stores"]] == [("新竹店", True)]
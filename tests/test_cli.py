@@ -0,0 +1,53 @@
+import csv
+import io
+import json
+
+import pytest
+
+import salary_calculator
+
+
+def test_parse_role_args():
+    cfg = salary_calculator.parse_role_args(["王小美=副店長:全額", "李大華=店長"])
+    assert cfg == {"王小美": {"role": "副店長", "mode": "全額"}, "李大華": {"role": "店長"}}
+
+
+def test_parse_role_args_rejects_bad_format():
+    with pytest.raises(ValueError):
+        salary_calculator.parse_role_args(["王小美"])
+
+
+def test_calc_json_output(workbook_path, capsys):
+    rc = salary_calculator.main(["calc", workbook_path, "--staff-count", "4",
+                                 "--role", "王小美=副店長:全額"])
+    assert rc == 0
+    out = json.loads(capsys.readouterr().out)
+    assert set(out["consultant_bonuses"]) == {"王小美", "李大華", "陳怡君"}
+    assert out["individual_bonuses"]["王小美"]["role"] == "副店長"
+    assert out["individual_bonuses"]["王小美"]["mode"] == "全額"
+    # 每張表 3 組 × 3 張表 = 9 組
+    assert out["product_bonuses"]["王小美"]["sales_count"] == 9
+
+
+def test_calc_csv_output_is_quiet_by_default(workbook_path, capsys):
+    assert salary_calculator.main(["calc", workbook_path, "--format", "csv"]) == 0
+    captured = capsys.readouterr()
+    rows = list(csv.DictReader(io.StringIO(captured.out)))
+    assert rows[0].keys() == {"section", "name", "field", "value"}
+    assert captured.err == ""
+
+
+def test_batch_reports_failures(workbook_path, capsys):
+    rc = salary_calculator.main(["batch", workbook_path, "missing.xlsx"])
+    out = json.loads(capsys.readouterr().out)
+    assert rc == 1
+    assert [job["success"] for job in out] == [True, False]
+
+
+def test_gaps_command(workbook_path, capsys):
+    assert salary_calculator.main(["gaps", workbook_path, "--role", "李大華=副店長:全額"]) == 0
+    payload = json.loads(capsys.readouterr().out)
+    assert payload["store"]["performance"]["next_tier"] == 6000001
+    rows = {row["name"]: row for row in payload["consultants"]}
+    assert rows["李大華"]["role"] == "副店長"
+    assert rows["王小美"]["product_gap"] == 21
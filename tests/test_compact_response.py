@@ -0,0 +1,85 @@
+import gzip
+import json
+
+import pytest
+
+import compact_response
+import salary_calculator
+from compact_response import COLUMNAR_KEY, dumps, negotiate_encoding, pack, unpack
+
+
+@pytest.fixture
+def results(workbook_path):
+    calculator = salary_calculator.OnlyBeautySalaryCalculator()
+    calculator.staff_count = 3
+    assert calculator.load_excel(workbook_path)
+    return calculator.compute(workbook_path, 1000000)
+
+
+def test_pack_round_trips_results(results):
+    payload = {"success": True, "results": results, "summary": [{"store": "新竹店", "total": 1}, {"store": "台中店", "total": 2}]}
+    packed = pack(payload)
+    section = packed["results"]["individual_staff_salaries"]
+    assert section[COLUMNAR_KEY] == "mapping" and section["keys"] == list(results["individual_staff_salaries"])
+    assert packed["summary"] == {COLUMNAR_KEY: "records", "fields": ["store", "total"], "rows": [["新竹店", 1], ["台中店", 2]]}
+    # 純量 dict 與空 dict 維持原樣
+    assert packed["results"]["staff_bonuses"] == results["staff_bonuses"]
+    assert unpack(json.loads(dumps(packed))) == json.loads(dumps(payload))
+    assert len(dumps(packed)) < len(dumps(payload))
+
+
+def test_pack_keeps_mixed_structures():
+    value = {"a": {"x": 1}, "b": {"y": 2}, "c": [{"x": 1}, {"x": 2, "y": 3}, 5], "d": {"x": {"n": {"v": 1}}}}
+    packed = pack(value)
+    assert packed["c"] == [{"x": 1}, {"x": 2, "y": 3}, 5]
+    assert packed["a"] == {"x": 1}
+    assert packed["d"] == {COLUMNAR_KEY: "mapping", "keys": ["x"], "fields": ["n"], "rows": [[{"v": 1}]]}
+    assert unpack(packed) == value
+
+
+def test_dumps_without_orjson(monkeypatch, results):
+    expected = dumps(pack(results))
+    monkeypatch.setattr(compact_response, "orjson", None)
+    assert json.loads(dumps(pack(results))) == json.loads(expected)
+
+
+@pytest.mark.parametrize("header, brotli, expected", [
+    ("gzip, deflate, br", False, "gzip"),
+    ("gzip, deflate, br", True, "br"),
+    ("br;q=0, gzip;q=0.5", True, "gzip"),
+    ("gzip;q=0", False, None),
+    ("identity", False, None),
+    ("*", False, "gzip"),
+    ("*, gzip;q=0", False, None),
+    (None, False, None),
+])
+def test_negotiate_encoding(monkeypatch, header, brotli, expected):
+    monkeypatch.setattr(compact_response, "brotli", object() if brotli else None)
+    assert negotiate_encoding(header) == expected
+
+
+def test_flask_columnar_gzip_response(workbook_path, history_db, monkeypatch):
+    import app
+    from payroll_history import PayrollHistory
+
+    monkeypatch.setattr(app, "history", PayrollHistory(history_db))
+    client = app.app.test_client()
+
+    def post(**extra):
+        with open(workbook_path, "rb") as f:
+            return client.post("/calculate", data={"file": (f, "新竹店.xlsx"), "staff_count": "3", **extra},
+                               headers={"Accept-Encoding": "gzip, deflate"}, content_type="multipart/form-data")
+
+    plain = post()
+    assert plain.headers["Content-Encoding"] == "gzip" and "Accept-Encoding" in plain.headers["Vary"]
+    expected = json.loads(gzip.decompress(plain.data))
+
+    response = post(format="columnar")
+    data = json.loads(gzip.decompress(response.data))
+    assert data.pop("format") == "columnar"
+    assert data["results"]["consultant_bonuses"][COLUMNAR_KEY] == "mapping"
+    assert unpack(data)["results"] == expected["results"]
+
+    # 小回應不壓縮;不接受壓縮的用戶端取得未壓縮的 JSON
+    response = client.get("/history?person=無此人", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers and response.get_json() == {"success": True, "rows": []}
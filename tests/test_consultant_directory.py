@@ -0,0 +1,47 @@
+import json
+
+import salary_calculator
+from conftest import build_workbook
+from consultant_directory import ConsultantDirectory, normalize_name
+
+
+def test_normalize_name_handles_width_and_spaces():
+    assert normalize_name("王　小美 ") == normalize_name("王小美")
+    assert normalize_name("ＯＢ０１") == "ob01"
+
+
+def test_resolve_aliases_and_unmatched():
+    directory = ConsultantDirectory(["王小美", "李大華", "陳怡君"], aliases={"A01": "李大華"})
+    assert directory.resolve("王 小美") == "王小美"
+    assert directory.resolve("A01") == "李大華"
+    assert directory.resolve("怡君") == "陳怡君"
+    # 單一字或多人共有的片段不做部分比對
+    assert directory.resolve("王") is None
+    resolved, unmatched = directory.resolve_counts({"王小美": 3, "王　小美": 2, "X99": 4})
+    assert resolved == {"王小美": 5}
+    assert unmatched == directory.unmatched_codes == {"X99": 4}
+
+
+def test_membership_only_matches_canonical_names():
+    directory = ConsultantDirectory(["王小美", "李大華"], aliases={"A01": "李大華"})
+    directory.resolve("王 小美")
+    directory.resolve("X99")
+    assert "王小美" in directory and "李大華" in directory
+    assert "A01" not in directory and "王 小美" not in directory and "X99" not in directory and None not in directory
+    indexed = directory.index_by_name({"A01": {"n": 1}, "李大華": {"n": 2}, "王 小美": {"n": 3}})
+    assert indexed == {"李大華": {"n": 2}, "王小美": {"n": 3}}
+
+
+def test_product_gate_joins_codes_to_names(tmp_path, capsys):
+    # 王小美的明細代號寫成全形空白版本,共 30 組 → 達標;李大華只有 1 組 → 未達標
+    rows = [("一般", "保養品", "購產品", "王　小美")] * 10 + [("一般", "保養品", "購產品", "李大華"),
+                                                    ("一般", "保養品", "購產品", "Z99")]
+    path = build_workbook(str(tmp_path / "store.xlsx"), days=3, product_rows=rows)
+    assert salary_calculator.main(["calc", path]) == 0
+    out = json.loads(capsys.readouterr().out)
+    assert out["product_bonuses"]["王小美"]["sales_count"] == 30
+    assert out["consultant_bonuses"]["王小美"]["product_qualified"] is True
+    assert out["consultant_bonuses"]["李大華"]["product_qualified"] is False
+    # 沒有任何產品紀錄的顧問維持預設達標
+    assert out["consultant_bonuses"]["陳怡君"]["product_qualified"] is True
+    assert out["unmatched_consultant_codes"] == {"Z99": 3}
@@ -0,0 +1,83 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import streamlit_app
+from money import (
+    RoundingPolicy,
+    divide_rounded,
+    from_cents,
+    full_amount_cents,
+    mul_div,
+    progressive_cents,
+    rate_to_ppm,
+    to_cents,
+)
+from salary_rules import DEFAULT_RULES_PATH, RuleSetError, parse_rules
+
+
+@pytest.mark.parametrize("mode, expected", [
+    ("half_up", [0, 1, 2, 3, -1]),
+    ("half_even", [0, 0, 2, 2, -2]),
+    ("floor", [0, 0, 1, 2, -2]),
+    ("ceiling", [1, 1, 2, 3, -1]),
+])
+def test_rounding_modes(mode, expected):
+    # 0.4, 0.5, 1.5, 2.5, -1.5
+    got = divide_rounded(np.array([4, 5, 15, 25, -15]), 10, RoundingPolicy(mode))
+    assert got.tolist() == expected
+
+
+def test_rounding_step_and_exact_products():
+    assert divide_rounded(12350, 1, RoundingPolicy("half_up", 100)) == 12400
+    assert divide_rounded(12349, 1, RoundingPolicy("floor", 100)) == 12300
+    # 乘積超過 int64 時改用 Python 整數,結果仍精確
+    assert mul_div(10 ** 12, 10 ** 9, 7, RoundingPolicy("floor")) == 10 ** 21 // 7
+    assert rate_to_ppm(0.065) == 65000
+    with pytest.raises(ValueError):
+        rate_to_ppm(0.1234567)
+
+
+def test_tiers_vectorize_over_int64():
+    calculator = streamlit_app.OnlyBeautySalaryCalculator()
+    levels = calculator.performance_bonus_levels
+    amounts = to_cents(np.random.default_rng(1).uniform(0, 12000000, 1000))
+    assert amounts.dtype == np.int64
+    vector = progressive_cents(amounts, levels)
+    assert vector.tolist() == [progressive_cents(int(a), levels) for a in amounts]
+    # 已編譯的級距表與 list of tuple 結果相同
+    assert progressive_cents(amounts, calculator.rules.tiers["performance_bonus_levels"]).tolist() == vector.tolist()
+    assert progressive_cents(to_cents(5000000), levels) == 4349997
+    assert full_amount_cents(to_cents([600002, 100]), calculator.consultant_performance_levels).tolist() == [420001, 40]
+
+
+def test_staff_pools_are_whole_cents():
+    calculator = streamlit_app.OnlyBeautySalaryCalculator()
+    calculator.excel_data = pd.DataFrame()
+    calculator.staff_count = 3
+    bonus = calculator.calculate_staff_bonus(from_cents(3044998), from_cents(2171999))
+    for key in ("performance_pool", "consumption_pool", "performance_bonus_per_person", "total_bonus_per_person"):
+        assert to_cents(bonus[key]) / 100 == bonus[key]
+    assert bonus["total_bonus_per_person"] == from_cents(
+        to_cents(bonus["performance_bonus_per_person"]) + to_cents(bonus["consumption_bonus_per_person"]))
+
+
+def test_rounding_policy_per_line_item():
+    with open(DEFAULT_RULES_PATH, encoding="utf-8") as f:
+        data = json.load(f)
+    data["versions"][-1]["rounding"]["items"] = {"individual_performance_bonus": {"mode": "floor", "step_cents": 100}}
+    rules = parse_rules(data).versions[-1]
+    assert rules.rounding_for("individual_performance_bonus") == RoundingPolicy("floor", 100)
+    assert rules.rounding_for("performance_bonus") == RoundingPolicy("half_up", 1)
+
+    calculator = streamlit_app.OnlyBeautySalaryCalculator()
+    calculator.rules = rules
+    assert calculator.calc_progressive_bonus(650001, calculator.consultant_performance_levels,
+                                             item="individual_performance_bonus") == 2750
+    assert calculator.calc_progressive_bonus(650001, calculator.consultant_performance_levels) == 2750
+
+    data["versions"][-1]["rounding"]["default"] = "round_down"
+    with pytest.raises(RuleSetError, match="捨入方式"):
+        parse_rules(data)
@@ -0,0 +1,71 @@
+import io
+
+import openpyxl
+
+import salary_calculator
+from payroll_export import SECTIONS, payroll_xlsx_bytes
+
+
+def _results(bonus):
+    return {
+        "consultant_bonuses": {"王小美": {"performance_bonus": bonus, "consumption_bonus": 0.5,
+                                       "personal_performance": 900000, "personal_consumption": 1000,
+                                       "product_qualified": True}},
+        "individual_bonuses": {},
+        "individual_staff_salaries": {"美容甲": {"position": "美容師", "row": 10, "base_salary": 30000.0,
+                                              "total_salary": 30000.0, "high_target_bonus": 5000}},
+        "product_bonuses": {"王小美": {"sales_count": 31, "bonus": 2000, "qualified": True}},
+        "vip_statistics": {"臉部護理": 3, "身體護理": 7},
+    }
+
+
+def _sheets(data):
+    wb = openpyxl.load_workbook(io.BytesIO(data))
+    return {ws.title: [[cell.value for cell in row] for row in ws.iter_rows()] for ws in wb}
+
+
+def test_one_sheet_per_section_with_store_column():
+    sheets = _sheets(payroll_xlsx_bytes([("新竹店", _results(1000.25)), ("台中店", _results(10.0))]))
+    assert list(sheets) == list(SECTIONS)
+    consultants = sheets["顧問獎金"]
+    assert consultants[0][:3] == ["門店", "顧問", "角色"]
+    assert [row[0] for row in consultants[1:]] == ["新竹店", "台中店"]
+    assert consultants[1][consultants[0].index("團體總獎金")] == 1000.75
+    # 沒有個人獎金資料時顯示預設值而非空白
+    assert consultants[1][consultants[0].index("個人獎金小計")] == 0
+    salary = sheets["薪資明細"]
+    assert salary[1][salary[0].index("不計入總薪資")] == 5000
+    assert sheets["VIP 項目"][1:3] == [["新竹店", "身體護理", 7], ["新竹店", "臉部護理", 3]]
+
+
+def test_missing_sections_give_header_only_sheets():
+    sheets = _sheets(payroll_xlsx_bytes([("新竹店", {"consultant_bonuses": {}})]))
+    assert all(len(rows) == 1 for rows in sheets.values())
+
+
+def test_cli_batch_writes_xlsx(workbook_path, tmp_path, capsys):
+    output = tmp_path / "batch.xlsx"
+    rc = salary_calculator.main(["batch", workbook_path, workbook_path, "--format", "xlsx",
+                                 "-o", str(output), "--no-history"])
+    assert rc == 0
+    sheets = _sheets(output.read_bytes())
+    stores = {row[0] for row in sheets["顧問獎金"][1:]}
+    assert len(stores) == 1 and len(sheets["顧問獎金"]) > 2
+    assert salary_calculator.main(["calc", workbook_path, "--format", "xlsx"]) == 1
+
+
+def test_flask_export_endpoint(workbook_path):
+    import app
+
+    client = app.app.test_client()
+    with open(workbook_path, "rb") as f:
+        response = client.post("/export", data={"file": (f, "新竹店.xlsx"), "staff_count": "3"},
+                               content_type="multipart/form-data")
+    assert response.status_code == 200
+    assert response.mimetype == app.XLSX_MIME
+    sheets = _sheets(response.data)
+    assert sheets["顧問獎金"][1][0] == "新竹店"
+
+    response = client.post("/export", data={"file": (io.BytesIO(b"junk"), "a.xlsx"), "staff_count": "3"},
+                           content_type="multipart/form-data")
+    assert response.status_code == 400 and not response.get_json()["success"]
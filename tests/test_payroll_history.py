@@ -0,0 +1,66 @@
+import json
+import sqlite3
+
+import pytest
+
+import salary_calculator
+from payroll_history import PayrollHistory, line_items_from_results, resolve_period
+
+RESULTS = {
+    "consultant_bonuses": {"王小美": {"performance_bonus": 1000.0, "consumption_bonus": 500.0,
+                                   "product_qualified": True}},
+    "individual_bonuses": {"王小美": {"role": "店長", "individual_performance_bonus": 800.0,
+                                   "individual_consumption_bonus": 200.0, "performance_incentive_bonus": 0}},
+    "product_bonuses": {"王小美": {"sales_count": 31, "bonus": 2000, "qualified": True}},
+    "individual_staff_salaries": {"美容甲": {"position": "美容師", "base_salary": 31054.0,
+                                          "high_target_bonus": 5000, "total_salary": 31054.0, "row": 9}},
+}
+
+
+def test_resolve_period():
+    assert resolve_period("2024-12") == "2024-12"
+    assert resolve_period(None, "202412") == "2024-12"
+    with pytest.raises(ValueError):
+        resolve_period("2024/13")
+
+
+def test_line_items_roles_and_categories():
+    items = {(person, field): (role, category) for person, role, _, field, category, _ in
+             line_items_from_results(RESULTS)}
+    assert items[("王小美", "performance_bonus")] == ("店長", "team_bonus")
+    assert items[("王小美", "bonus")] == ("店長", "product")
+    assert items[("美容甲", "high_target_bonus")] == ("美容師", "high_target")
+    # 非金額欄位 (row、product_qualified) 不寫入
+    assert ("美容甲", "row") not in items
+
+
+def test_record_and_query_latest_run(history_db):
+    history = PayrollHistory()
+    history.record_run("新竹店", "2024-11", RESULTS, {"staff_count": 4})
+    rerun = json.loads(json.dumps(RESULTS))
+    rerun["product_bonuses"]["王小美"]["bonus"] = 0
+    history.record_run("新竹店", "2024-11", rerun)
+    history.record_run("新竹店", "2024-12", RESULTS)
+
+    with sqlite3.connect(history_db) as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        indexes = {row[1] for row in conn.execute("PRAGMA index_list(line_items)")}
+    assert {"idx_items_store_period", "idx_items_person_period"} <= indexes
+
+    product = [row for row in history.person_history("王小美") if row["category"] == "product"]
+    assert [(row["period"], row["amount"]) for row in product] == [("2024-11", 0), ("2024-12", 2000)]
+    assert len(history.runs("新竹店")) == 3
+    assert history.latest_run("新竹店", "2024-11")["parameters"] == {}
+
+
+def test_cli_records_history(workbook_path, capsys):
+    assert salary_calculator.main(["calc", workbook_path, "--store", "台中店", "--period", "2024-12"]) == 0
+    capsys.readouterr()
+    assert salary_calculator.main(["history", "--runs"]) == 0
+    runs = json.loads(capsys.readouterr().out)
+    assert [(run["store"], run["period"]) for run in runs] == [("台中店", "2024-12")]
+    assert runs[0]["parameters"]["sheet"] == "3"
+
+    assert salary_calculator.main(["calc", workbook_path, "--no-history"]) == 0
+    capsys.readouterr()
+    assert len(PayrollHistory().runs()) == 1
@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+import salary_calculator
+from payroll_history import PayrollHistory
+from payroll_reports import annual_employee_report, store_cost_summary, year_to_date_report
+
+
+def _results(bonus, salary=30000.0):
+    return {
+        "consultant_bonuses": {"王小美": {"performance_bonus": bonus, "consumption_bonus": 0.0}},
+        "individual_bonuses": {"王小美": {"role": "顧問", "individual_performance_bonus": 100.0,
+                                       "individual_consumption_bonus": 0.0, "performance_incentive_bonus": 0}},
+        "product_bonuses": {"王小美": {"bonus": 2000, "sales_count": 30, "qualified": True}},
+        "individual_staff_salaries": {"美容甲": {"position": "美容師", "base_salary": salary,
+                                              "high_target_bonus": 5000, "total_salary": salary}},
+    }
+
+
+@pytest.fixture
+def history():
+    history = PayrollHistory()
+    for month in range(1, 4):
+        history.record_run("新竹店", f"2024-{month:02d}", _results(1000.0))
+        history.record_run("台中店", f"2024-{month:02d}", _results(500.0))
+    # 重算 3 月會取代原本的月合計
+    history.record_run("新竹店", "2024-03", _results(4000.0))
+    history.record_run("新竹店", "2025-01", _results(9999.0))
+    return history
+
+
+def test_annual_employee_report(history):
+    report = annual_employee_report(history, 2024).set_index("person")
+    assert report.loc["王小美", "team_bonus"] == 1000 * 2 + 4000 + 500 * 3
+    assert report.loc["王小美", "product"] == 2000 * 6
+    assert report.loc["王小美", "role"] == "顧問"
+    assert report.loc["美容甲", "high_target"] == 5000 * 6
+    assert report.loc["美容甲", "salary"] == 30000 * 6
+
+
+def test_year_to_date_and_store_filter(history):
+    report = year_to_date_report(history, "2024-02", store="新竹店").set_index("person")
+    assert report.loc["王小美", "team_bonus"] == 2000
+
+
+def test_store_cost_summary_matches_line_items(history):
+    summary = store_cost_summary(history, 2024).set_index("store")
+    items = history.line_items("新竹店", "2024-01", "2024-12")
+    expected = sum(item["amount"] for item in items if item["category"] != "total")
+    assert summary.loc["新竹店", "total_cost"] == pytest.approx(expected)
+    assert summary.loc["新竹店", "periods"] == 3
+
+
+def test_rollups_backfilled_for_existing_database(history, history_db):
+    with history.connect() as conn:
+        conn.execute("DELETE FROM monthly_rollups")
+    fresh = PayrollHistory(history_db)
+    assert store_cost_summary(fresh, 2024)["store"].tolist() != []
+
+
+def test_cli_report(history, capsys):
+    assert salary_calculator.main(["report", "--year", "2024", "--kind", "stores"]) == 0
+    rows = json.loads(capsys.readouterr().out)
+    assert {row["store"] for row in rows} == {"新竹店", "台中店"}
@@ -0,0 +1,78 @@
+import io
+import zipfile
+
+import pytest
+
+import salary_calculator
+from payslips import payslip_records, payslip_zip_bytes, render_html
+
+
+def _results():
+    return {
+        "consultant_bonuses": {"王小美": {"performance_bonus": 1000.25, "consumption_bonus": 0.5}},
+        "individual_bonuses": {"王小美": {"role": "店長", "individual_performance_bonus": 100}},
+        "individual_staff_salaries": {
+            "美容甲": {"position": "美容師", "base_salary": 30000.0, "hand_skill_bonus": 500,
+                     "total_salary": 30500.0, "high_target_bonus": 5000, "full_attendance_bonus": 1000},
+            "櫃檯乙": {"position": "櫃檯", "base_salary": 28000.0, "high_target_bonus": 2000,
+                     "total_salary": 30000.0},
+        },
+        "product_bonuses": {"王小美": {"sales_count": 31, "bonus": 2000, "qualified": True}},
+    }
+
+
+def _zip(data):
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        return {name: zf.read(name).decode("utf-8") for name in zf.namelist()}
+
+
+def test_records_follow_total_salary_rules():
+    records = {r["name"]: r for r in payslip_records("新竹店", "2024-12", _results())}
+    staff = records["美容甲"]
+    assert staff["filename"] == "新竹店/2024-12_美容甲" and staff["total"] == 30500.0
+    # 高標獎金對美容師另行發放;全勤獎金只屬於護理師
+    assert staff["notes"] == [("高標達標獎金", 5000)]
+    # 櫃檯的高標獎金計入總薪資
+    assert ("高標達標獎金", 2000) in records["櫃檯乙"]["items"] and not records["櫃檯乙"]["notes"]
+    consultant = records["王小美"]
+    assert consultant["position"] == "店長" and consultant["total"] == 3100.75
+
+
+def test_html_escapes_names():
+    record = next(payslip_records("<店>", "2024-12", {"individual_staff_salaries": {
+        "<b>": {"position": "美容師", "base_salary": 1, "total_salary": 1}}}))
+    page = render_html(record)
+    assert "&lt;b&gt;" in page and "<b>" not in page and "NT$" in page
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_zip_has_one_document_per_person(workers):
+    def batches():
+        # 同一門店兩個檔案:檔名依出現順序加上序號
+        for _ in range(2):
+            yield from payslip_records("新竹店", "2024-12", _results())
+
+    files = _zip(payslip_zip_bytes(batches(), workers=workers))
+    assert len(files) == 6
+    assert "新竹店/2024-12_美容甲.html" in files and "新竹店/2024-12_美容甲_2.html" in files
+    assert "30,500" in files["新竹店/2024-12_美容甲.html"]
+
+
+def test_pdf_requires_weasyprint():
+    try:
+        import weasyprint  # noqa: F401
+        pytest.skip("weasyprint 已安裝")
+    except ImportError:
+        pass
+    with pytest.raises(ValueError, match="weasyprint"):
+        payslip_zip_bytes(payslip_records("新竹店", "2024-12", _results()), "pdf")
+
+
+def test_cli_writes_payslips(workbook_path, tmp_path):
+    output = tmp_path / "payslips.zip"
+    rc = salary_calculator.main(["calc", workbook_path, "--staff-count", "3", "--store", "新竹店",
+                                 "--period", "2024-12", "--no-history", "--payslips", str(output),
+                                 "-o", str(tmp_path / "out.json")])
+    assert rc == 0
+    files = _zip(output.read_bytes())
+    assert files and all(name.startswith("新竹店/2024-12_") for name in files)
@@ -0,0 +1,53 @@
+import pandas as pd
+
+from result_tables import CONSULTANT_COLUMNS, SALARY_COLUMNS, consultant_table, salary_table
+
+
+def _salary(position, row, **amounts):
+    data = {"position": position, "row": row, "base_salary": 30000.0, "hand_skill_bonus": 0,
+            "license_allowance": 0, "rank_bonus": 0, "position_allowance": 0, "total_salary": 30000.0,
+            "team_performance_bonus": 0, "team_consumption_bonus": 0, "full_attendance_bonus": 0,
+            "high_target_bonus": 0}
+    data.update(amounts)
+    return data
+
+
+def test_consultant_table_joins_team_and_individual_bonuses():
+    results = {
+        "consultant_bonuses": {
+            "王小美": {"performance_bonus": 1000.1, "consumption_bonus": 200.2, "personal_performance": 900000,
+                    "personal_consumption": 300000, "product_qualified": True},
+            "李大華": {"performance_bonus": 0, "consumption_bonus": 0, "personal_performance": 100,
+                    "personal_consumption": 0, "product_qualified": False},
+        },
+        "individual_bonuses": {
+            "王小美": {"role": "副店長", "mode": "全額", "individual_performance_bonus": 500.0,
+                    "individual_consumption_bonus": 50.0, "performance_incentive_bonus": 0, "individual_total": 550.0},
+        },
+    }
+    table = consultant_table(results)
+    assert list(table.columns) == CONSULTANT_COLUMNS
+    first, second = table.to_dict("records")
+    assert first["team_total"] == 1200.3
+    assert (first["role"], first["mode"], first["individual_total"]) == ("副店長", "全額", 550.0)
+    # 沒有個人獎金資料的顧問以預設角色與 0 元顯示
+    assert (second["role"], second["mode"], second["individual_total"]) == ("顧問", "階梯", 0.0)
+    assert not second["product_qualified"]
+
+
+def test_salary_table_orders_positions_and_sums_separate_items():
+    results = {"individual_staff_salaries": {
+        "櫃檯甲": _salary("櫃檯", 10, high_target_bonus=999),
+        "護理乙": _salary("護理師", 12, full_attendance_bonus=2000, team_performance_bonus=100.5),
+        "美容丙": _salary("美容師", 14, full_attendance_bonus=2000, high_target_bonus=300),
+    }}
+    table = salary_table(results)
+    assert list(table.columns) == SALARY_COLUMNS
+    assert table["name"].tolist() == ["美容丙", "護理乙", "櫃檯甲"]
+    # 全勤只算護理師,櫃檯沒有不計入總薪資的項目
+    assert table["separate_total"].tolist() == [300.0, 2100.5, 0.0]
+
+
+def test_empty_results_give_empty_tables():
+    assert consultant_table({"consultant_bonuses": {}}).empty
+    assert isinstance(salary_table({}), pd.DataFrame) and salary_table({}).empty
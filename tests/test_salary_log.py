@@ -0,0 +1,46 @@
+import io
+import json
+import logging
+
+from salary_log import configure_logging, get_logger, lazy_amount, verbosity_to_level
+
+
+def test_lazy_amount_formats_only_on_str():
+    assert str(lazy_amount(1234567.4)) == "1,234,567"
+    assert str(lazy_amount(2000, ",")) == "2,000"
+
+
+def test_verbosity_to_level():
+    assert verbosity_to_level(0) == logging.WARNING
+    assert verbosity_to_level(1) == logging.INFO
+    assert verbosity_to_level(3) == logging.DEBUG
+
+
+def test_json_sink_writes_one_object_per_line(tmp_path):
+    json_path = tmp_path / "log.jsonl"
+    configure_logging("INFO", json_path=str(json_path), stream=io.StringIO())
+    logger = get_logger("test")
+    logger.info("總業績: %s", lazy_amount(5000000), extra={"sheet": "5"})
+    logger.debug("不應輸出")
+    for handler in get_logger().handlers:
+        handler.flush()
+    lines = json_path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 1
+    record = json.loads(lines[0])
+    assert record["message"] == "總業績: 5,000,000"
+    assert record["sheet"] == "5"
+    assert record["logger"] == "only_beauty.test"
+    configure_logging("WARNING")
+
+
+def test_invalid_log_level_falls_back_to_info(monkeypatch):
+    stream = io.StringIO()
+    monkeypatch.setenv("SALARY_LOG_LEVEL", "verbose")
+    logger = configure_logging(stream=stream)
+    assert logger.level == logging.INFO
+    assert "SALARY_LOG_LEVEL='verbose' 不是有效的日誌等級" in stream.getvalue()
+
+    monkeypatch.setenv("SALARY_LOG_LEVEL", " debug ")
+    assert configure_logging(stream=io.StringIO()).level == logging.DEBUG
+    assert configure_logging("15", stream=io.StringIO()).level == 15
+    configure_logging("WARNING")
@@ -0,0 +1,155 @@
+import copy
+import json
+import os
+from datetime import date
+
+import pytest
+
+import salary_calculator
+import streamlit_app
+from salary_rules import DEFAULT_RULES_PATH, RuleSetError, load_rules, parse_rules
+
+
+def _default_data():
+    with open(DEFAULT_RULES_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    return str(path)
+
+
+def test_default_rules_compile_into_calculator():
+    calculator = streamlit_app.OnlyBeautySalaryCalculator()
+    rules = calculator.rules
+    assert calculator.performance_bonus_levels == list(rules.tiers["performance_bonus_levels"].levels)
+    assert calculator.performance_bonus_levels[-1] == (10000001, float("inf"), 0.065)
+    assert rules.performance_bonus_gate == 1680000
+    assert rules.base_salaries["護理師"] == 31175
+    with pytest.raises(TypeError):
+        rules.base_salaries["護理師"] = 0
+    with pytest.raises(ValueError):
+        rules.tiers["consultant_performance_levels"].rates[0] = 1
+
+
+@pytest.mark.parametrize("mutate, message", [
+    (lambda v: v["tiers"]["consultant_performance_levels"].insert(1, [500000, 700000, 0.006]), "重疊"),
+    (lambda v: v["tiers"].pop("manager_consumption_levels"), "manager_consumption_levels"),
+    (lambda v: v["consultant"].pop("performance_bonus_gate"), "performance_bonus_gate"),
+    (lambda v: v["tiers"]["consumption_bonus_levels"][0].__setitem__(2, 6), "費率"),
+])
+def test_invalid_rules_are_rejected(mutate, message):
+    data = _default_data()
+    mutate(data["versions"][0])
+    with pytest.raises(RuleSetError, match=message):
+        parse_rules(data)
+
+
+def test_for_period_selects_effective_version():
+    data = _default_data()
+    newer = copy.deepcopy(data["versions"][-1])
+    newer.update(version="3", effective_from="2027-07-15")
+    newer["consultant"]["performance_bonus_gate"] = 2000000
+    data["versions"].insert(0, newer)
+    book = parse_rules(data)
+    assert book.for_period("2026-05").version == "1"
+    # 生效日在月中時,整個月份都適用新版本
+    assert book.for_period("2026-06").version == "2"
+    assert book.for_period("2027-07").version == "3"
+    assert book.for_period("2028-01").performance_bonus_gate == 2000000
+    assert book.interval("2") == (date(2026, 6, 13), date(2027, 7, 15))
+    assert book.interval("3") == (date(2027, 7, 15), None)
+    with pytest.raises(RuleSetError):
+        book.for_period("1999-12")
+
+
+def test_deputy_levels_fall_back_before_they_existed():
+    book = load_rules()
+    old, new = book.for_period("2026-05"), book.for_period("2026-06")
+    assert old.tiers["deputy_performance_levels"] == old.tiers["consultant_performance_levels"]
+    assert new.tiers["deputy_performance_levels"].levels[0] == (0, 800000, 0.005)
+
+
+def test_group_periods_by_version():
+    book = load_rules()
+    groups = book.group_periods(["2026-08", "2024-01", "2026-06", "2025-12"])
+    assert groups == {"1": [1, 3], "2": [0, 2]}
+
+
+def test_duplicate_effective_dates_are_rejected():
+    data = _default_data()
+    data["versions"][-1]["effective_from"] = data["versions"][0]["effective_from"]
+    with pytest.raises(RuleSetError, match="生效日"):
+        parse_rules(data)
+
+
+def test_rules_file_reloads_when_modified(tmp_path, monkeypatch):
+    data = _default_data()
+    path = _write(tmp_path / "rules.json", data)
+    monkeypatch.setenv("SALARY_RULES", path)
+    first = load_rules()
+    assert load_rules() is first
+
+    for version in data["versions"]:
+        version["consultant"]["product_target_bonus"] = 2500
+    _write(path, data)
+    os.utime(path, ns=(1, 1))
+    assert load_rules().for_period("2026-01").product_target_bonus == 2500
+    assert streamlit_app.OnlyBeautySalaryCalculator().rules.product_target_bonus == 2500
+
+
+def test_cli_rules_option_is_recorded(workbook_path, tmp_path, capsys):
+    data = _default_data()
+    data["versions"][-1]["version"] = "test-rules"
+    data["versions"][-1]["consultant"].update(product_target_sets=5, product_target_bonus=4000)
+    path = _write(tmp_path / "rules.json", data)
+    assert salary_calculator.main(["calc", workbook_path, "--rules", path]) == 0
+    out = json.loads(capsys.readouterr().out)
+    assert out["product_bonuses"]["王小美"] == {"sales_count": 9, "qualified": True, "bonus": 4000}
+    assert salary_calculator.main(["history", "--runs"]) == 0
+    runs = json.loads(capsys.readouterr().out)
+    assert runs[0]["parameters"]["rules_version"] == "test-rules"
+
+
+def test_batch_applies_rules_of_each_period(workbook_path, capsys):
+    jobs = [{"path": workbook_path, "period": "2026-07", "role_config": {"李大華": {"role": "副店長"}}},
+            {"path": workbook_path, "period": "2025-03", "role_config": {"李大華": {"role": "副店長"}}}]
+    rc = salary_calculator.main(["batch", "--jobs", _write_jobs(workbook_path, jobs), "--no-history"])
+    assert rc == 0
+    out = json.loads(capsys.readouterr().out)
+    assert [job["rules_version"] for job in out] == ["2", "1"]
+    new, old = (job["results"]["individual_bonuses"]["李大華"] for job in out)
+    # 2026-06-13 前的副店長沿用顧問級距
+    assert new["individual_performance_bonus"] != old["individual_performance_bonus"]
+
+
+def _write_jobs(workbook_path, jobs):
+    path = os.path.join(os.path.dirname(workbook_path), "jobs.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(jobs, f, ensure_ascii=False)
+    return path
+
+
+@pytest.mark.parametrize("module, answers", [
+    ("salary_calculator", ["3", "n", ""]),
+    ("salary_calculator_fixed", ["3", "none"]),
+])
+def test_interactive_run_applies_rules_of_sheet_period(tmp_path, monkeypatch, capsys, module, answers):
+    import importlib
+
+    import openpyxl
+    from conftest import build_workbook
+
+    path = build_workbook(str(tmp_path / "store.xlsx"), days=1)
+    wb = openpyxl.load_workbook(path)
+    wb["1"].title = "202503"
+    wb.save(path)
+    answers = iter([path] + answers)
+    monkeypatch.setattr("builtins.input", lambda prompt="": next(answers))
+    calculator = importlib.import_module(module).OnlyBeautySalaryCalculator()
+    assert calculator.rules.version == "2"
+    calculator.run()
+    # 2025-03 的工作表以當時的 v1 規則重算,而不是今天適用的版本
+    assert calculator.sheet_name == "202503" and calculator.rules.version == "1"
@@ -0,0 +1,130 @@
+import json
+import sys
+
+import pytest
+
+import salary_calculator
+from conftest import build_workbook
+from payroll_history import PayrollHistory
+import store_batch
+from store_batch import compute_stores, shutdown_pool, store_summary, summary_totals
+
+
+def _compute(job):
+    if job["staff_count"] < 1:
+        raise ValueError("員工人數必須大於0")
+    calculator = salary_calculator.OnlyBeautySalaryCalculator()
+    calculator.staff_count = job["staff_count"]
+    assert calculator.load_excel(job["path"])
+    return {"success": True, "period": calculator.sheet_name, "results": calculator.compute(job["path"])}
+
+
+def _loaded_modules(_):
+    return {name: name in sys.modules for name in ("app", "flask", "store_jobs")}
+
+
+@pytest.fixture
+def jobs(tmp_path):
+    return [{"store": f"店{days}", "filename": f"{days}.xlsx", "staff_count": days - 1,
+             "path": build_workbook(str(tmp_path / f"{days}.xlsx"), days=days)} for days in (2, 3, 4)]
+
+
+@pytest.mark.parametrize("workers, processes", [(1, True), (3, False), (3, True)])
+def test_compute_stores_keeps_order_and_isolates_failures(jobs, workers, processes):
+    jobs[0]["staff_count"] = 0
+    try:
+        outcomes = compute_stores(jobs, _compute, workers, processes)
+    finally:
+        shutdown_pool()
+    assert [outcome["store"] for outcome in outcomes] == ["店2", "店3", "店4"]
+    assert not outcomes[0]["success"] and "員工人數必須大於0" in outcomes[0]["error"]
+    assert [outcome["results"] for outcome in outcomes[1:]] == [_compute(job)["results"] for job in jobs[1:]]
+
+
+def test_store_summary_sums_cost_categories(jobs):
+    outcomes = compute_stores(jobs, _compute, processes=False)
+    summary = store_summary(outcomes + [{"store": "失敗店", "success": False}])
+    assert list(summary["store"]) == ["店2", "店3", "店4"]
+    row = summary.iloc[1]
+    results = outcomes[1]["results"]
+    assert row["consultants"] == len(results["consultant_bonuses"])
+    assert row["staff"] == len(results["individual_staff_salaries"])
+    assert row["total_cost"] == pytest.approx(row["salary"] + row["bonus_total"])
+    totals = summary_totals(summary)
+    assert totals["stores"] == 3
+    assert totals["total_cost"] == pytest.approx(summary["total_cost"].sum())
+    assert store_summary([]).empty and summary_totals(store_summary([]))["stores"] == 0
+
+
+def test_flask_calculate_multiple_files(tmp_path, history_db, monkeypatch):
+    import app
+
+    monkeypatch.setattr(app, "history", PayrollHistory(history_db))
+    monkeypatch.setenv("SALARY_STORE_WORKERS", "1")
+    client = app.app.test_client()
+    paths = [build_workbook(str(tmp_path / f"{name}.xlsx"), days=days) for name, days in (("新竹店", 2), ("台中店", 3))]
+    files = [(open(path, "rb"), path.rsplit("/", 1)[1]) for path in paths]
+    try:
+        response = client.post("/calculate", data={
+            "file": files, "staff_count": "3",
+            "jobs": json.dumps([{"high_target": "1000000"}, {"store": "台中一店", "staff_count": 4}]),
+        }, content_type="multipart/form-data")
+    finally:
+        for f, _ in files:
+            f.close()
+    data = response.get_json()
+    assert data["success"] and data["failures"] == 0
+    assert [store["store"] for store in data["stores"]] == ["新竹店", "台中一店"]
+    assert data["stores"][0]["results"]["high_target_bonuses"]
+    assert [row["store"] for row in data["summary"]] == ["新竹店", "台中一店"]
+    assert data["totals"]["stores"] == 2
+    assert all(store["history_run_id"] for store in data["stores"])
+    assert {row["store"] for row in app.history.line_items()} == {"新竹店", "台中一店"}
+
+    response = client.post("/calculate", data={
+        "file": [(open(paths[0], "rb"), "a.xlsx"), (open(paths[1], "rb"), "b.txt")], "staff_count": "3",
+    }, content_type="multipart/form-data")
+    data = response.get_json()
+    assert not data["success"] and data["error"].startswith("b.txt: 檔案格式不支援")
+
+
+def test_flask_upload_limits_per_file_and_request(tmp_path, monkeypatch):
+    import app
+
+    client = app.app.test_client()
+    assert app.app.config["MAX_CONTENT_LENGTH"] == app.MAX_STORES * app.MAX_FILE_SIZE
+    small = build_workbook(str(tmp_path / "新竹店.xlsx"), days=1)
+    large = build_workbook(str(tmp_path / "台中店.xlsx"), days=6)
+    monkeypatch.setattr(app, "MAX_FILE_SIZE", (len(open(small, "rb").read()) + len(open(large, "rb").read())) // 2)
+    response = client.post("/calculate", data={
+        "file": [(open(small, "rb"), "新竹店.xlsx"), (open(large, "rb"), "台中店.xlsx")], "staff_count": "3",
+    }, content_type="multipart/form-data")
+    data = response.get_json()
+    assert not data["success"] and data["error"].startswith("台中店.xlsx: 檔案太大")
+
+    monkeypatch.setitem(app.app.config, "MAX_CONTENT_LENGTH", 100)
+    response = client.post("/calculate", data={"file": (open(small, "rb"), "新竹店.xlsx"), "staff_count": "3"},
+                           content_type="multipart/form-data")
+    assert response.status_code == 413 and f"一次最多 {app.MAX_STORES} 個檔案" in response.get_json()["error"]
+
+
+def test_flask_calculate_uses_process_pool(tmp_path, history_db, monkeypatch):
+    import app
+
+    monkeypatch.setattr(app, "history", PayrollHistory(history_db))
+    monkeypatch.setenv("SALARY_STORE_WORKERS", "2")
+    client = app.app.test_client()
+    paths = [build_workbook(str(tmp_path / f"{name}.xlsx"), days=days) for name, days in (("新竹店", 2), ("台中店", 3))]
+    try:
+        response = client.post("/calculate", data={
+            "file": [(open(path, "rb"), path.rsplit("/", 1)[1]) for path in paths], "staff_count": "3",
+        }, content_type="multipart/form-data")
+        data = response.get_json()
+        assert data["success"] and data["failures"] == 0
+        assert [store["store"] for store in data["stores"]] == ["新竹店", "台中店"]
+        # 工作行程只匯入計算模組,不會匯入 app.py (設定日誌、開啟歷史資料庫、建立 Flask app)
+        assert store_batch._pool is not None
+        assert store_batch._pool.submit(_loaded_modules, None).result() == \
+            {"app": False, "flask": False, "store_jobs": True}
+    finally:
+        shutdown_pool()
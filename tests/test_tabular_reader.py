@@ -0,0 +1,135 @@
+import io
+import os
+import subprocess
+import sys
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import salary_calculator
+from conftest import build_workbook
+from sheet_loader import load_latest_sheet, open_sheets
+from sheet_source import SHEET_READERS, SheetSource
+from tabular_reader import CsvSheets, ParquetSheets, TabularSheets, cell_value
+from transaction_ledger import build_ledger
+from workbook_reader import WorkbookSession, column_letter
+from workbook_validator import validate_workbook
+
+
+def _compute(path):
+    calculator = salary_calculator.OnlyBeautySalaryCalculator()
+    calculator.staff_count = 3
+    assert calculator.load_excel(path)
+    return calculator.sheet_name, calculator.compute(path)
+
+
+def _export(workbook_path, tmp_path, fmt):
+    """把活頁簿每張工作表匯出成 CSV/Parquet 並打包成 zip (模擬 POS 匯出)"""
+    target = tmp_path / f"store_{fmt}.zip"
+    with WorkbookSession(workbook_path) as session, zipfile.ZipFile(target, "w") as zf:
+        for name, frame in session.iter_frames():
+            if fmt == "csv":
+                zf.writestr(f"{name}.csv", frame.to_csv(header=False, index=False))
+            else:
+                text = frame.astype(object).where(frame.notna(), "").astype(str)
+                buffer = io.BytesIO()
+                text.rename(columns=column_letter).to_parquet(buffer)
+                zf.writestr(f"{name}.parquet", buffer.getvalue())
+    return str(target)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1234", 1234), ("1,234,567", 1234567), ("-12.5", -12.5), ("3.0", 3), (" 42 ", 42),
+    ("12,34", "12,34"), ("王小美", "王小美"), ("2024-12-01", "2024-12-01"), ("E5", "E5"),
+    ("0", 0), ("0.5", 0.5), ("-0.25", -0.25), ("007", "007"), ("-007", "-007"), ("0912345678", "0912345678"),
+    ("0,123", "0,123"), ("1234567890123456", "1234567890123456"), ("123456789012345", 123456789012345),
+])
+def test_cell_value_matches_xlsx_types(text, expected):
+    value = cell_value(text)
+    assert value == expected and type(value) is type(expected)
+    assert np.isnan(cell_value("")) and np.isnan(cell_value(None))
+
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet"])
+def test_leading_zero_codes_match_xlsx(tmp_path, fmt):
+    rows = [("一般", "保養品", "購產品", code) for code in ("007", "0912345678", "王小美")]
+    path = build_workbook(str(tmp_path / "codes.xlsx"), days=1, product_rows=rows)
+    expected = load_latest_sheet(path)[1]
+    exported = load_latest_sheet(_export(path, tmp_path, fmt))[1]
+    assert exported.iloc[16:19, 14].tolist() == ["007", "0912345678", "王小美"]
+    pd.testing.assert_frame_equal(exported, expected)
+    assert build_ledger(_export(path, tmp_path, fmt)).product_sales_counts() == \
+        build_ledger(path).product_sales_counts()
+
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet"])
+def test_exports_give_identical_results(workbook_path, tmp_path, fmt):
+    expected = _compute(workbook_path)
+    path = _export(workbook_path, tmp_path, fmt)
+    assert _compute(path) == expected
+    with open(path, "rb") as f:
+        data = f.read()
+    pd.testing.assert_frame_equal(load_latest_sheet(data)[1], load_latest_sheet(workbook_path)[1])
+    assert validate_workbook(data) == []
+
+
+def test_csv_directory_and_single_file(workbook_path, tmp_path):
+    expected = _compute(workbook_path)
+    directory = tmp_path / "csv"
+    with zipfile.ZipFile(_export(workbook_path, tmp_path, "csv")) as zf:
+        zf.extractall(directory)
+    assert _compute(str(directory)) == expected
+
+    latest = expected[0]
+    data = (directory / f"{latest}.csv").read_bytes()
+    name, frame = load_latest_sheet(data, f"{latest}.csv")
+    assert name == latest
+    # 沒有檔名時唯一的工作表即為最新工作表
+    with open_sheets(data) as sheets:
+        assert isinstance(sheets, CsvSheets) and sheets.latest == "Sheet1"
+        pd.testing.assert_frame_equal(sheets.frame("Sheet1"), frame)
+
+
+def test_csv_big5_ragged_rows_and_detection(workbook_path):
+    data = "門店,,\n,,\n,,,,1,234\n\n,,\n".encode("cp950")
+    frame = load_latest_sheet(data)[1]
+    assert frame.shape == (3, 6) and frame.iat[0, 0] == "門店" and frame.iat[2, 4] == 1
+    assert validate_workbook(data)[0] == "工作表 'Sheet1' 的 E5 (當月實際總業績) 是空白"
+    with open(workbook_path, "rb") as f:
+        with open_sheets(f.read()) as sheets:
+            assert isinstance(sheets, WorkbookSession)
+    assert not CsvSheets.accepts(b"junk") and not ParquetSheets.accepts(b"junk,data")
+
+
+def test_readers_are_registered_by_sheet_loader():
+    assert SHEET_READERS == [ParquetSheets, CsvSheets]
+    # 匯入介面或讀取器模組本身不會註冊任何讀取器
+    code = ("import sheet_source, tabular_reader, workbook_reader; print(len(sheet_source.SHEET_READERS)); "
+            "import sheet_loader; print(len(sheet_source.SHEET_READERS))")
+    output = subprocess.run([sys.executable, "-c", code], cwd=os.path.join(os.path.dirname(__file__), "..", "web_app"), check=True,
+                            capture_output=True, text=True).stdout.split()
+    assert output == ["0", "2"]
+
+
+def test_sheet_sources_are_abstract_and_keep_their_own_sheet_names(workbook_path, tmp_path):
+    with pytest.raises(TypeError, match="abstract"):
+        SheetSource()
+    with pytest.raises(TypeError, match="abstract"):
+        TabularSheets(workbook_path)
+
+    class Partial(TabularSheets):
+        EXTENSION = ".txt"
+
+        @staticmethod
+        def parse(data):
+            return pd.DataFrame()
+
+    with pytest.raises(TypeError, match="matches_head"):
+        Partial(workbook_path)
+
+    (tmp_path / "202411.csv").write_text("1,2\n")
+    with CsvSheets(str(tmp_path / "202411.csv")) as first, WorkbookSession(workbook_path) as second:
+        assert first.sheet_names == ["202411"] and "202411" not in second.sheet_names
+        assert "sheet_names" not in vars(SheetSource)
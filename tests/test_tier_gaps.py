@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+import streamlit_app
+from bonus_forecast import full_amount_bonus, progressive_bonus
+from tier_gaps import (
+    consultant_gaps,
+    full_amount_marginal_rate,
+    inverse_full_amount,
+    inverse_progressive,
+    progressive_marginal_rate,
+    store_gaps,
+)
+
+
+@pytest.fixture
+def calculator():
+    return streamlit_app.OnlyBeautySalaryCalculator()
+
+
+@pytest.mark.parametrize("levels", ["consultant_performance_levels", "manager_consumption_levels",
+                                    "deputy_performance_levels", "performance_bonus_levels"])
+def test_inverses_are_minimal(calculator, levels):
+    table = getattr(calculator, levels)
+    targets = np.random.default_rng(3).uniform(1, 40000, 300)
+
+    # 獎金以分四捨五入,比較時容許半分的差距
+    amounts = inverse_progressive(targets, table)
+    reachable = ~np.isnan(amounts)
+    assert np.all(progressive_bonus(amounts[reachable], table) >= targets[reachable] - 0.005)
+    assert np.all(progressive_bonus(amounts[reachable] - 1, table) < targets[reachable] + 0.005)
+
+    amounts = inverse_full_amount(targets, table)
+    assert np.all(full_amount_bonus(amounts, table) >= targets - 0.005)
+    assert np.all(full_amount_bonus(amounts - 1, table) < targets + 0.005)
+
+
+def test_marginal_rates(calculator):
+    levels = calculator.consultant_performance_levels
+    np.testing.assert_allclose(progressive_marginal_rate([0, 599999, 600000, 650000, 5000000], levels),
+                               [0.004, 0.004, 0, 0.007, 0.012])
+    np.testing.assert_allclose(full_amount_marginal_rate([100, 600001, 600002], levels), [0.004, 0.004, 0.007])
+    assert progressive_marginal_rate([9000000], calculator.performance_bonus_levels)[0] == 0.05
+    # 有上限的級距表超過上限後不再增加
+    assert progressive_marginal_rate([9000000], [(0, 8000000, 0.045)])[0] == 0
+
+
+def test_consultant_gaps(calculator):
+    consultants = [{"name": "王小美", "performance": 1650000, "consumption": 280000},
+                   {"name": "李大華", "performance": 590000, "consumption": 700000}]
+    frame = consultant_gaps(calculator, consultants, {"李大華": {"role": "副店長", "mode": "全額"}},
+                            {"王小美": 25, "李大華": 31}).set_index("name")
+
+    assert frame.loc["王小美", "performance_tier"] == 3
+    assert frame.loc["王小美", "performance_next_tier"] == 1700001
+    assert frame.loc["王小美", "performance_gap"] == 50002
+    assert frame.loc["王小美", "team_gate_gap"] == 30000
+    assert frame.loc["王小美", "product_gap"] == 5
+    assert frame.loc["王小美", "performance_marginal_rate"] == 0.008
+
+    # 副店長全額:到 800,001 以上 (800,002) 整筆改用 0.8%
+    assert frame.loc["李大華", "role"] == "副店長"
+    assert frame.loc["李大華", "performance_gap"] == 800002 - 590000
+    assert frame.loc["李大華", "performance_gain"] == pytest.approx(round(800002 * 0.008, 2) - 590000 * 0.005)
+    assert frame.loc["李大華", "product_gap"] == 0
+    assert frame.loc["李大華", "consumption_next_tier"] == 900001
+
+
+def test_store_gaps(calculator):
+    gaps = store_gaps(calculator, 1700000, 3000000)
+    assert gaps["performance"]["tier"] == 0
+    assert gaps["performance"]["gap"] == 100001
+    assert gaps["performance"]["pool_marginal_rate"] == 0
+    assert gaps["consumption"]["next_tier"] is None
+    assert gaps["consumption"]["pool_marginal_rate"] == pytest.approx(0.015 * 0.4)
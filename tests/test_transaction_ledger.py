@@ -0,0 +1,111 @@
+import openpyxl
+
+from conftest import CONSULTANTS, build_workbook
+from transaction_ledger import PRODUCT_CATEGORY, build_ledger
+from workbook_reader import WorkbookSession
+
+
+def _legacy_counts(path):
+    """原本逐表逐列掃描 DataFrame 的統計方式,作為對照"""
+    import pandas as pd
+
+    products, vip = {}, {}
+    for name in pd.ExcelFile(path).sheet_names:
+        df = pd.read_excel(path, sheet_name=name, header=None)
+        for r in range(16, len(df)):
+            f = df.iloc[r, 5] if 5 < len(df.columns) else None
+            if pd.notna(f) and str(f).strip() == "購產品":
+                o = df.iloc[r, 14] if 14 < len(df.columns) else None
+                if pd.notna(o):
+                    products[str(o).strip()] = products.get(str(o).strip(), 0) + 1
+            d = df.iloc[r, 3] if 3 < len(df.columns) else None
+            if pd.notna(d) and "VIP" in str(d):
+                e = df.iloc[r, 4] if 4 < len(df.columns) else None
+                if pd.notna(e):
+                    vip[str(e).strip()] = vip.get(str(e).strip(), 0) + 1
+    return products, vip
+
+
+def test_ledger_matches_row_scans(tmp_path):
+    rows = [("一般", "保養品", " 購產品 ", CONSULTANTS[0]),
+            ("VIP會員", " 玻尿酸 ", "購療程", CONSULTANTS[1]),
+            (None, "面膜", "購產品", 1007),
+            ("一般", "精華液", "購產品", None)]
+    path = build_workbook(str(tmp_path / "store.xlsx"), days=2, product_rows=rows, extra_sheets=("說明",))
+    ledger = build_ledger(path)
+    products, vip = _legacy_counts(path)
+    assert ledger.product_sales_counts() == products == {CONSULTANTS[0]: 2, "1007": 2}
+    assert ledger.vip_item_counts() == vip == {"玻尿酸": 2}
+    assert ledger.counts_by_sheet(PRODUCT_CATEGORY) == {"1": 3, "2": 3}
+
+
+def test_ledger_indexes(workbook_path):
+    with WorkbookSession(workbook_path) as session:
+        ledger = build_ledger(session)
+    # 3 張表 × (9 組產品 + 1 筆 VIP)
+    assert len(ledger) == 30
+    own = ledger.rows_for_consultant(CONSULTANTS[0])
+    assert len(own) == 12
+    assert {r.sheet for r in own} == {"1", "2", "3"}
+    assert all(r.amount == 1000 for r in own)
+    assert own[0].row == 17
+    assert len(ledger.rows_for_category("購療程")) == 3
+    assert list(ledger.to_frame().columns) == ["sheet", "row", "vip_tag", "item", "category",
+                                               "amount", "consultant_code"]
+
+
+def _shared_string_workbook(path, strings):
+    """最小的 xlsx:一張工作表,第17列 E/F/O 欄參照共用字串 0/1/2"""
+    import zipfile
+
+    ns = 'xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+    rel_ns = 'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"'
+    rel_type = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/"
+    items = "".join(f"<si><t>{text}</t></si>" for text in strings)
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("xl/workbook.xml", f'<workbook {ns} {rel_ns}><sheets>'
+                                       '<sheet name="1" sheetId="1" r:id="rId1"/></sheets></workbook>')
+        zf.writestr("xl/_rels/workbook.xml.rels",
+                    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                    f'<Relationship Id="rId1" Type="{rel_type}worksheet" Target="worksheets/sheet1.xml"/>'
+                    f'<Relationship Id="rId2" Type="{rel_type}sharedStrings" Target="sharedStrings.xml"/>'
+                    '</Relationships>')
+        zf.writestr("xl/worksheets/sheet1.xml", f'<worksheet {ns}><sheetData><row r="17">'
+                    '<c r="E17" t="s"><v>0</v></c><c r="F17" t="s"><v>1</v></c><c r="O17" t="s"><v>2</v></c>'
+                    '</row></sheetData></worksheet>')
+        zf.writestr("xl/sharedStrings.xml", f'<sst {ns}>{items}</sst>')
+    return path
+
+
+def test_only_new_or_changed_sheets_are_rescanned(tmp_path):
+    import transaction_ledger
+
+    transaction_ledger._sheet_records_cache.clear()
+    first = build_ledger(build_workbook(str(tmp_path / "a.xlsx"), days=3))
+    assert first.scanned_sheets == ["1", "2", "3"]
+
+    # 隔天多一張工作表:只掃描第 4 張,結果與完整掃描相同
+    path = build_workbook(str(tmp_path / "b.xlsx"), days=4)
+    second = build_ledger(path)
+    assert second.scanned_sheets == ["4"]
+    assert second.product_sales_counts() == {code: 12 for code in CONSULTANTS}
+
+    wb = openpyxl.load_workbook(path)
+    wb["2"]["F17"] = "購療程"
+    wb.save(path)
+    third = build_ledger(path)
+    assert third.scanned_sheets == ["2"]
+    assert third.product_sales_counts()[CONSULTANTS[0]] == 11
+
+
+def test_sheet_cache_checks_shared_strings(tmp_path):
+    first = build_ledger(_shared_string_workbook(str(tmp_path / "a.xlsx"), ["保養品", "購產品", "王小美"]))
+    assert first.product_sales_counts() == {"王小美": 1}
+
+    # 工作表 XML 完全相同,但共用字串內容不同,必須重新掃描
+    second = build_ledger(_shared_string_workbook(str(tmp_path / "b.xlsx"), ["保養品", "購產品", "李大華"]))
+    assert second.scanned_sheets == ["1"]
+    assert second.product_sales_counts() == {"李大華": 1}
+
+    third = build_ledger(_shared_string_workbook(str(tmp_path / "c.xlsx"), ["保養品", "購產品", "李大華"]))
+    assert third.scanned_sheets == []
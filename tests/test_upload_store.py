@@ -0,0 +1,130 @@
+import gc
+import threading
+
+import streamlit_app
+from transaction_ledger import build_ledger
+from upload_store import UploadStore, content_digest
+from sheet_loader import load_latest_sheet
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_same_content_is_stored_once():
+    store = UploadStore()
+    first = store.put(b"workbook")
+    second = store.put(bytearray(b"workbook"))
+    assert first.digest == second.digest == content_digest(b"workbook")
+    assert store.get(first.digest) is store.get(second.digest)
+    assert store.stats() == {"entries": 1, "bytes": 8, "references": 2}
+
+
+def test_released_handles_expire_after_ttl():
+    clock = FakeClock()
+    store = UploadStore(ttl=10, clock=clock)
+    kept = store.put(b"kept")
+    dropped = store.put(b"dropped").digest
+    gc.collect()
+    assert store.stats()["references"] == 1
+
+    clock.now = 11
+    assert store.evict() == 1
+    # 仍有 session 持有的檔案即使逾時也不會被移除
+    assert kept.digest in store
+    assert store.get(dropped) is None
+
+    del kept
+    gc.collect()
+    clock.now = 30
+    assert len(store) == 0
+
+
+def test_unreferenced_entries_evicted_in_lru_order_over_capacity():
+    store = UploadStore(max_bytes=10)
+    a = store.put(b"aaaa").digest
+    b = store.put(b"bbbb").digest
+    gc.collect()
+    store.get(a)
+    store.put(b"cccc")
+    assert a in store
+    assert b not in store
+    assert store.stats()["bytes"] == 8
+
+
+def test_derived_results_computed_once_across_threads(workbook_path):
+    with open(workbook_path, "rb") as f:
+        data = f.read()
+    store = UploadStore()
+    handle = store.put(data)
+    calls = []
+
+    def parse(raw):
+        calls.append(1)
+        return load_latest_sheet(raw)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(store.derived(handle.digest, "sheet", parse)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_calculators_share_parsed_sheet_and_ledger(workbook_path):
+    with open(workbook_path, "rb") as f:
+        data = f.read()
+    store = UploadStore()
+    handles = [store.put(data) for _ in range(2)]
+    calculators = [streamlit_app.OnlyBeautySalaryCalculator() for _ in handles]
+    for calculator, handle in zip(calculators, handles):
+        assert calculator.load_upload(store, handle.digest)
+
+    assert calculators[0].excel_data is calculators[1].excel_data
+    assert calculators[0].get_ledger() is calculators[1].get_ledger()
+    assert calculators[0].get_product_sales_statistics() == \
+        calculators[0].resolve_product_sales(build_ledger(data).product_sales_counts())
+
+
+class FakeUpload:
+    def __init__(self, path, name):
+        with open(path, "rb") as f:
+            self.data = f.read()
+        self.name = self.file_id = name
+
+    def getvalue(self):
+        return self.data
+
+
+def test_store_uploads_survive_eviction_until_calculated(workbook_path, history_db, monkeypatch):
+    from calc_worker import CalcWorker, DONE
+    from payroll_history import PayrollHistory
+
+    clock = FakeClock()
+    store = UploadStore(max_bytes=1, ttl=10, clock=clock)
+    monkeypatch.setattr(streamlit_app, "get_upload_store", lambda: store)
+    monkeypatch.delitem(streamlit_app.st.session_state, "store_uploads", raising=False)
+    entries = streamlit_app.load_store_uploads([FakeUpload(workbook_path, "新竹店.xlsx")])
+    calculator = entries[0]["calculator"]
+    calculator.staff_count = 3
+
+    # 上傳後、計算前:其他上傳使儲存區超過容量,且閒置超過 TTL
+    gc.collect()
+    clock.now = 100
+    other = store.put(b"other upload")
+    store.evict()
+    assert entries[0]["digest"] in store and other.digest in store
+
+    job, _ = CalcWorker().submit("k", streamlit_app.store_batch_stages([{
+        "calculator": calculator, "high_target_amount": None, "store": "新竹店", "period": "2024-12",
+        "filename": "新竹店.xlsx"}], PayrollHistory(history_db)))
+    assert job.join(10)
+    assert job.state == DONE and job.context["stores"][0]["success"]
+    streamlit_app.st.session_state.pop("store_uploads")
@@ -0,0 +1,105 @@
+import io
+
+import pandas as pd
+import pytest
+
+from conftest import build_workbook
+from transaction_ledger import build_ledger
+from sheet_loader import load_latest_sheet
+from workbook_reader import (
+    BufferReader,
+    WorkbookFormatError,
+    WorkbookSession,
+    load_sheet_index,
+    open_xlsx,
+    select_latest_sheet,
+    sheet_sort_key,
+)
+
+
+@pytest.mark.parametrize("name", ["1.5", "05", "0", "32", "2024-12", "202413", "說明", ""])
+def test_sheet_grammar_rejects(name):
+    assert sheet_sort_key(name) is None
+
+
+def test_select_latest_sheet_prefers_month_over_days():
+    assert select_latest_sheet(["5", "31", "說明"]) == "31"
+    assert select_latest_sheet(["31", "202412", "202411"]) == "202412"
+    assert select_latest_sheet(["1.5", "說明"]) is None
+
+
+def test_latest_sheet_matches_pandas(tmp_path):
+    path = build_workbook(str(tmp_path / "store.xlsx"), days=12, extra_sheets=("05", "1.5"))
+    name, frame = load_latest_sheet(path)
+    assert name == "12"
+    expected = pd.read_excel(path, sheet_name="12", header=None)
+    assert frame.shape == expected.shape
+    pd.testing.assert_frame_equal(frame.astype(object), expected.astype(object), check_dtype=False)
+
+
+def test_sheet_index_is_cached(workbook_path):
+    with open_xlsx(workbook_path) as zf:
+        first = load_sheet_index(zf)
+    with open(workbook_path, "rb") as f:
+        with open_xlsx(f.read()) as zf:
+            assert load_sheet_index(zf) is first
+
+
+def test_in_memory_sources_load_without_copies(workbook_path):
+    with open(workbook_path, "rb") as f:
+        data = f.read()
+    name, expected = load_latest_sheet(workbook_path)
+    buffer = bytearray(data)
+    for source in (data, buffer, memoryview(buffer), memoryview(data)[0:], io.BytesIO(data)):
+        got_name, frame = load_latest_sheet(source)
+        assert got_name == name
+        pd.testing.assert_frame_equal(frame, expected)
+    assert build_ledger(memoryview(buffer)).product_sales_counts() == build_ledger(workbook_path).product_sales_counts()
+
+
+def test_buffer_reader_reads_and_seeks_within_view():
+    reader = BufferReader(memoryview(b"0123456789")[2:8])
+    assert reader.read(3) == b"234"
+    assert reader.seek(-2, io.SEEK_END) == 4
+    assert reader.read() == b"67"
+    assert reader.read(5) == b""
+    reader.seek(1)
+    target = bytearray(2)
+    assert reader.readinto(target) == 2 and target == b"34"
+    with pytest.raises(OSError):
+        reader.seek(-1)
+    with pytest.raises(WorkbookFormatError):
+        load_latest_sheet(memoryview(b"junk"))
+
+
+def test_no_numeric_sheet_raises(tmp_path):
+    path = build_workbook(str(tmp_path / "store.xlsx"), days=0, extra_sheets=("說明",))
+    with pytest.raises(WorkbookFormatError):
+        load_latest_sheet(path)
+
+
+def test_session_frames_match_pandas_and_share_tables(tmp_path):
+    import datetime
+
+    import openpyxl
+
+    path = str(tmp_path / "store.xlsx")
+    build_workbook(path, days=3)
+    wb = openpyxl.load_workbook(path)
+    wb["2"]["B2"] = datetime.datetime(2024, 12, 5)
+    wb["2"]["B2"].number_format = "yyyy/mm/dd"
+    wb.save(path)
+
+    with WorkbookSession(path) as session:
+        tables = session.tables
+        frames = dict(session.iter_frames())
+    assert list(frames) == ["1", "2", "3"]
+    for name, frame in frames.items():
+        expected = pd.read_excel(path, sheet_name=name, header=None)
+        pd.testing.assert_frame_equal(frame.astype(object), expected.astype(object), check_dtype=False)
+    assert frames["2"].iloc[1, 1] == datetime.datetime(2024, 12, 5)
+
+    # 同一份內容再次開啟時共用已解析的字串/樣式表,重複字串為同一物件
+    with open(path, "rb") as f, WorkbookSession(f.read()) as session:
+        assert session.tables is tables
+    assert frames["1"].iloc[16, 14] is frames["3"].iloc[16, 14]
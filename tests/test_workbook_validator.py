@@ -0,0 +1,49 @@
+import openpyxl
+
+from conftest import build_workbook
+from workbook_validator import validate_workbook
+
+
+def test_valid_workbook_has_no_problems(workbook_path):
+    assert validate_workbook(workbook_path) == []
+
+
+def test_accepts_bytes(workbook_path):
+    with open(workbook_path, "rb") as fh:
+        assert validate_workbook(fh.read()) == []
+
+
+def test_not_a_zip():
+    problems = validate_workbook(b"not an excel file")
+    assert problems == ["不是有效的 Excel (.xlsx) 檔案"]
+
+
+def test_no_numeric_sheets(tmp_path):
+    path = tmp_path / "doctor.xlsx"
+    wb = openpyxl.Workbook()
+    wb.active.title = "醫師薪資"
+    wb.save(path)
+    problems = validate_workbook(str(path))
+    assert len(problems) == 1
+    assert "找不到數字名稱的工作表" in problems[0]
+    assert "醫師薪資" in problems[0]
+
+
+def test_reports_each_layout_problem(tmp_path):
+    path = build_workbook(str(tmp_path / "bad.xlsx"), days=2)
+    wb = openpyxl.load_workbook(path)
+    ws = wb["2"]
+    ws["E5"] = "業績"
+    ws["E7"] = None
+    ws["A9"] = None
+    ws["K10"] = 123
+    ws["O9"] = "三萬"
+    wb.save(path)
+    problems = validate_workbook(path)
+    assert problems == [
+        "工作表 '2' 的 E5 (當月實際總業績) 不是數字: '業績'",
+        "工作表 '2' 的 E7 (當月總消耗) 是空白",
+        "工作表 '2' 的 A9 (第一位顧問名稱) 是空白",
+        "工作表 '2' 的 O9 (底薪) 不是數字: '三萬'",
+        "工作表 '2' 的 K10 (美容師名稱) 應為文字,卻是數字: 123",
+    ]
@@ -0,0 +1,266 @@
+"""
+Only Beauty 薪資計算系統 - 月底獎金預測
+
+月中只有 1 ~ d 日的日報工作表 (每張都是當月累計的 E5/E7 與顧問 C/G 欄)。
+這裡把每天的增量當成樣本,以 bootstrap 抽樣模擬剩餘天數,
+一次產生數千條月底路徑 (全部以 NumPy 陣列運算),再在每條路徑上套用
+與計算器相同的級距規則,得到門店跨級機率與每位顧問的獎金分布:
+
+    snapshots = read_daily_snapshots(file_bytes)
+    result = forecast_bonuses(calculator, snapshots, days_in_month=31, high_target=4000000)
+    result.store_summary()          # 跨下一級、達高標的機率
+    result.consultant_frame()       # 每位顧問獎金的平均與 P10/P50/P90
+
+模型假設:剩餘每一天的 (門店業績, 門店消耗, 各顧問業績/消耗) 會是已發生某一天增量的重演,
+整天一起抽樣以保留顧問之間的相關性;產品達標依目前組數的日均進度線性推估。
+"""
+
+import calendar
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from money import DEFAULT_ROUNDING, RoundingPolicy, from_cents, full_amount_cents, progressive_cents, to_cents
+from salary_log import get_logger
+from transaction_ledger import LEDGER_FIRST_ROW
+from sheet_loader import open_sheets
+from sheet_source import SheetSource
+from workbook_reader import DAY_SHEET_PATTERN
+
+logger = get_logger('forecast')
+
+DEFAULT_PATHS = 5000
+
+# 日報版面:E5 門店業績、E7 門店消耗,A9 起顧問 (C=業績, G=消耗)
+_STORE_CELLS = {(4, 4): 'performance', (6, 4): 'consumption'}
+_CONSULTANT_FIRST_ROW = 8
+_SNAPSHOT_COLUMNS = frozenset({0, 2, 4, 6})
+
+
+class DailySnapshots(NamedTuple):
+    """各日報工作表的當月累計值;陣列的列依日期排序"""
+    days: np.ndarray                    # (d,) 日期
+    store: np.ndarray                   # (d, 2) 門店累計業績/消耗
+    consultants: List[str]
+    performance: np.ndarray             # (d, n) 顧問累計業績
+    consumption: np.ndarray             # (d, n) 顧問累計消耗
+
+
+def _read_day(session: SheetSource, sheet_name: str):
+    store = {'performance': 0.0, 'consumption': 0.0}
+    rows: Dict[int, Dict[int, object]] = {}
+    for row, col, value in session.iter_values(sheet_name, 4, _SNAPSHOT_COLUMNS, max_row=LEDGER_FIRST_ROW):
+        field = _STORE_CELLS.get((row, col))
+        if field is not None and isinstance(value, (int, float)):
+            store[field] = float(value)
+        elif row >= _CONSULTANT_FIRST_ROW:
+            rows.setdefault(row, {})[col] = value
+    # 與 get_consultants_data 相同:A 欄遇到空白即結束,略過「公司」
+    consultants = {}
+    row = _CONSULTANT_FIRST_ROW
+    while row in rows and str(rows[row].get(0, '')).strip():
+        name = str(rows[row][0]).strip()
+        if name != '公司':
+            values = rows[row]
+            consultants[name] = tuple(float(values[col]) if isinstance(values.get(col), (int, float)) else 0.0
+                                      for col in (2, 6))
+        row += 1
+    return store, consultants
+
+
+def read_daily_snapshots(source) -> DailySnapshots:
+    """讀取所有日報工作表 (1 ~ 31) 的累計值;只讀各表第 16 列以前,不碰交易明細"""
+    if not isinstance(source, SheetSource):
+        with open_sheets(source) as session:
+            return read_daily_snapshots(session)
+    days = sorted((int(name), name) for name in source.sheet_names if DAY_SHEET_PATTERN.match(name))
+    if not days:
+        raise ValueError('沒有日報工作表 (1 ~ 31),無法預測')
+    daily = [_read_day(source, name) for _, name in days]
+    # 以最新一天的顧問名單為準;某天沒有出現的顧問沿用前一天的累計值
+    names = list(daily[-1][1])
+    performance = np.zeros((len(days), len(names)))
+    consumption = np.zeros((len(days), len(names)))
+    for i, (_, consultants) in enumerate(daily):
+        for j, name in enumerate(names):
+            if name in consultants:
+                performance[i, j], consumption[i, j] = consultants[name]
+            elif i:
+                performance[i, j], consumption[i, j] = performance[i - 1, j], consumption[i - 1, j]
+    store = np.array([[s['performance'], s['consumption']] for s, _ in daily])
+    return DailySnapshots(np.array([day for day, _ in days]), store, names, performance, consumption)
+
+
+def days_in_period(period: str) -> int:
+    """YYYY-MM 期間的天數"""
+    year, month = (int(part) for part in period.split('-'))
+    return calendar.monthrange(year, month)[1]
+
+
+def progressive_bonus(amounts: np.ndarray, levels: List[tuple], rounding: RoundingPolicy = DEFAULT_ROUNDING) -> np.ndarray:
+    """calc_progressive_bonus 的向量版:每一級只計入落在 (下限, 上限] 的部分 (以分計算)"""
+    return from_cents(progressive_cents(np.asarray(to_cents(amounts)), levels, rounding))
+
+
+def full_amount_bonus(amounts: np.ndarray, levels: List[tuple], rounding: RoundingPolicy = DEFAULT_ROUNDING) -> np.ndarray:
+    """calc_full_amount_bonus 的向量版:整筆金額 × 所落最高級距的費率 (以分計算)"""
+    return from_cents(full_amount_cents(np.asarray(to_cents(amounts)), levels, rounding))
+
+
+def next_tier_floor(amount: float, levels: List[tuple]) -> Optional[float]:
+    """下一個級距的起點;已在最高級時回傳 None"""
+    for min_val, _, _ in levels:
+        if amount <= min_val:
+            return min_val
+    return None
+
+
+def individual_levels(calculator, name: str, cfg: Dict = None) -> tuple:
+    """與 calculate_individual_bonus 相同的角色判斷,回傳 (角色, 計算方式, 業績級距, 消耗級距)"""
+    cfg = cfg or {}
+    role = cfg.get('role') or ('店長' if name == calculator.manager_name else '顧問')
+    if role == '店長':
+        perf_levels, cons_levels = calculator.manager_performance_levels, calculator.manager_consumption_levels
+    elif role == '副店長':
+        perf_levels, cons_levels = calculator.deputy_performance_levels, calculator.deputy_consumption_levels
+    else:
+        perf_levels, cons_levels = calculator.consultant_performance_levels, calculator.consultant_consumption_levels
+    return role, cfg.get('mode', '階梯'), perf_levels, cons_levels
+
+
+def simulate_month_end(snapshots: DailySnapshots, days_in_month: int, paths: int = DEFAULT_PATHS,
+                       seed: int = None) -> Dict[str, np.ndarray]:
+    """模擬月底累計值:{'store': (P, 2), 'performance': (P, n), 'consumption': (P, n)}
+
+    每一天的增量 (累計值差分,跳過的日期平均分攤) 視為一個樣本,
+    以多項分配抽出剩餘天數中每個樣本重演幾次,再一次矩陣相乘得到所有路徑。
+    """
+    days = snapshots.days
+    values = np.hstack([snapshots.store, snapshots.performance, snapshots.consumption])
+    gaps = np.diff(days, prepend=0).astype(float)
+    increments = np.diff(values, axis=0, prepend=np.zeros((1, values.shape[1]))) / gaps[:, None]
+
+    remaining = max(int(days_in_month) - int(days[-1]), 0)
+    rng = np.random.default_rng(seed)
+    draws = rng.multinomial(remaining, np.full(len(days), 1 / len(days)), size=paths)
+    final = values[-1] + draws @ increments
+
+    n = len(snapshots.consultants)
+    return {'store': final[:, :2], 'performance': final[:, 2:2 + n], 'consumption': final[:, 2 + n:]}
+
+
+def project_product_qualified(product_sales: Dict[str, int], elapsed_days: int, days_in_month: int,
+                              target_sets: int) -> Dict[str, bool]:
+    """依目前產品組數的日均進度推估月底是否達標 (target_sets 組)"""
+    scale = days_in_month / max(elapsed_days, 1)
+    return {name: count * scale >= target_sets for name, count in product_sales.items()}
+
+
+class ForecastResult:
+    """模擬結果:門店月底分布與每位顧問各項獎金的路徑矩陣 (P, n)"""
+
+    def __init__(self, store: np.ndarray, consultants: List[str], bonuses: Dict[str, np.ndarray],
+                 performance: np.ndarray, current: Dict[str, float], next_tiers: Dict[str, Optional[float]],
+                 high_target: Optional[float], performance_gate: float):
+        self.store = store
+        self.consultants = consultants
+        self.bonuses = bonuses
+        self.performance = performance
+        self.current = current
+        self.next_tiers = next_tiers
+        self.high_target = high_target
+        self.performance_gate = performance_gate
+
+    @property
+    def total_bonus(self) -> np.ndarray:
+        return sum(self.bonuses.values())
+
+    def store_summary(self) -> Dict[str, object]:
+        """門店月底業績/消耗的分位數,以及跨下一級與達高標的機率"""
+        summary = {'paths': len(self.store)}
+        for i, field in enumerate(('performance', 'consumption')):
+            column = self.store[:, i]
+            floor = self.next_tiers[field]
+            summary[field] = {
+                'current': self.current[field],
+                'p10': float(np.percentile(column, 10)),
+                'p50': float(np.percentile(column, 50)),
+                'p90': float(np.percentile(column, 90)),
+                'next_tier': floor,
+                'next_tier_probability': None if floor is None else float(np.mean(column > floor)),
+            }
+        if self.high_target:
+            summary['high_target_probability'] = float(np.mean(self.store[:, 0] >= self.high_target))
+        return summary
+
+    def consultant_frame(self) -> pd.DataFrame:
+        """每位顧問的預期獎金 (平均、P10/P50/P90) 與業績達 168 萬的機率"""
+        total = self.total_bonus
+        frame = pd.DataFrame({
+            'name': self.consultants,
+            'expected_bonus': total.mean(axis=0),
+            'p10': np.percentile(total, 10, axis=0),
+            'p50': np.percentile(total, 50, axis=0),
+            'p90': np.percentile(total, 90, axis=0),
+            'performance_p50': np.percentile(self.performance, 50, axis=0),
+            'threshold_probability': (self.performance >= self.performance_gate).mean(axis=0),
+        })
+        for key, values in self.bonuses.items():
+            frame[key] = values.mean(axis=0)
+        return frame
+
+
+def forecast_bonuses(calculator, snapshots: DailySnapshots, days_in_month: int, high_target: float = None,
+                     role_config: Dict = None, product_qualified: Dict[str, bool] = None,
+                     paths: int = DEFAULT_PATHS, seed: int = None) -> ForecastResult:
+    """在每條模擬路徑上套用計算器的團體/個人級距,回傳 ForecastResult
+
+    calculator 只用到它的級距表、rules 與 manager_name,規則與 calculate_consultant_bonus、
+    calculate_individual_bonus 相同;product_qualified 未列出的顧問視為達標。
+    """
+    simulated = simulate_month_end(snapshots, days_in_month, paths, seed)
+    store_perf, store_cons = simulated['store'][:, 0], simulated['store'][:, 1]
+    performance, consumption = simulated['performance'], simulated['consumption']
+    rules = calculator.rules
+    role_config = role_config or {}
+    product_qualified = product_qualified or {}
+
+    performance_pool = progressive_bonus(store_perf, calculator.performance_bonus_levels) * rules.consultant_performance_share
+    consumption_pool = progressive_bonus(store_cons, calculator.consumption_bonus_levels) * rules.consultant_consumption_share
+    total_consultant_performance = performance.sum(axis=1)
+
+    qualified = np.array([product_qualified.get(name, True) for name in snapshots.consultants])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        performance_share = np.where(total_consultant_performance[:, None] > 0,
+                                     performance / total_consultant_performance[:, None], 0.0)
+        consumption_share = np.where(store_cons[:, None] > 0, consumption / store_cons[:, None], 0.0)
+    team_performance = np.where(performance >= rules.performance_bonus_gate,
+                                performance_pool[:, None] * performance_share, 0.0) * qualified
+    team_consumption = np.where(performance >= rules.consumption_bonus_gate,
+                                consumption_pool[:, None] * consumption_share, 0.0) * qualified
+
+    individual_performance = np.empty_like(performance)
+    individual_consumption = np.empty_like(consumption)
+    for j, name in enumerate(snapshots.consultants):
+        _, mode, perf_levels, cons_levels = individual_levels(calculator, name, role_config.get(name))
+        calc = full_amount_bonus if mode == '全額' else progressive_bonus
+        individual_performance[:, j] = calc(performance[:, j], perf_levels)
+        individual_consumption[:, j] = calc(consumption[:, j], cons_levels)
+
+    incentive = np.zeros_like(performance)
+    if high_target:
+        incentive = np.where((performance >= rules.performance_incentive_gate) & (store_perf[:, None] >= high_target),
+                             float(rules.performance_incentive_bonus), 0.0)
+
+    current = {'performance': float(snapshots.store[-1, 0]), 'consumption': float(snapshots.store[-1, 1])}
+    next_tiers = {'performance': next_tier_floor(current['performance'], calculator.performance_bonus_levels),
+                  'consumption': next_tier_floor(current['consumption'], calculator.consumption_bonus_levels)}
+    logger.debug("月底預測: %d 條路徑, 已過 %d / %d 天", paths, int(snapshots.days[-1]), days_in_month)
+    return ForecastResult(simulated['store'], snapshots.consultants, {
+        'team_performance_bonus': team_performance,
+        'team_consumption_bonus': team_consumption,
+        'individual_performance_bonus': individual_performance,
+        'individual_consumption_bonus': individual_consumption,
+        'performance_incentive_bonus': incentive,
+    }, performance, current, next_tiers, high_target, rules.performance_bonus_gate)
@@ -0,0 +1,144 @@
+"""
+Only Beauty 薪資計算系統 - 背景計算工作
+
+Streamlit 按下計算後不再在腳本執行緒裡同步跑完整個流程,而是交給 session 專屬的
+CalcWorker 在背景執行緒依序執行各個階段;畫面只輪詢進度,期間仍可操作、也可取消:
+
+    worker = CalcWorker()
+    job, started = worker.submit(job_key(inputs), [
+        ('統計 VIP 項目', lambda ctx: ...),
+        ('計算團體獎金', lambda ctx: ...),
+    ], context={})
+    job.progress()          # (已完成階段數, 總階段數)
+    job.cancel()            # 目前階段結束後停止
+
+相同輸入 (job_key 相同) 在計算中或已完成時重複送出,會直接回傳原本的工作而不重算;
+不同輸入會取消尚未完成的舊工作再開始新的。階段函式不可呼叫 st.*,結果寫入 context。
+"""
+
+import hashlib
+import json
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from salary_log import get_logger
+
+logger = get_logger('worker')
+
+PENDING, RUNNING, DONE, FAILED, CANCELLED = 'pending', 'running', 'done', 'failed', 'cancelled'
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+Stage = Tuple[str, Callable[[Dict], None]]
+
+
+class CalculationCancelled(Exception):
+    """計算在階段之間被取消"""
+
+
+def job_key(inputs: Dict) -> str:
+    """計算輸入的指紋 (上傳檔雜湊、人數、期間、角色設定等);相同指紋視為重複送出"""
+    payload = json.dumps(inputs, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class CalcJob:
+    """一次背景計算;狀態由工作執行緒更新,畫面端只讀取"""
+
+    def __init__(self, key: str, stages: List[Stage], context: Dict):
+        self.key = key
+        self.stages = stages
+        self.context = context
+        self.state = PENDING
+        self.completed = 0
+        self.stage_label: Optional[str] = None
+        self.error: Optional[BaseException] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._cancel = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.state in FINISHED_STATES
+
+    def progress(self) -> Tuple[int, int]:
+        return self.completed, len(self.stages)
+
+    def cancel(self):
+        """要求取消;目前執行中的階段跑完後停止,之後的階段不會執行"""
+        self._cancel.set()
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel.is_set()
+
+    def check_cancelled(self):
+        """供長時間的階段自行呼叫,及早中止"""
+        if self._cancel.is_set():
+            raise CalculationCancelled()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=f'calc-{self.key[:8]}', daemon=True)
+        self._thread.start()
+
+    def join(self, timeout: float = None) -> bool:
+        """等待工作結束,回傳是否已結束"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.finished
+
+    def _run(self):
+        self.started_at = time.monotonic()
+        self.state = RUNNING
+        try:
+            for label, stage in self.stages:
+                self.check_cancelled()
+                self.stage_label = label
+                stage(self.context)
+                self.completed += 1
+            self.state = DONE
+        except CalculationCancelled:
+            self.state = CANCELLED
+            logger.info("計算已取消 (完成 %d/%d 個階段)", self.completed, len(self.stages))
+        except Exception as e:
+            self.error = e
+            self.state = FAILED
+            logger.exception("背景計算在「%s」階段失敗", self.stage_label)
+        finally:
+            self.finished_at = time.monotonic()
+
+
+class CalcWorker:
+    """每個 session 一個;同一時間只執行一個計算工作"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.job: Optional[CalcJob] = None
+
+    def submit(self, key: str, stages: List[Stage], context: Dict = None) -> Tuple[CalcJob, bool]:
+        """送出計算,回傳 (工作, 是否新開始)
+
+        與目前工作輸入相同且未失敗/取消時視為重複送出,直接回傳目前的工作。
+        """
+        with self._lock:
+            current = self.job
+            if current is not None and current.key == key and current.state not in (FAILED, CANCELLED) \
+                    and not current.cancel_requested:
+                logger.info("忽略重複送出的計算 (%s)", key[:8])
+                return current, False
+            if current is not None and not current.finished:
+                current.cancel()
+            self.job = CalcJob(key, stages, context if context is not None else {})
+            self.job.start()
+            return self.job, True
+
+    def cancel(self):
+        with self._lock:
+            if self.job is not None and not self.job.finished:
+                self.job.cancel()
+
+    @property
+    def busy(self) -> bool:
+        job = self.job
+        return job is not None and not job.finished
@@ -0,0 +1,149 @@
+"""
+Only Beauty 薪資計算系統 - 精簡的 JSON 回應
+
+計算結果是「人名 → {欄位: 值}」的巢狀 dict,每個人都重複一次 team_consumption_bonus 這類
+長欄位名稱;多門店時還要再乘上門店數。這裡把同一結構的資料列改成欄位清單 + 資料列陣列:
+
+    {"王小美": {"performance_bonus": 0, ...}, "李大華": {...}}
+    → {"$columnar": "mapping", "keys": ["王小美", "李大華"], "fields": ["performance_bonus", ...],
+       "rows": [[0, ...], [...]]}
+
+    [{"store": "新竹店", ...}, {"store": "台中店", ...}]
+    → {"$columnar": "records", "fields": ["store", ...], "rows": [["新竹店", ...], ["台中店", ...]]}
+
+    body = dumps(pack(payload))                  # orjson (未安裝時改用標準 json)
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding'))
+    body = compress(body, encoding)              # br (需安裝 brotli) 或 gzip
+
+只有所有值都是欄位相同的 dict 才轉成表格,其他結構維持原樣,unpack(pack(x)) == x。
+前端 static/script.js 的 unpackColumnar 做相同的還原;壓縮由瀏覽器自動解開。
+"""
+
+import gzip
+import json
+from operator import itemgetter
+from typing import Dict, List, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COLUMNAR_KEY = '$columnar'
+MAPPING, RECORDS = 'mapping', 'records'
+
+# 小於這個大小的回應不壓縮 (壓縮標頭與 CPU 成本不划算)
+MIN_COMPRESS_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+# 不需遞迴處理的儲存格型別
+SCALAR_TYPES = frozenset((str, int, float, bool, type(None)))
+
+
+def _table_fields(rows: List) -> Optional[List[str]]:
+    """rows 全是欄位相同且非空的 dict 時回傳欄位清單,否則 None"""
+    if not rows or not isinstance(rows[0], dict) or not rows[0]:
+        return None
+    keys = rows[0].keys()
+    for row in rows:
+        if not isinstance(row, dict) or row.keys() != keys:
+            return None
+    return list(keys)
+
+
+def _rows(rows: List[Dict], fields: List[str]) -> List[list]:
+    """dict 資料列 → 依 fields 排列的值陣列;只有非純量的儲存格才遞迴處理"""
+    if len(fields) == 1:
+        cells = [[row[fields[0]]] for row in rows]
+    else:
+        getter = itemgetter(*fields)
+        cells = [list(getter(row)) for row in rows]
+    is_scalar = SCALAR_TYPES.__contains__
+    for values in cells:
+        if not all(map(is_scalar, map(type, values))):
+            values[:] = [value if type(value) in SCALAR_TYPES else pack(value) for value in values]
+    return cells
+
+
+def pack(value):
+    """將同一結構的 dict 集合轉成欄位清單 + 資料列;其他值遞迴處理後維持原樣"""
+    if isinstance(value, dict):
+        rows = list(value.values())
+        fields = _table_fields(rows)
+        if fields is not None:
+            return {COLUMNAR_KEY: MAPPING, 'keys': [str(key) for key in value], 'fields': fields,
+                    'rows': _rows(rows, fields)}
+        return {str(key): pack(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        fields = _table_fields(value)
+        if fields is not None:
+            return {COLUMNAR_KEY: RECORDS, 'fields': fields, 'rows': _rows(value, fields)}
+        return [pack(item) for item in value]
+    return value
+
+
+def unpack(value):
+    """pack 的反向轉換"""
+    if isinstance(value, dict):
+        kind = value.get(COLUMNAR_KEY)
+        if kind is None:
+            return {key: unpack(item) for key, item in value.items()}
+        fields = value['fields']
+        rows = [{field: unpack(cell) for field, cell in zip(fields, row)} for row in value['rows']]
+        return dict(zip(value['keys'], rows)) if kind == MAPPING else rows
+    if isinstance(value, list):
+        return [unpack(item) for item in value]
+    return value
+
+
+def dumps(payload) -> bytes:
+    """UTF-8 JSON;有 orjson 時使用 orjson (數值、numpy 純量與非字串鍵也可直接序列化)"""
+    if orjson is not None:
+        return orjson.dumps(payload, default=str, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+
+
+def _accepted(accept_encoding: str) -> Dict[str, float]:
+    """解析 Accept-Encoding,回傳 {編碼: q 值}"""
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            key, _, number = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    q = float(number)
+                except ValueError:
+                    q = 0.0
+        accepted[name.strip().lower()] = q
+    return accepted
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """依 Accept-Encoding 選擇壓縮方式:br (已安裝 brotli 時優先) > gzip;都不接受時 None"""
+    accepted = _accepted(accept_encoding)
+    candidates = (['br'] if brotli is not None else []) + ['gzip']
+    wildcard = accepted.get('*', 0.0)
+    for encoding in candidates:
+        if accepted.get(encoding, wildcard) > 0:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: Optional[str]) -> bytes:
+    """以選定的編碼壓縮回應內容"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    return body
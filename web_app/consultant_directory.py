@@ -0,0 +1,118 @@
+"""
+Only Beauty 薪資計算系統 - 顧問名稱/代號對照
+
+產品銷售是依交易明細 O 欄的顧問代號統計,顧問獎金則以 A9 起的顧問名稱計算。
+兩邊的寫法常有差異 (全形/半形、多餘空白、只寫名字不寫姓),這裡從活頁簿的
+顧問名單建立一次別名索引,之後每個代號的解析都是一次字典查詢:
+
+    directory = ConsultantDirectory(['王小美', '李大華'])
+    directory.resolve('王 小美')      # → '王小美'
+    directory.resolve('ＯＢ０１')      # 無法對應 → None,並記錄在 unmatched_codes
+"""
+
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from salary_log import get_logger
+
+logger = get_logger('directory')
+
+_WHITESPACE = re.compile(r'\s+')
+
+# 以部分名稱比對時,代號至少要有的字數 (避免單一字誤配)
+MIN_PARTIAL_LENGTH = 2
+
+
+def normalize_name(value) -> str:
+    """名稱正規化:NFKC (全形轉半形) → 去除所有空白 → 不分大小寫"""
+    if value is None:
+        return ''
+    text = unicodedata.normalize('NFKC', str(value))
+    return _WHITESPACE.sub('', text).casefold()
+
+
+class ConsultantDirectory:
+    """顧問名稱 ↔ 代號對照表
+
+    解析順序:完全相同 → 明確別名 (aliases) → 正規化後相同 →
+    正規化後為唯一一位顧問名稱的一部分 (例如「小美」→「王小美」)。
+    解析結果會記在索引中,同一代號只比對一次。
+    """
+
+    def __init__(self, names: Iterable[str], aliases: Dict[str, str] = None):
+        self.names: List[str] = []
+        self._index: Dict[str, Optional[str]] = {}
+        self._normalized: Dict[str, str] = {}
+        self.unmatched_codes: Dict[str, int] = {}
+
+        for name in names:
+            name = str(name).strip()
+            if not name or name in self._index:
+                continue
+            self.names.append(name)
+            self._index[name] = name
+            self._normalized.setdefault(normalize_name(name), name)
+        for alias, name in (aliases or {}).items():
+            canonical = self.resolve(name)
+            if canonical is not None:
+                self._index[str(alias).strip()] = canonical
+                self._normalized.setdefault(normalize_name(alias), canonical)
+
+    def __contains__(self, name: str) -> bool:
+        # 只有顧問名稱在索引中對應到自己 (別名與已解析的代號都對應到其他名稱或 None)
+        return name is not None and self._index.get(name) == name
+
+    def resolve(self, code) -> Optional[str]:
+        """代號 → 顧問名稱;無法對應時回傳 None"""
+        key = str(code).strip() if code is not None else ''
+        try:
+            return self._index[key]
+        except KeyError:
+            pass
+        name = self._match(normalize_name(key))
+        self._index[key] = name
+        return name
+
+    def _match(self, normalized: str) -> Optional[str]:
+        if not normalized:
+            return None
+        name = self._normalized.get(normalized)
+        if name is not None:
+            return name
+        if len(normalized) < MIN_PARTIAL_LENGTH:
+            return None
+        candidates = {name for key, name in self._normalized.items() if normalized in key}
+        return candidates.pop() if len(candidates) == 1 else None
+
+    def resolve_counts(self, counts: Dict[str, int]) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """將以代號統計的次數合併到顧問名稱上
+
+        回傳 (依顧問名稱合併後的次數, 無法對應的代號與次數);
+        無法對應的代號同時記在 unmatched_codes。
+        """
+        resolved: Dict[str, int] = {}
+        unmatched: Dict[str, int] = {}
+        for code, count in counts.items():
+            name = self.resolve(code)
+            if name is None:
+                unmatched[code] = unmatched.get(code, 0) + count
+            else:
+                resolved[name] = resolved.get(name, 0) + count
+        for code, count in unmatched.items():
+            self.unmatched_codes[code] = self.unmatched_codes.get(code, 0) + count
+        if unmatched:
+            logger.warning("無法對應到顧問名單的代號: %s", '、'.join(unmatched))
+        return resolved, unmatched
+
+    def index_by_name(self, records: Dict[str, dict]) -> Dict[str, dict]:
+        """將以代號或名稱為鍵的資料轉成以顧問名稱為鍵,供 O(1) 查詢;名稱完全相同的鍵優先"""
+        indexed: Dict[str, dict] = {}
+        for key, record in records.items():
+            if key in self:
+                indexed[key] = record
+        for key, record in records.items():
+            name = self.resolve(key)
+            if name is not None and name not in indexed:
+                indexed[name] = record
+        return indexed
@@ -0,0 +1,144 @@
+"""
+Only Beauty 薪資計算系統 - 定點數金額運算
+
+金額一律以「分」(int64) 計算,費率與分配比例以百萬分之一 (ppm) 的整數表示,
+乘除之後只在最後一步依捨入規則取整。同樣的輸入在任何機器上都得到完全相同的結果,
+所有函式也都可直接套用在 NumPy int64 陣列上:
+
+    cents = to_cents([1800000, 2500000.5])                   # array([180000000, 250000050])
+    pool = progressive_cents(cents, calculator.performance_bonus_levels)
+    share_cents(pool, 0.7)                                   # 顧問 70%
+    mul_div(pool, weights, total, RoundingPolicy('floor'))   # 依比例分配
+    from_cents(pool)                                         # 輸出時才換回元
+
+捨入規則 (RoundingPolicy) 由 mode 與 step 組成:mode 為 half_up (四捨五入)、half_even
+(銀行家捨入)、floor (捨去) 或 ceiling (進位);step 為取整單位 (分),100 表示取整到元。
+"""
+
+from typing import NamedTuple, Union
+
+import numpy as np
+
+CENTS = 100
+RATE_SCALE = 1_000_000
+ROUNDING_MODES = ('half_up', 'half_even', 'floor', 'ceiling')
+
+# 無上限級距以 int64 最大值表示
+NO_LIMIT = np.iinfo(np.int64).max
+_INT64_LIMIT = 2 ** 63 - 1
+
+
+class RoundingPolicy(NamedTuple):
+    """單一項目的捨入規則"""
+    mode: str = 'half_up'
+    step: int = 1
+
+
+DEFAULT_ROUNDING = RoundingPolicy()
+
+
+def _scalar_or_array(values):
+    if np.ndim(values) == 0:
+        return int(values)
+    if values.dtype == object and np.abs(values).max(initial=0) <= _INT64_LIMIT:
+        return values.astype(np.int64)
+    return values
+
+
+def to_cents(amounts) -> Union[int, np.ndarray]:
+    """元 → 分 (四捨五入到分);NaN 視為 0"""
+    cents = np.rint(np.nan_to_num(np.asarray(amounts, dtype=float)) * CENTS).astype(np.int64)
+    return _scalar_or_array(cents)
+
+
+def from_cents(cents) -> Union[float, np.ndarray]:
+    """分 → 元 (float);只在輸出或顯示時使用"""
+    dollars = np.asarray(cents, dtype=np.int64) / CENTS
+    return float(dollars) if np.ndim(dollars) == 0 else dollars
+
+
+def add_amounts(*amounts) -> float:
+    """以分加總多個元金額,結果與加總順序無關"""
+    return from_cents(sum(to_cents(amount) for amount in amounts))
+
+
+def rate_to_ppm(rate: float) -> int:
+    """費率 → 百萬分之一整數;超過 6 位小數時拋出 ValueError"""
+    ppm = int(round(rate * RATE_SCALE))
+    if abs(ppm - rate * RATE_SCALE) > 1e-6:
+        raise ValueError(f'費率 {rate} 超過 6 位小數,無法以定點數表示')
+    return ppm
+
+
+def divide_rounded(numerator, denominator, policy: RoundingPolicy = DEFAULT_ROUNDING):
+    """整數除法並依捨入規則取整到 policy.step 的倍數 (分母需為正數)"""
+    divisor = np.asarray(denominator) * policy.step
+    if isinstance(numerator, int) or np.asarray(numerator).dtype == object:
+        divisor = divisor.astype(object)
+    quotient = numerator // divisor
+    remainder = numerator - quotient * divisor
+    if policy.mode == 'half_up':
+        quotient = quotient + (2 * remainder >= divisor)
+    elif policy.mode == 'half_even':
+        quotient = quotient + ((2 * remainder > divisor) | ((2 * remainder == divisor) & (quotient % 2 == 1)))
+    elif policy.mode == 'ceiling':
+        quotient = quotient + (remainder > 0)
+    elif policy.mode != 'floor':
+        raise ValueError(f'未知的捨入方式: {policy.mode}')
+    return _scalar_or_array(quotient * policy.step)
+
+
+def _exact_operands(*values, terms: int = 1):
+    """乘積 (加總 terms 項) 可能超過 int64 時改用 Python 整數 (object 陣列),確保不會溢位"""
+    arrays = [np.asarray(value, dtype=np.int64) for value in values]
+    bound = terms
+    for array in arrays:
+        bound *= int(np.abs(array).max(initial=0)) + 1
+    if bound <= _INT64_LIMIT // 4:
+        return arrays
+    return [array.astype(object) for array in arrays]
+
+
+def mul_div(amount, numerator, denominator, policy: RoundingPolicy = DEFAULT_ROUNDING):
+    """amount × numerator / denominator,中間結果不捨入,只在最後依 policy 取整"""
+    amount, numerator = _exact_operands(amount, numerator)
+    return divide_rounded(amount * numerator, denominator, policy)
+
+
+def mul_rate(cents, rate: float, policy: RoundingPolicy = DEFAULT_ROUNDING):
+    """金額 (分) × 費率"""
+    return mul_div(cents, rate_to_ppm(rate), RATE_SCALE, policy)
+
+
+share_cents = mul_rate
+
+
+def tier_arrays(levels):
+    """級距表 → (下限分, 上限分, 費率 ppm) 三個 int64 陣列;已編譯的 TierTable 直接沿用"""
+    if hasattr(levels, 'rates_ppm'):
+        return levels.mins_cents, levels.maxs_cents, levels.rates_ppm
+    if hasattr(levels, 'levels'):
+        levels = levels.levels
+    mins = np.array([to_cents(level[0]) for level in levels], dtype=np.int64)
+    maxs = np.array([NO_LIMIT if level[1] == float('inf') else to_cents(level[1]) for level in levels],
+                    dtype=np.int64)
+    rates = np.array([rate_to_ppm(level[2]) for level in levels], dtype=np.int64)
+    return mins, maxs, rates
+
+
+def progressive_cents(amounts, levels, policy: RoundingPolicy = DEFAULT_ROUNDING):
+    """累進制獎金 (分):每一級計入落在 (下限, 上限] 的部分,全部加總後只取整一次"""
+    mins, maxs, rates = tier_arrays(levels)
+    amounts = np.asarray(amounts, dtype=np.int64)
+    taxable = np.clip(np.minimum(amounts[..., None], maxs) - mins, 0, None)
+    taxable, rates = _exact_operands(taxable, rates, terms=len(rates))
+    weighted = (taxable * rates).sum(axis=-1)
+    return divide_rounded(weighted, RATE_SCALE, policy)
+
+
+def full_amount_cents(amounts, levels, policy: RoundingPolicy = DEFAULT_ROUNDING):
+    """全額制獎金 (分):整筆金額 × 所落最高級距的單一費率"""
+    mins, _, rates = tier_arrays(levels)
+    amounts = np.asarray(amounts, dtype=np.int64)
+    tier = np.clip(np.searchsorted(mins, amounts, side='left') - 1, 0, None)
+    return mul_div(amounts, rates[tier], RATE_SCALE, policy)
@@ -0,0 +1,102 @@
+"""
+Only Beauty 薪資計算系統 - Excel (xlsx) 薪資匯出
+
+以 openpyxl 的 write-only 模式逐列寫出,不在記憶體中保留整本活頁簿;
+耗時與記憶體只隨列數線性成長,多門店批次也是一家接一家串流寫入:
+
+    write_payroll_xlsx([('新竹店', results)], 'payroll.xlsx')
+    data = payroll_xlsx_bytes([('新竹店', results), ('台中店', other_results)])
+
+每個區段一張工作表 (顧問獎金、薪資明細、產品達標、VIP 項目),第一欄為門店,
+標題與畫面上的表格相同,會計可直接使用而不必重新輸入。
+"""
+
+import io
+from typing import Callable, Dict, Iterable, List, Tuple
+
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+from result_tables import AMOUNT_COLUMNS, CONSULTANT_LABELS, SALARY_LABELS, consultant_table, salary_table
+
+XLSX_MIME = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+AMOUNT_FORMAT = '#,##0.00'
+
+PRODUCT_LABELS = {'name': '顧問', 'sales_count': '銷售組數', 'bonus': '產品達標獎金', 'qualified': '達標'}
+VIP_LABELS = {'item': 'VIP 項目', 'count': '數量'}
+
+
+def product_table(results: Dict) -> pd.DataFrame:
+    """產品達標表:每位顧問 (或對應不到的代號) 一列"""
+    records = results.get('product_bonuses') or {}
+    return pd.DataFrame([{'name': str(name), 'sales_count': data['sales_count'], 'bonus': data['bonus'],
+                          'qualified': bool(data['qualified'])} for name, data in records.items()],
+                        columns=list(PRODUCT_LABELS))
+
+
+def vip_table(results: Dict) -> pd.DataFrame:
+    """VIP 項目表:依數量由多到少"""
+    counts = results.get('vip_statistics') or {}
+    items = sorted(counts.items(), key=lambda x: x[1], reverse=True)
+    return pd.DataFrame(items, columns=list(VIP_LABELS))
+
+
+# 工作表名稱 → (欄位標題, 由結果建立表格的函式)
+SECTIONS: Dict[str, Tuple[Dict[str, str], Callable[[Dict], pd.DataFrame]]] = {
+    '顧問獎金': (CONSULTANT_LABELS, consultant_table),
+    '薪資明細': (SALARY_LABELS, salary_table),
+    '產品達標': (PRODUCT_LABELS, product_table),
+    'VIP 項目': (VIP_LABELS, vip_table),
+}
+
+
+def _header(ws, labels: Dict[str, str]) -> List[WriteOnlyCell]:
+    bold = Font(bold=True)
+    cells = []
+    for label in ['門店', *labels.values()]:
+        cell = WriteOnlyCell(ws, value=label)
+        cell.font = bold
+        cells.append(cell)
+    return cells
+
+
+def _rows(ws, store: str, frame: pd.DataFrame, labels: Dict[str, str]):
+    """逐列產生要寫入的值;金額欄位包成帶格式的儲存格,空值寫成空白"""
+    amounts = [column in AMOUNT_COLUMNS or column == 'bonus' for column in labels]
+    for row in frame.reindex(columns=list(labels)).to_numpy(dtype=object).tolist():
+        cells = [store]
+        for value, amount in zip(row, amounts):
+            if value != value:  # NaN
+                value = None
+            elif amount and value is not None:
+                cell = WriteOnlyCell(ws, value=value)
+                cell.number_format = AMOUNT_FORMAT
+                value = cell
+            cells.append(value)
+        yield cells
+
+
+def write_payroll_xlsx(batches: Iterable[Tuple[str, Dict]], target):
+    """將 (門店, 計算結果) 依序串流寫成一本 xlsx;target 可為路徑或可寫入的二進位檔案物件"""
+    wb = Workbook(write_only=True)
+    sheets = {}
+    for title, (labels, _) in SECTIONS.items():
+        ws = wb.create_sheet(title)
+        ws.freeze_panes = 'B2'
+        ws.append(_header(ws, labels))
+        sheets[title] = ws
+    for store, results in batches:
+        for title, (labels, build) in SECTIONS.items():
+            ws = sheets[title]
+            for cells in _rows(ws, store, build(results), labels):
+                ws.append(cells)
+    wb.save(target)
+
+
+def payroll_xlsx_bytes(batches: Iterable[Tuple[str, Dict]]) -> bytes:
+    """匯出成 xlsx 位元組,供下載使用"""
+    buffer = io.BytesIO()
+    write_payroll_xlsx(batches, buffer)
+    return buffer.getvalue()
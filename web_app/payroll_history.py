@@ -0,0 +1,311 @@
+"""
+Only Beauty 薪資計算系統 - 薪資計算歷史紀錄 (SQLite)
+
+每次計算的結果 (門店、期間、計算參數、引擎版本與每位人員的各項金額)
+都寫入本機 SQLite 資料庫,之後查詢年度累計或個人歷史時不必重新上傳 Excel:
+
+    history = PayrollHistory()
+    run_id = history.record_run('新竹店', '2024-12', results, parameters={...})
+    history.person_history('王小美', '2024-01', '2024-12')
+
+- WAL 模式:Flask/Streamlit 同時寫入與查詢不互相阻塞
+- 明細以 executemany 一次寫入,整筆紀錄在同一個交易內完成
+- 索引 (store, period) 與 (person, period) 讓門店/個人查詢不需全表掃描
+- 同一門店同一期間重算時保留所有紀錄,查詢預設只取最新一次
+- monthly_rollups 保存每個 (門店, 期間, 人員, 類別) 的合計,寫入新紀錄時只重算
+  該門店該期間,年度報表直接彙總這張表 (見 payroll_reports)
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from salary_log import get_logger
+
+logger = get_logger('history')
+
+# 計算引擎版本,結果公式有變動時請遞增
+ENGINE_VERSION = '1.1.0'
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'payroll_history.db')
+
+PERIOD_PATTERN = re.compile(r'^(20[0-9]{2})-?(0[1-9]|1[0-2])$')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    store TEXT NOT NULL,
+    period TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    engine_version TEXT NOT NULL,
+    source_file TEXT,
+    parameters TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_store_period ON runs (store, period);
+
+CREATE TABLE IF NOT EXISTS line_items (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    store TEXT NOT NULL,
+    period TEXT NOT NULL,
+    person TEXT NOT NULL,
+    role TEXT,
+    section TEXT NOT NULL,
+    field TEXT NOT NULL,
+    category TEXT NOT NULL,
+    amount REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_items_store_period ON line_items (store, period);
+CREATE INDEX IF NOT EXISTS idx_items_person_period ON line_items (person, period);
+CREATE INDEX IF NOT EXISTS idx_items_run ON line_items (run_id);
+
+CREATE TABLE IF NOT EXISTS monthly_rollups (
+    store TEXT NOT NULL,
+    period TEXT NOT NULL,
+    person TEXT NOT NULL,
+    category TEXT NOT NULL,
+    role TEXT,
+    amount REAL NOT NULL,
+    run_id INTEGER NOT NULL,
+    PRIMARY KEY (store, period, person, category)
+);
+CREATE INDEX IF NOT EXISTS idx_rollups_period ON monthly_rollups (period);
+CREATE INDEX IF NOT EXISTS idx_rollups_person_period ON monthly_rollups (person, period);
+"""
+
+# 以指定 run 的明細重算該門店該期間的月合計
+REFRESH_ROLLUP_SQL = """
+INSERT INTO monthly_rollups (store, period, person, category, role, amount, run_id)
+SELECT store, period, person, category, MAX(role), SUM(amount), run_id
+FROM line_items WHERE run_id = ?
+GROUP BY person, category
+"""
+
+# 結果區段 → 每人金額欄位 → 報表類別
+#   team_bonus 團體獎金 / individual_bonus 個人獎金 / high_target 高標達標 /
+#   product 產品達標 / incentive 激勵獎金 / salary 底薪與津貼 / total 當月總薪資
+# high_target_bonuses 已包含在 individual_staff_salaries 的 high_target_bonus,不重複寫入
+FIELD_CATEGORIES = {
+    'consultant_bonuses': {
+        'performance_bonus': 'team_bonus',
+        'consumption_bonus': 'team_bonus',
+    },
+    'individual_bonuses': {
+        'individual_performance_bonus': 'individual_bonus',
+        'individual_consumption_bonus': 'individual_bonus',
+        'performance_incentive_bonus': 'incentive',
+    },
+    'product_bonuses': {
+        'bonus': 'product',
+    },
+    'individual_staff_salaries': {
+        'base_salary': 'salary',
+        'overtime_pay': 'salary',
+        'hand_skill_bonus': 'salary',
+        'license_allowance': 'salary',
+        'full_attendance_bonus': 'salary',
+        'rank_bonus': 'salary',
+        'position_allowance': 'salary',
+        'team_performance_bonus': 'team_bonus',
+        'team_consumption_bonus': 'team_bonus',
+        'high_target_bonus': 'high_target',
+        'consumption_achievement_bonus': 'incentive',
+        'performance_500w_bonus': 'incentive',
+        'store_performance_incentive': 'incentive',
+        'total_salary': 'total',
+    },
+}
+
+# 只保留每個 (門店, 期間) 最新一次計算的明細
+LATEST_RUN_CONDITION = ('i.run_id = (SELECT MAX(r.id) FROM runs r '
+                        'WHERE r.store = i.store AND r.period = i.period)')
+
+# 每個區段中代表人員角色的欄位
+ROLE_FIELDS = {
+    'individual_bonuses': 'role',
+    'individual_staff_salaries': 'position',
+}
+
+
+def resolve_period(period: str = None, sheet_name: str = None, today: date = None) -> str:
+    """決定計算期間 (YYYY-MM):明確指定 > YYYYMM 工作表名稱 > 今天所在月份"""
+    for candidate in (period, sheet_name):
+        if candidate:
+            match = PERIOD_PATTERN.match(str(candidate).strip())
+            if match:
+                return f'{match.group(1)}-{match.group(2)}'
+            if candidate is period:
+                raise ValueError(f'期間格式錯誤: {period} (應為 YYYY-MM)')
+    today = today or date.today()
+    return f'{today.year:04d}-{today.month:02d}'
+
+
+def line_items_from_results(results: Dict) -> List[Tuple[str, Optional[str], str, str, str, float]]:
+    """將計算結果展開成 (人員, 角色, 區段, 欄位, 類別, 金額) 明細;金額為 0 的項目也保留"""
+    roles: Dict[str, str] = {}
+    for section, role_field in ROLE_FIELDS.items():
+        for person, data in (results.get(section) or {}).items():
+            if isinstance(data, dict) and data.get(role_field):
+                roles[str(person)] = data[role_field]
+    for person in (results.get('consultant_bonuses') or {}):
+        roles.setdefault(str(person), '顧問')
+
+    items = []
+    for section, fields in FIELD_CATEGORIES.items():
+        for person, data in (results.get(section) or {}).items():
+            if not isinstance(data, dict):
+                continue
+            person = str(person)
+            for field, category in fields.items():
+                value = data.get(field)
+                if value is None or isinstance(value, bool):
+                    continue
+                items.append((person, roles.get(person), section, field, category, float(value)))
+    return items
+
+
+class PayrollHistory:
+    """薪資計算歷史資料庫;每個操作使用獨立連線,可在多執行緒 (Flask) 中共用同一物件"""
+
+    def __init__(self, path: str = None):
+        self.path = os.path.expanduser(path or os.environ.get('SALARY_HISTORY_DB') or DEFAULT_DB_PATH)
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    @contextmanager
+    def connect(self):
+        """開啟連線 (第一次會建立資料表與索引);區塊正常結束時提交,發生例外時回滾"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute('PRAGMA foreign_keys = ON')
+            if not self._initialized:
+                with self._init_lock:
+                    if not self._initialized:
+                        conn.execute('PRAGMA journal_mode = WAL')
+                        conn.executescript(SCHEMA)
+                        self._backfill_rollups(conn)
+                        self._initialized = True
+            conn.execute('PRAGMA synchronous = NORMAL')
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def record_run(self, store: str, period: str, results: Dict, parameters: Dict = None,
+                   source_file: str = None) -> int:
+        """寫入一次計算結果,回傳 run id"""
+        period = resolve_period(period)
+        items = line_items_from_results(results)
+        created_at = time.strftime('%Y-%m-%dT%H:%M:%S')
+        with self.connect() as conn:
+            cursor = conn.execute(
+                'INSERT INTO runs (store, period, created_at, engine_version, source_file, parameters) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (store, period, created_at, ENGINE_VERSION, source_file,
+                 json.dumps(parameters or {}, ensure_ascii=False, default=str)))
+            run_id = cursor.lastrowid
+            conn.executemany(
+                'INSERT INTO line_items (run_id, store, period, person, role, section, field, category, amount) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [(run_id, store, period, *item) for item in items])
+            # 新紀錄取代同門店同期間的舊月合計 (只動這一個門店/期間)
+            conn.execute('DELETE FROM monthly_rollups WHERE store = ? AND period = ?', (store, period))
+            conn.execute(REFRESH_ROLLUP_SQL, (run_id,))
+        logger.info("已寫入薪資歷史: %s %s (run %d, %d 筆明細)", store, period, run_id, len(items))
+        return run_id
+
+    @staticmethod
+    def _backfill_rollups(conn: sqlite3.Connection):
+        """舊版資料庫沒有月合計時,以每個門店/期間最新一次計算補建"""
+        if conn.execute('SELECT 1 FROM monthly_rollups LIMIT 1').fetchone():
+            return
+        latest_runs = conn.execute('SELECT MAX(id) FROM runs GROUP BY store, period').fetchall()
+        conn.executemany(REFRESH_ROLLUP_SQL, latest_runs)
+        conn.commit()
+
+    def rebuild_rollups(self):
+        """清空並重建所有月合計"""
+        with self.connect() as conn:
+            conn.execute('DELETE FROM monthly_rollups')
+            conn.executemany(REFRESH_ROLLUP_SQL, conn.execute('SELECT MAX(id) FROM runs GROUP BY store, period').fetchall())
+
+    def runs(self, store: str = None, period: str = None) -> List[Dict]:
+        """列出計算紀錄 (新到舊)"""
+        clauses, params = _filters(store=store, period=period)
+        with self.connect() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(f'SELECT * FROM runs {clauses} ORDER BY id DESC', params).fetchall()
+        return [_run_dict(row) for row in rows]
+
+    def latest_run(self, store: str, period: str) -> Optional[Dict]:
+        """指定門店與期間最新一次的計算紀錄"""
+        with self.connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute('SELECT * FROM runs WHERE store = ? AND period = ? ORDER BY id DESC LIMIT 1',
+                               (store, resolve_period(period))).fetchone()
+        return _run_dict(row) if row else None
+
+    def line_items(self, store: str = None, period_from: str = None, period_to: str = None,
+                   person: str = None, latest_only: bool = True) -> List[Dict]:
+        """查詢明細;latest_only 時每個 (門店, 期間) 只取最新一次計算"""
+        clauses, params = _filters('i.', store=store, person=person, period_from=period_from, period_to=period_to)
+        if latest_only:
+            clauses += (' AND ' if clauses else 'WHERE ') + LATEST_RUN_CONDITION
+        with self.connect() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(
+                f'SELECT i.* FROM line_items i {clauses} ORDER BY i.period, i.store, i.person', params).fetchall()
+        return [dict(row) for row in rows]
+
+    def person_history(self, person: str, period_from: str = None, period_to: str = None) -> List[Dict]:
+        """個人各期間、各類別的金額合計 (只取每個門店/期間最新一次計算)"""
+        clauses, params = _filters('i.', person=person, period_from=period_from, period_to=period_to)
+        clauses += ' AND ' + LATEST_RUN_CONDITION
+        with self.connect() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(
+                'SELECT i.period, i.store, i.role, i.category, SUM(i.amount) AS amount '
+                f'FROM line_items i {clauses} '
+                'GROUP BY i.period, i.store, i.role, i.category ORDER BY i.period, i.store', params).fetchall()
+        return [dict(row) for row in rows]
+
+
+def _filters(prefix: str = '', store: str = None, period: str = None, person: str = None,
+             period_from: str = None, period_to: str = None) -> Tuple[str, list]:
+    conditions, params = [], []
+    for column, operator, value in (('store', '=', store), ('person', '=', person),
+                                    ('period', '=', period), ('period', '>=', period_from),
+                                    ('period', '<=', period_to)):
+        if value is not None:
+            conditions.append(f'{prefix}{column} {operator} ?')
+            params.append(resolve_period(value) if column == 'period' else value)
+    return ('WHERE ' + ' AND '.join(conditions)) if conditions else '', params
+
+
+def _run_dict(row: sqlite3.Row) -> Dict:
+    run = dict(row)
+    run['parameters'] = json.loads(run['parameters'])
+    return run
+
+
+def record_run_safely(history: Optional[PayrollHistory], store: str, period: str, results: Dict,
+                      parameters: Dict = None, source_file: str = None) -> Optional[int]:
+    """前端使用:寫入失敗只記錄錯誤,不影響計算結果的回傳"""
+    if history is None:
+        return None
+    try:
+        return history.record_run(store, period, results, parameters, source_file)
+    except Exception:
+        logger.exception("寫入薪資歷史失敗")
+        return None
+
+
+def default_store_name(source_file: str) -> str:
+    """未指定門店時以檔名 (不含副檔名) 當作門店名稱"""
+    return os.path.splitext(os.path.basename(source_file or ''))[0] or '未命名門店'
+
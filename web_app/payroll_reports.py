@@ -0,0 +1,113 @@
+"""
+Only Beauty 薪資計算系統 - 年度 / 年初至今報表
+
+所有報表都只讀薪資歷史的 monthly_rollups (每個門店/期間/人員/類別一筆合計),
+以 SQL 彙總後再用 pandas 轉成寬表,不需要重新讀取任何 Excel:
+
+    history = PayrollHistory()
+    annual_employee_report(history, 2024)          # 每人全年各類獎金
+    year_to_date_report(history, '2024-06')        # 2024-01 ~ 2024-06
+    store_cost_summary(history, 2024)              # 每家門店全年人事成本
+"""
+
+from typing import List
+
+import pandas as pd
+
+from payroll_history import PayrollHistory, resolve_period
+
+# 報表欄位順序;total (當月總薪資) 與其他類別重疊,只在員工報表中顯示、不計入成本
+BONUS_CATEGORIES = ['team_bonus', 'individual_bonus', 'high_target', 'product', 'incentive']
+COST_CATEGORIES = ['salary'] + BONUS_CATEGORIES
+
+CATEGORY_LABELS = {
+    'salary': '底薪與津貼',
+    'team_bonus': '團體獎金',
+    'individual_bonus': '個人獎金',
+    'high_target': '高標達標獎金',
+    'product': '產品達標獎金',
+    'incentive': '激勵獎金',
+    'total': '當月總薪資合計',
+    'bonus_total': '獎金合計',
+    'total_cost': '人事成本合計',
+}
+
+
+def year_range(year: int) -> tuple:
+    return f'{int(year):04d}-01', f'{int(year):04d}-12'
+
+
+def _query_rollups(history: PayrollHistory, group_by: List[str], period_from: str, period_to: str,
+                   store: str = None) -> pd.DataFrame:
+    columns = ', '.join(group_by)
+    sql = (f'SELECT {columns}, category, SUM(amount) AS amount FROM monthly_rollups '
+           'WHERE period BETWEEN ? AND ?')
+    params = [resolve_period(period_from), resolve_period(period_to)]
+    if store:
+        sql += ' AND store = ?'
+        params.append(store)
+    sql += f' GROUP BY {columns}, category'
+    with history.connect() as conn:
+        return pd.read_sql_query(sql, conn, params=params)
+
+
+def _pivot(rows: pd.DataFrame, index: List[str], categories: List[str]) -> pd.DataFrame:
+    if rows.empty:
+        return pd.DataFrame(columns=index + categories + ['bonus_total'])
+    table = rows.pivot_table(index=index, columns='category', values='amount', aggfunc='sum', fill_value=0.0)
+    table = table.reindex(columns=categories, fill_value=0.0)
+    table['bonus_total'] = table[BONUS_CATEGORIES].sum(axis=1)
+    table.columns.name = None
+    return table.reset_index()
+
+
+def employee_report(history: PayrollHistory, period_from: str, period_to: str, store: str = None) -> pd.DataFrame:
+    """期間內每位人員的各類金額合計 (欄位: person, role, 各類別, bonus_total),依獎金合計由高到低排序"""
+    rows = _query_rollups(history, ['person'], period_from, period_to, store)
+    table = _pivot(rows, ['person'], COST_CATEGORIES + ['total'])
+    if table.empty:
+        return table.reindex(columns=['person', 'role'] + list(table.columns[1:]))
+    # 同一人在不同期間角色可能不同,以最後一個期間的角色為準
+    sql = 'SELECT person, role FROM monthly_rollups WHERE period BETWEEN ? AND ?'
+    params = [resolve_period(period_from), resolve_period(period_to)]
+    if store:
+        sql += ' AND store = ?'
+        params.append(store)
+    with history.connect() as conn:
+        roles = dict(conn.execute(sql + ' ORDER BY period', params).fetchall())
+    table.insert(1, 'role', table['person'].map(roles))
+    return table.sort_values('bonus_total', ascending=False, ignore_index=True)
+
+
+def annual_employee_report(history: PayrollHistory, year: int, store: str = None) -> pd.DataFrame:
+    """全年每人各類獎金合計"""
+    return employee_report(history, *year_range(year), store=store)
+
+
+def year_to_date_report(history: PayrollHistory, through_period: str, store: str = None) -> pd.DataFrame:
+    """當年 1 月至指定期間 (含) 的每人累計"""
+    through_period = resolve_period(through_period)
+    return employee_report(history, f'{through_period[:4]}-01', through_period, store=store)
+
+
+def store_cost_summary(history: PayrollHistory, year: int = None, period_from: str = None,
+                       period_to: str = None) -> pd.DataFrame:
+    """每家門店的人事成本 (欄位: store, 各類別, bonus_total, total_cost, periods)"""
+    if year is not None:
+        period_from, period_to = year_range(year)
+    rows = _query_rollups(history, ['store', 'period'], period_from, period_to)
+    if rows.empty:
+        return pd.DataFrame(columns=['store'] + COST_CATEGORIES + ['bonus_total', 'total_cost', 'periods'])
+    periods = rows.groupby('store')['period'].nunique().rename('periods')
+    table = _pivot(rows.drop(columns='period'), ['store'], COST_CATEGORIES)
+    table['total_cost'] = table['salary'] + table['bonus_total']
+    table = table.merge(periods, left_on='store', right_index=True)
+    return table.sort_values('total_cost', ascending=False, ignore_index=True)
+
+
+def with_labels(report: pd.DataFrame) -> pd.DataFrame:
+    """將類別欄位換成中文標題,供畫面或匯出使用"""
+    return report.rename(columns={**CATEGORY_LABELS, 'person': '人員', 'role': '角色',
+                                  'store': '門店', 'periods': '月份數', 'period': '期間',
+                                  'consultants': '顧問人數', 'staff': '員工人數',
+                                  'performance': '顧問業績', 'consumption': '顧問消耗'})
@@ -0,0 +1,216 @@
+"""
+Only Beauty 薪資計算系統 - 個人薪資單
+
+由計算結果 (individual_staff_salaries、consultant_bonuses、individual_bonuses、product_bonuses)
+為每位員工產生一份薪資單,並打包成 zip:
+
+    records = payslip_records('新竹店', '2024-12', results)     # 每人一筆純資料,可跨行程傳遞
+    write_payslip_zip(records, 'payslips.zip')                   # HTML,一份完成就寫入一份
+    write_payslip_zip(records, 'payslips.zip', fmt='pdf')        # PDF 需安裝 weasyprint
+
+版面來自 templates/payslip.html (string.Template)。PDF 轉檔較慢,預設以 ProcessPoolExecutor
+平行產生;HTML 每份只需數十微秒,序列化到子行程反而比直接產生慢,預設在目前行程內完成。
+不論哪種方式,同時在記憶體中的文件最多只有工作視窗大小的份數。
+"""
+
+import html
+import io
+import multiprocessing
+import os
+import re
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from functools import lru_cache
+from string import Template
+from typing import Dict, Iterable, List, Tuple
+
+from money import add_amounts
+from salary_log import get_logger
+
+logger = get_logger('payslips')
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates', 'payslip.html')
+PAYSLIP_FORMATS = ('html', 'pdf')
+
+ITEM_LABELS = {
+    'base_salary': '底薪',
+    'overtime_pay': '加班費',
+    'hand_skill_bonus': '手技獎金',
+    'license_allowance': '執照津貼',
+    'rank_bonus': '職等獎金',
+    'position_allowance': '職務津貼',
+    'high_target_bonus': '高標達標獎金',
+    'consumption_achievement_bonus': '門店業績達標+消耗300萬獎金',
+    'performance_500w_bonus': '業績500萬獎金',
+    'store_performance_incentive': '門店業績激勵獎金',
+    'team_performance_bonus': '團體業績獎金',
+    'team_consumption_bonus': '團體消耗獎金',
+    'full_attendance_bonus': '全勤獎金',
+}
+
+# 計入當月總薪資的項目 (與計算器的 total_salary 相同);其餘非零項目列為另行發放
+TOTAL_ITEMS = ['base_salary', 'overtime_pay', 'hand_skill_bonus', 'license_allowance', 'rank_bonus',
+               'position_allowance']
+FRONT_DESK_ITEMS = ['high_target_bonus', 'consumption_achievement_bonus', 'performance_500w_bonus',
+                    'store_performance_incentive']
+
+CONSULTANT_ITEMS = [
+    ('performance_bonus', '團體業績獎金'),
+    ('consumption_bonus', '團體消耗獎金'),
+    ('individual_performance_bonus', '個人業績獎金'),
+    ('individual_consumption_bonus', '個人消耗獎金'),
+    ('performance_incentive_bonus', '業績激勵獎金'),
+    ('product_bonus', '產品達標獎金'),
+]
+
+
+def _safe_filename(name: str) -> str:
+    return re.sub(r'[\\/:*?"<>|\s]+', '_', str(name)).strip('_') or '未命名'
+
+
+def _staff_record(name, data: Dict) -> Dict:
+    position = data.get('position', '')
+    total_items = TOTAL_ITEMS + (FRONT_DESK_ITEMS if position == '櫃檯' else [])
+    notes = [(ITEM_LABELS[key], data[key]) for key in ITEM_LABELS
+             if key not in total_items and data.get(key, 0) > 0
+             and (key != 'full_attendance_bonus' or position == '護理師')]
+    return {
+        'name': str(name), 'position': position, 'title': '薪資單',
+        'items': [(ITEM_LABELS[key], data.get(key, 0)) for key in total_items if key in data],
+        'total_label': '當月總薪資', 'total': data.get('total_salary', 0), 'notes': notes,
+    }
+
+
+def _consultant_record(name, team: Dict, individual: Dict, product: Dict) -> Dict:
+    values = {**team, **individual, 'product_bonus': (product or {}).get('bonus', 0)}
+    items = [(label, values.get(key, 0)) for key, label in CONSULTANT_ITEMS]
+    return {
+        'name': str(name), 'position': individual.get('role', '顧問'), 'title': '獎金單',
+        'items': items, 'total_label': '獎金合計', 'total': add_amounts(*(amount for _, amount in items)),
+        'notes': [],
+    }
+
+
+def _people(results: Dict) -> Iterable[Dict]:
+    for name, data in (results.get('individual_staff_salaries') or {}).items():
+        yield _staff_record(name, data)
+    individual = results.get('individual_bonuses') or {}
+    products = results.get('product_bonuses') or {}
+    for name, data in (results.get('consultant_bonuses') or {}).items():
+        yield _consultant_record(name, data, individual.get(name) or {}, products.get(name))
+
+
+def payslip_records(store: str, period: str, results: Dict) -> Iterable[Dict]:
+    """逐一產生每位員工的薪資單資料 (顧問為獎金單),檔名為 門店/期間_姓名"""
+    for record in _people(results):
+        filename = f"{_safe_filename(store)}/{_safe_filename(period)}_{_safe_filename(record['name'])}"
+        record.update(store=store, period=period, filename=filename)
+        yield record
+
+
+def _unique_filenames(records: Iterable[Dict]) -> Iterable[Dict]:
+    """同一個 zip 內檔名重複時 (同名員工、同門店多個檔案) 依出現順序加上序號"""
+    used = set()
+    for record in records:
+        base = filename = record['filename']
+        suffix = 2
+        while filename in used:
+            filename, suffix = f"{base}_{suffix}", suffix + 1
+        used.add(filename)
+        record['filename'] = filename
+        yield record
+
+
+@lru_cache(maxsize=1)
+def _template() -> Template:
+    with open(TEMPLATE_PATH, encoding='utf-8') as f:
+        return Template(f.read())
+
+
+def _money(amount) -> str:
+    return f"{amount:,.0f}" if float(amount).is_integer() else f"{amount:,.2f}"
+
+
+def _rows(items: List[Tuple[str, float]]) -> str:
+    return '\n'.join(f'        <tr><td>{html.escape(label)}</td><td class="amount">{_money(amount)}</td></tr>'
+                     for label, amount in items)
+
+
+def render_html(record: Dict) -> str:
+    """單一薪資單的 HTML"""
+    notes = ''
+    if record['notes']:
+        notes = ('    <h2>另行發放 (不計入當月總薪資)</h2>\n    <table>\n'
+                 + _rows(record['notes']) + '\n    </table>')
+    return _template().substitute(
+        store=html.escape(str(record['store'])), period=html.escape(str(record['period'])),
+        name=html.escape(record['name']), position=html.escape(str(record['position'])),
+        title=html.escape(record['title']), items=_rows(record['items']),
+        total_label=html.escape(record['total_label']), total=_money(record['total']), notes=notes)
+
+
+def render_pdf(record: Dict) -> bytes:
+    """單一薪資單的 PDF (需要 weasyprint)"""
+    try:
+        from weasyprint import HTML
+    except ImportError as e:
+        raise ValueError('產生 PDF 薪資單需要安裝 weasyprint (pip install weasyprint)') from e
+    return HTML(string=render_html(record)).write_pdf()
+
+
+def render_payslip(record: Dict, fmt: str = 'html') -> Tuple[str, bytes]:
+    """產生 (zip 內檔名, 內容);供行程池呼叫,只接收與回傳純資料"""
+    if fmt == 'pdf':
+        return f"{record['filename']}.pdf", render_pdf(record)
+    return f"{record['filename']}.html", render_html(record).encode('utf-8')
+
+
+def _check_pdf_support(fmt: str):
+    if fmt not in PAYSLIP_FORMATS:
+        raise ValueError(f'不支援的薪資單格式: {fmt}')
+    if fmt == 'pdf':
+        try:
+            import weasyprint  # noqa: F401
+        except ImportError as e:
+            raise ValueError('產生 PDF 薪資單需要安裝 weasyprint (pip install weasyprint)') from e
+
+
+def write_payslip_zip(records: Iterable[Dict], target, fmt: str = 'html', workers: int = None) -> int:
+    """產生薪資單並依完成順序寫入 zip,回傳份數;target 可為路徑或可寫入的二進位檔案物件
+
+    workers 預設:PDF 為 CPU 數,HTML 為 1 (在目前行程產生)。大於 1 時以 spawn 行程池平行產生,
+    同時送出的工作最多 workers × 4 份,完成一份就寫入並釋放一份。
+    """
+    _check_pdf_support(fmt)
+    if workers is None:
+        workers = (os.cpu_count() or 1) if fmt == 'pdf' else 1
+    records = _unique_filenames(records)
+    count = 0
+    with zipfile.ZipFile(target, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        if workers <= 1:
+            for record in records:
+                zf.writestr(*render_payslip(record, fmt))
+                count += 1
+        else:
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                pending = set()
+                for record in records:
+                    pending.add(pool.submit(render_payslip, record, fmt))
+                    if len(pending) >= workers * 4:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            zf.writestr(*future.result())
+                            count += 1
+                for future in as_completed(pending):
+                    zf.writestr(*future.result())
+                    count += 1
+    logger.info("已產生 %d 份薪資單 (%s, %d 個行程)", count, fmt, workers)
+    return count
+
+
+def payslip_zip_bytes(records: Iterable[Dict], fmt: str = 'html', workers: int = None) -> bytes:
+    """產生薪資單 zip 位元組,供下載使用"""
+    buffer = io.BytesIO()
+    write_payslip_zip(records, buffer, fmt, workers)
+    return buffer.getvalue()
@@ -0,0 +1,95 @@
+"""
+Only Beauty 薪資計算系統 - 計算結果表格
+
+把計算結果 (results dict) 攤平成每人一列的 DataFrame,畫面只需一個表格元件
+就能顯示全部人員,人數增加時元件數量不變;點選某一列再展開該人的明細:
+
+    consultant_table(results)   # 顧問:業績/消耗、團體獎金、個人獎金、產品達標
+    salary_table(results)       # 美容師/護理師/櫃檯:底薪、津貼、特殊獎金、當月總薪資
+
+欄位名稱沿用結果中的鍵,顯示用的中文標題由畫面端的 column_config 設定。
+"""
+
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from money import from_cents, to_cents
+
+POSITIONS = ['美容師', '護理師', '櫃檯']
+
+# 欄位 → 中文標題 (畫面與 Excel 匯出共用,順序即欄位順序)
+CONSULTANT_LABELS = {
+    'name': '顧問', 'role': '角色', 'mode': '計算方式',
+    'personal_performance': '個人業績', 'personal_consumption': '個人消耗',
+    'performance_bonus': '團體業績獎金', 'consumption_bonus': '團體消耗獎金', 'team_total': '團體總獎金',
+    'individual_performance_bonus': '個人業績獎金', 'individual_consumption_bonus': '個人消耗獎金',
+    'performance_incentive_bonus': '業績激勵獎金', 'individual_total': '個人獎金小計',
+    'product_qualified': '產品達標',
+}
+
+SALARY_LABELS = {
+    'name': '姓名', 'position': '職位', 'row': 'Excel 列', 'base_salary': '底薪', 'hand_skill_bonus': '手技獎金',
+    'license_allowance': '執照津貼', 'rank_bonus': '職等獎金', 'position_allowance': '職務津貼',
+    'consumption_achievement_bonus': '業績達標+消耗300萬', 'performance_500w_bonus': '業績500萬獎金',
+    'store_performance_incentive': '門店業績激勵', 'total_salary': '當月總薪資', 'separate_total': '不計入總薪資',
+}
+
+CONSULTANT_COLUMNS = list(CONSULTANT_LABELS)
+SALARY_COLUMNS = list(SALARY_LABELS)
+
+# 以元顯示的金額欄位
+AMOUNT_COLUMNS = frozenset(CONSULTANT_COLUMNS[3:-1] + SALARY_COLUMNS[3:])
+
+# 不計入當月總薪資的項目 (只有美容師/護理師顯示;全勤獎金只屬於護理師)
+SEPARATE_ITEMS = ['team_performance_bonus', 'team_consumption_bonus', 'full_attendance_bonus', 'high_target_bonus']
+
+
+def _amounts(records: List[Dict], key: str) -> np.ndarray:
+    """金額欄位 (分);缺少或空值視為 0"""
+    return to_cents(np.array([record.get(key) or 0 for record in records], dtype=float))
+
+
+def consultant_table(results: Dict) -> pd.DataFrame:
+    """顧問獎金表:每位顧問一列,團體獎金與個人獎金並列"""
+    team = results.get('consultant_bonuses') or {}
+    if not team:
+        return pd.DataFrame(columns=CONSULTANT_COLUMNS)
+    individual_bonuses = results.get('individual_bonuses') or {}
+    individual = [individual_bonuses.get(name) or {} for name in team]
+    data = list(team.values())
+    return pd.DataFrame({
+        'name': [str(name) for name in team],
+        'role': [record.get('role', '顧問') for record in individual],
+        'mode': [record.get('mode', '階梯') for record in individual],
+        'personal_performance': [record.get('personal_performance', 0) for record in data],
+        'personal_consumption': [record.get('personal_consumption', 0) for record in data],
+        'performance_bonus': [record['performance_bonus'] for record in data],
+        'consumption_bonus': [record['consumption_bonus'] for record in data],
+        'team_total': from_cents(_amounts(data, 'performance_bonus') + _amounts(data, 'consumption_bonus')),
+        **{column: from_cents(_amounts(individual, column))
+           for column in ('individual_performance_bonus', 'individual_consumption_bonus',
+                          'performance_incentive_bonus', 'individual_total')},
+        'product_qualified': [bool(record.get('product_qualified', True)) for record in data],
+    }, columns=CONSULTANT_COLUMNS)
+
+
+def salary_table(results: Dict) -> pd.DataFrame:
+    """個別員工薪資表:依職位 (美容師、護理師、櫃檯) 與 Excel 列排序,separate_total 為不計入總薪資的合計"""
+    salaries = results.get('individual_staff_salaries') or {}
+    if not salaries:
+        return pd.DataFrame(columns=SALARY_COLUMNS)
+    order = {name: i for i, name in enumerate(POSITIONS)}
+    names = sorted(salaries, key=lambda name: (order.get(salaries[name]['position'], len(POSITIONS)),
+                                                salaries[name].get('row', 0)))
+    data = [salaries[name] for name in names]
+    position = np.array([record['position'] for record in data], dtype=object)
+    separate = np.zeros(len(data), dtype=np.int64)
+    for item in SEPARATE_ITEMS:
+        applies = position == '護理師' if item == 'full_attendance_bonus' else np.isin(position, ['美容師', '護理師'])
+        separate += np.where(applies, _amounts(data, item), 0)
+    frame = pd.DataFrame({column: [record.get(column, 0) for record in data] for column in SALARY_COLUMNS[1:-1]})
+    frame.insert(0, 'name', [str(name) for name in names])
+    frame['separate_total'] = from_cents(separate)
+    return frame
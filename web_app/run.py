@@ -33,7 +33,7 @@ def check_requirements():
 
 def create_directories():
     """創建必要的目錄"""
-    directories = ['uploads', 'static', 'templates']
+    directories = ['static', 'templates']
     for directory in directories:
         if not os.path.exists(directory):
             os.makedirs(directory)
@@ -0,0 +1,115 @@
+"""
+Only Beauty 薪資計算系統 - 共用日誌設定
+
+所有前端 (CLI / Flask / Streamlit) 都透過這裡取得 logger:
+- 以標準 logging 等級控制輸出量 (DEBUG / INFO / WARNING / ERROR)
+- 訊息使用 %-style 參數,只有在該等級啟用時才會格式化
+- 可選擇另外寫一份 JSON Lines 檔,方便之後用程式分析
+
+迴圈內的逐列訊息請先用 ``logger.isEnabledFor(logging.DEBUG)`` 判斷一次,
+INFO 等級下整個迴圈就不會產生任何日誌成本。
+"""
+
+import json
+import logging
+import os
+import sys
+import time
+
+ROOT_LOGGER_NAME = 'only_beauty'
+
+# LogRecord 內建欄位,其餘欄位視為 extra 一併寫入 JSON
+_RESERVED_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None)).keys()) | {'message', 'asctime'}
+
+
+class JsonLineFormatter(logging.Formatter):
+    """將每筆日誌輸出為一行 JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created)) + f'.{int(record.msecs):03d}',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class lazy_amount:
+    """延遲格式化的金額參數: logger.info("總業績: %s", lazy_amount(x)) 只在輸出時才套用千分位格式"""
+
+    __slots__ = ('value', 'spec')
+
+    def __init__(self, value, spec: str = ',.0f'):
+        self.value = value
+        self.spec = spec
+
+    def __str__(self) -> str:
+        return format(self.value, self.spec)
+
+
+def get_logger(name: str = None) -> logging.Logger:
+    """取得 only_beauty 底下的子 logger,例如 get_logger('cli') → only_beauty.cli"""
+    return logging.getLogger(f'{ROOT_LOGGER_NAME}.{name}' if name else ROOT_LOGGER_NAME)
+
+
+def configure_logging(level=None, json_path: str = None, stream=None) -> logging.Logger:
+    """設定 only_beauty logger 的等級與輸出目的地 (可重複呼叫,會替換先前設定的 handler)
+
+    level 未指定時讀取環境變數 SALARY_LOG_LEVEL (預設 INFO),
+    json_path 未指定時讀取 SALARY_LOG_JSON (未設定則不輸出 JSON)。
+    """
+    source = 'level'
+    if level is None:
+        level, source = os.environ.get('SALARY_LOG_LEVEL', 'INFO'), 'SALARY_LOG_LEVEL'
+    level, invalid = parse_level(level)
+    if json_path is None:
+        json_path = os.environ.get('SALARY_LOG_JSON') or None
+
+    logger = get_logger()
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+
+    console = logging.StreamHandler(stream or sys.stderr)
+    console.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(console)
+
+    if json_path:
+        json_handler = logging.FileHandler(os.path.expanduser(json_path), encoding='utf-8')
+        json_handler.setFormatter(JsonLineFormatter())
+        logger.addHandler(json_handler)
+
+    logger.setLevel(level)
+    logger.propagate = False
+    if invalid is not None:
+        logger.warning("%s=%r 不是有效的日誌等級 (可用 DEBUG / INFO / WARNING / ERROR / CRITICAL),改用 INFO",
+                       source, invalid)
+    return logger
+
+
+def parse_level(level):
+    """日誌等級名稱或數值 → (logging 等級, 無效時的原始值);無法辨識的值改用 INFO,由呼叫端警告"""
+    if isinstance(level, int):
+        return level, None
+    text = str(level).strip().upper()
+    if text.isdigit():
+        return int(text), None
+    value = logging.getLevelName(text)
+    if isinstance(value, int):
+        return value, None
+    return logging.INFO, level
+
+
+def verbosity_to_level(verbosity: int) -> int:
+    """CLI -v 次數轉換成 logging 等級: 0=WARNING, 1=INFO, 2+=DEBUG"""
+    if verbosity >= 2:
+        return logging.DEBUG
+    if verbosity == 1:
+        return logging.INFO
+    return logging.WARNING
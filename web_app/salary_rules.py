@@ -0,0 +1,345 @@
+"""
+Only Beauty 薪資計算系統 - 薪資規則設定
+
+級距表、分配比例、門檻與固定津貼都放在 salary_rules.json (可用環境變數
+SALARY_RULES 指定其他檔案),每個版本有生效日。檔案只在內容變動時重新
+驗證並編譯成不可變的 SalaryRules,之後每次計算都直接共用:
+
+    rules = load_rules().for_period('2026-07')
+    rules.tiers['performance_bonus_levels'].levels     # ((1800000, 2500000, 0.005), ...)
+    rules.performance_bonus_gate                       # 1680000
+    apply_rules(calculator, rules)                     # 設定計算器的級距表屬性
+
+修改規則檔不需重新部署:下一次建立計算器時就會讀到新的版本。
+
+每個版本適用於 [生效日, 下一版本生效日) 的區間,期間以月底判斷;RuleBook 以
+生效日排序後二分搜尋,重算多年歷史時可先用 group_periods 依版本分組,
+同一份編譯好的級距表供該區間內所有期間共用。
+"""
+
+import bisect
+import calendar
+import json
+import os
+import threading
+from datetime import date
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+from money import DEFAULT_ROUNDING, ROUNDING_MODES, RoundingPolicy, tier_arrays
+from salary_log import get_logger
+
+logger = get_logger('rules')
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'salary_rules.json')
+SCHEMA_VERSION = 1
+
+# 計算器上的級距表屬性名稱 (與規則檔 tiers 的鍵相同)
+TIER_NAMES = (
+    'performance_bonus_levels',
+    'consumption_bonus_levels',
+    'manager_performance_levels',
+    'consultant_performance_levels',
+    'manager_consumption_levels',
+    'consultant_consumption_levels',
+    'deputy_performance_levels',
+    'deputy_consumption_levels',
+)
+
+# 較晚才新增的級距表 → 舊版本沒有時沿用的級距表 (副店長於 2026-06-13 前依顧問級距計算)
+TIER_FALLBACKS = {
+    'deputy_performance_levels': 'consultant_performance_levels',
+    'deputy_consumption_levels': 'consultant_consumption_levels',
+}
+
+# 規則檔區段 → 必填的數值欄位
+_SCALAR_SECTIONS = {
+    'team_pool': ('consultant_performance_share', 'consultant_consumption_share',
+                  'staff_performance_share', 'staff_consumption_share'),
+    'consultant': ('performance_bonus_gate', 'consumption_bonus_gate', 'performance_incentive_gate',
+                   'performance_incentive_bonus', 'product_target_sets', 'product_target_bonus'),
+    'front_desk': ('consumption_achievement_gate', 'consumption_achievement_bonus', 'performance_500w_gate',
+                   'performance_500w_bonus', 'store_performance_incentive'),
+}
+
+
+class RuleSetError(ValueError):
+    """規則檔格式或內容不正確"""
+
+
+class TierTable(NamedTuple):
+    """單一級距表:原始 (下限, 上限, 費率) 與唯讀的 NumPy 陣列,供向量化計算使用
+
+    mins_cents / maxs_cents / rates_ppm 為定點數版本 (分、百萬分之一),供 money 模組使用。
+    """
+    levels: Tuple[Tuple[float, float, float], ...]
+    mins: np.ndarray
+    maxs: np.ndarray
+    rates: np.ndarray
+    mins_cents: np.ndarray
+    maxs_cents: np.ndarray
+    rates_ppm: np.ndarray
+
+
+class SalaryRules(NamedTuple):
+    """單一版本編譯後的規則 (所有欄位皆不可變)"""
+    version: str
+    effective_from: date
+    tiers: Mapping[str, TierTable]
+    consultant_performance_share: float
+    consultant_consumption_share: float
+    staff_performance_share: float
+    staff_consumption_share: float
+    performance_bonus_gate: float
+    consumption_bonus_gate: float
+    performance_incentive_gate: float
+    performance_incentive_bonus: float
+    product_target_sets: int
+    product_target_bonus: float
+    base_salaries: Mapping[str, float]
+    high_target_bonuses: Mapping[str, float]
+    allowances: Mapping[str, Mapping[str, float]]
+    consumption_achievement_gate: float
+    consumption_achievement_bonus: float
+    performance_500w_gate: float
+    performance_500w_bonus: float
+    store_performance_incentive: float
+    default_rounding: RoundingPolicy = DEFAULT_ROUNDING
+    rounding: Mapping[str, RoundingPolicy] = MappingProxyType({})
+
+    def rounding_for(self, item: str = None) -> RoundingPolicy:
+        """指定項目 (例如 individual_performance_bonus) 的捨入規則;未設定時使用預設規則"""
+        return self.rounding.get(item, self.default_rounding)
+
+
+def _number(value, where: str) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise RuleSetError(f'{where} 必須是數字 (目前: {value!r})')
+    if value < 0:
+        raise RuleSetError(f'{where} 不可為負數')
+    return value
+
+
+def _readonly(values) -> np.ndarray:
+    array = np.array(values, dtype=float)
+    array.flags.writeable = False
+    return array
+
+
+def _readonly_int(array: np.ndarray) -> np.ndarray:
+    array = np.array(array, dtype=np.int64)
+    array.flags.writeable = False
+    return array
+
+
+def compile_rounding(raw, where: str) -> RoundingPolicy:
+    """捨入規則:字串 (mode) 或 {"mode": ..., "step_cents": ...}"""
+    if isinstance(raw, str):
+        raw = {'mode': raw}
+    if not isinstance(raw, dict):
+        raise RuleSetError(f'{where} 必須是捨入方式字串或 {{"mode", "step_cents"}}')
+    mode = raw.get('mode', DEFAULT_ROUNDING.mode)
+    if mode not in ROUNDING_MODES:
+        raise RuleSetError(f'{where} 的捨入方式必須是 {"、".join(ROUNDING_MODES)} 之一 (目前: {mode!r})')
+    step = raw.get('step_cents', DEFAULT_ROUNDING.step)
+    if isinstance(step, bool) or not isinstance(step, int) or step < 1:
+        raise RuleSetError(f'{where}.step_cents 必須是正整數')
+    return RoundingPolicy(mode, step)
+
+
+def compile_tier_table(rows, where: str) -> TierTable:
+    """驗證並編譯級距表:每列 [下限, 上限 (null = 無上限), 費率],下限遞增且不與上一級重疊"""
+    if not isinstance(rows, list) or not rows:
+        raise RuleSetError(f'{where} 必須是非空的級距清單')
+    levels = []
+    for i, row in enumerate(rows):
+        if not isinstance(row, list) or len(row) != 3:
+            raise RuleSetError(f'{where}[{i}] 必須是 [下限, 上限, 費率]')
+        low = _number(row[0], f'{where}[{i}] 下限')
+        high = float('inf') if row[1] is None else _number(row[1], f'{where}[{i}] 上限')
+        rate = _number(row[2], f'{where}[{i}] 費率')
+        if high < low:
+            raise RuleSetError(f'{where}[{i}] 上限小於下限')
+        if rate > 1:
+            raise RuleSetError(f'{where}[{i}] 費率應為小數 (例如 0.005),目前為 {rate}')
+        if levels and low < levels[-1][1]:
+            raise RuleSetError(f'{where}[{i}] 下限 {low} 與上一級重疊')
+        levels.append((low, high, rate))
+    try:
+        fixed = [_readonly_int(array) for array in tier_arrays(levels)]
+    except ValueError as e:
+        raise RuleSetError(f'{where}: {e}') from None
+    return TierTable(tuple(levels), _readonly([l[0] for l in levels]), _readonly([l[1] for l in levels]),
+                     _readonly([l[2] for l in levels]), *fixed)
+
+
+def _section(raw: Dict, name: str, where: str) -> Dict:
+    section = raw.get(name)
+    if not isinstance(section, dict):
+        raise RuleSetError(f'{where} 缺少 {name} 區段')
+    return section
+
+
+def _amounts(mapping, where: str) -> Mapping[str, float]:
+    if not isinstance(mapping, dict):
+        raise RuleSetError(f'{where} 必須是 {{名稱: 金額}}')
+    return MappingProxyType({str(key): _number(value, f'{where}.{key}') for key, value in mapping.items()})
+
+
+def compile_version(raw: Dict) -> SalaryRules:
+    """驗證並編譯規則檔中的單一版本"""
+    if not isinstance(raw, dict):
+        raise RuleSetError('每個版本必須是物件')
+    version = str(raw.get('version') or '')
+    where = f'版本 {version or "?"}'
+    if not version:
+        raise RuleSetError('版本缺少 version')
+    try:
+        effective_from = date.fromisoformat(str(raw.get('effective_from')))
+    except ValueError:
+        raise RuleSetError(f'{where} 的 effective_from 必須是 YYYY-MM-DD') from None
+
+    tiers_raw = _section(raw, 'tiers', where)
+    missing = [name for name in TIER_NAMES if name not in tiers_raw and name not in TIER_FALLBACKS]
+    if missing:
+        raise RuleSetError(f'{where} 缺少級距表: {"、".join(missing)}')
+    tiers = {name: compile_tier_table(tiers_raw[name], f'{where}.tiers.{name}')
+             for name in TIER_NAMES if name in tiers_raw}
+    for name, fallback in TIER_FALLBACKS.items():
+        tiers.setdefault(name, tiers[fallback])
+    tiers = MappingProxyType({name: tiers[name] for name in TIER_NAMES})
+
+    fields = {}
+    for section_name, keys in _SCALAR_SECTIONS.items():
+        section = _section(raw, section_name, where)
+        for key in keys:
+            if key not in section:
+                raise RuleSetError(f'{where}.{section_name} 缺少 {key}')
+            fields[key] = _number(section[key], f'{where}.{section_name}.{key}')
+    fields['product_target_sets'] = int(fields['product_target_sets'])
+
+    rounding = raw.get('rounding', {})
+    if not isinstance(rounding, dict) or not isinstance(rounding.get('items', {}), dict):
+        raise RuleSetError(f'{where}.rounding 必須是 {{"default": ..., "items": {{項目: 規則}}}}')
+    fields['default_rounding'] = compile_rounding(rounding.get('default', {}), f'{where}.rounding.default')
+    fields['rounding'] = MappingProxyType({item: compile_rounding(policy, f'{where}.rounding.items.{item}')
+                                           for item, policy in rounding.get('items', {}).items()})
+
+    staff = _section(raw, 'staff', where)
+    allowances = staff.get('allowances', {})
+    if not isinstance(allowances, dict):
+        raise RuleSetError(f'{where}.staff.allowances 必須是 {{職位: {{項目: 金額}}}}')
+    return SalaryRules(
+        version=version,
+        effective_from=effective_from,
+        tiers=tiers,
+        base_salaries=_amounts(staff.get('base_salaries'), f'{where}.staff.base_salaries'),
+        high_target_bonuses=_amounts(staff.get('high_target_bonuses'), f'{where}.staff.high_target_bonuses'),
+        allowances=MappingProxyType({position: _amounts(items, f'{where}.staff.allowances.{position}')
+                                     for position, items in allowances.items()}),
+        **fields,
+    )
+
+
+def period_end(period: Union[str, date]) -> date:
+    """期間 (YYYY-MM 或日期) 的最後一天;規則依期間月底是否已生效來選版本"""
+    if isinstance(period, date):
+        return period
+    year, month = (int(part) for part in str(period).split('-')[:2])
+    return date(year, month, calendar.monthrange(year, month)[1])
+
+
+class RuleBook:
+    """規則檔中所有版本,以生效日區間索引 (第 i 版適用於 [生效日_i, 生效日_i+1))"""
+
+    def __init__(self, versions, source: str = None):
+        self.versions: Tuple[SalaryRules, ...] = tuple(sorted(versions, key=lambda rules: rules.effective_from))
+        self.source = source
+        if not self.versions:
+            raise RuleSetError('規則檔沒有任何版本')
+        self._starts = [rules.effective_from for rules in self.versions]
+        self._by_name: Dict[str, SalaryRules] = {}
+        for i, rules in enumerate(self.versions):
+            if rules.version in self._by_name:
+                raise RuleSetError(f'版本名稱重複: {rules.version}')
+            if i and rules.effective_from == self._starts[i - 1]:
+                raise RuleSetError(f'版本 {rules.version} 與前一版本的生效日相同: {rules.effective_from}')
+            self._by_name[rules.version] = rules
+
+    def _index(self, period: Union[str, date] = None) -> int:
+        when = period_end(period) if period is not None else date.today()
+        index = bisect.bisect_right(self._starts, when) - 1
+        if index < 0:
+            raise RuleSetError(f'{when} 沒有適用的薪資規則 (最早版本自 {self._starts[0]} 生效)')
+        return index
+
+    def for_period(self, period: Union[str, date] = None) -> SalaryRules:
+        """指定期間適用的版本 (未指定時為今天);早於所有版本時拋出 RuleSetError"""
+        return self.versions[self._index(period)]
+
+    def interval(self, name: str) -> Tuple[date, Optional[date]]:
+        """版本的適用區間 [生效日, 下一版本生效日);最新版本的結束日為 None"""
+        index = self._starts.index(self.version(name).effective_from)
+        return self._starts[index], self._starts[index + 1] if index + 1 < len(self._starts) else None
+
+    def group_periods(self, periods: Iterable[Union[str, date]]) -> Dict[str, List[int]]:
+        """將多個期間依適用版本分組:{版本: [期間位置, ...]},依生效日排序"""
+        groups: Dict[int, List[int]] = {}
+        for position, period in enumerate(periods):
+            groups.setdefault(self._index(period), []).append(position)
+        return {self.versions[index].version: groups[index] for index in sorted(groups)}
+
+    def version(self, name: str) -> SalaryRules:
+        try:
+            return self._by_name[name]
+        except KeyError:
+            raise KeyError(name) from None
+
+
+def parse_rules(data: Dict, source: str = None) -> RuleBook:
+    """由已解析的 JSON 建立 RuleBook (驗證失敗時拋出 RuleSetError)"""
+    if not isinstance(data, dict) or data.get('schema_version') != SCHEMA_VERSION:
+        raise RuleSetError(f'規則檔 schema_version 必須為 {SCHEMA_VERSION}')
+    versions = data.get('versions')
+    if not isinstance(versions, list):
+        raise RuleSetError('規則檔缺少 versions 清單')
+    return RuleBook([compile_version(raw) for raw in versions], source)
+
+
+_rule_books: Dict[str, Tuple[tuple, RuleBook]] = {}
+_rule_books_lock = threading.Lock()
+
+
+def rules_path(path: str = None) -> str:
+    return os.path.abspath(path or os.environ.get('SALARY_RULES') or DEFAULT_RULES_PATH)
+
+
+def load_rules(path: str = None) -> RuleBook:
+    """讀取規則檔;以修改時間與大小判斷是否需要重新編譯,否則直接回傳快取"""
+    path = rules_path(path)
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    with _rule_books_lock:
+        cached = _rule_books.get(path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+    with open(path, encoding='utf-8') as f:
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError as e:
+            raise RuleSetError(f'規則檔不是有效的 JSON: {e}') from None
+    book = parse_rules(data, path)
+    logger.info("載入薪資規則 %s (%d 個版本)", path, len(book.versions))
+    with _rule_books_lock:
+        _rule_books[path] = (key, book)
+    return book
+
+
+def apply_rules(calculator, rules: SalaryRules):
+    """將規則套用到計算器:級距表屬性維持 list of tuple,其餘參數由 calculator.rules 取得"""
+    calculator.rules = rules
+    for name in TIER_NAMES:
+        setattr(calculator, name, list(rules.tiers[name].levels))
+    calculator.high_target_bonuses = dict(rules.high_target_bonuses)
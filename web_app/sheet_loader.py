@@ -0,0 +1,49 @@
+"""
+Only Beauty 薪資計算系統 - 開啟工作表來源
+
+依內容選擇讀取器:已註冊的 CSV / Parquet 讀取器 (單檔、zip 或資料夾) 優先判斷,
+都不接受時視為 Excel 活頁簿 (xlsx / 舊版 xls):
+
+    with open_sheets(file_bytes, '新竹店_202412.zip') as sheets:
+        df = sheets.frame(sheets.latest)
+    sheet_name, df = load_latest_sheet('報表.xlsx')
+"""
+
+from typing import Tuple
+
+import pandas as pd
+
+from salary_log import get_logger
+from sheet_source import SheetSource, find_sheet_reader, register_sheet_reader
+from tabular_reader import CsvSheets, ParquetSheets
+from workbook_reader import WorkbookFormatError, WorkbookSession
+
+logger = get_logger('reader')
+
+# Parquet 有明確的檔頭,先於以內容猜測的 CSV 判斷
+register_sheet_reader(ParquetSheets)
+register_sheet_reader(CsvSheets)
+
+
+def open_sheets(source, name: str = None) -> SheetSource:
+    """依內容開啟工作表來源:CSV / Parquet (單檔、zip 或資料夾) 或 Excel 活頁簿
+
+    name 為原始檔名,只用於單一 CSV/Parquet 檔的工作表名稱 (例如 202412.csv → 202412)。
+    """
+    reader = find_sheet_reader(source)
+    if reader is not None:
+        return reader(source, name)
+    return WorkbookSession(source)
+
+
+def load_latest_sheet(source, name: str = None) -> Tuple[str, pd.DataFrame]:
+    """依命名規則選出最新的數字工作表並直接讀取該工作表,回傳 (工作表名稱, DataFrame)
+
+    xlsx 只讀 workbook.xml、共用字串與選中的那一張工作表;
+    舊版 .xls 改用 pandas 讀取,CSV/Parquet 由 tabular_reader 讀取。找不到數字工作表時拋出 WorkbookFormatError。
+    """
+    with open_sheets(source, name) as session:
+        logger.debug("找到的工作表: %s", session.sheet_names)
+        if session.latest is None:
+            raise WorkbookFormatError(f'沒有找到數字工作表 (目前工作表: {session.sheet_names})')
+        return session.latest, session.frame(session.latest)
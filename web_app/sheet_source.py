@@ -0,0 +1,79 @@
+"""
+Only Beauty 薪資計算系統 - 工作表來源介面與讀取器註冊表
+
+計算流程只透過 SheetSource 讀取工作表,不需要知道來源是 Excel、CSV 或 Parquet:
+
+    with open_sheets(source) as sheets:          # sheet_loader.open_sheets
+        df = sheets.frame(sheets.latest)
+
+Excel 以外的格式以 register_sheet_reader() 註冊 (見 sheet_loader);這個模組只定義介面,
+不匯入任何讀取器。
+"""
+
+from abc import ABC, abstractmethod
+from typing import Dict, FrozenSet, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+
+class SheetSource(ABC):
+    """工作表來源的共同介面:依名稱讀出與 pd.read_excel(header=None) 相同版面的 DataFrame
+
+    子類別在 __init__ 設定 sheet_names / latest 並實作 frame();儲存格位置 (A1 為原點) 在各種格式間一致,
+    計算流程只透過這個介面讀取資料,不需要知道來源是 Excel、CSV 或 Parquet。
+    """
+
+    def __init__(self):
+        self.sheet_names: List[str] = []
+        self.latest: Optional[str] = None
+
+    @abstractmethod
+    def frame(self, sheet_name: str) -> pd.DataFrame:
+        """讀出單一工作表 (header=None 版面)"""
+
+    def sheet_fingerprint(self, sheet_name: str) -> Optional[tuple]:
+        """不需解析即可取得的內容指紋,供明細快取使用;無法取得時回傳 None"""
+        return None
+
+    def iter_values(self, sheet_name: str, min_row: int = 0, columns: FrozenSet[int] = None,
+                    string_refs: Dict[int, str] = None, max_row: int = None) -> Iterator[Tuple[int, int, object]]:
+        """產生單一工作表的非空白儲存格 (列, 欄, 值);預設由 frame() 取值,值為 Python 原生型別"""
+        df = self.frame(sheet_name)
+        for col in (columns if columns is not None else range(len(df.columns))):
+            if col >= len(df.columns):
+                continue
+            values = df.iloc[min_row:max_row, col].dropna()
+            yield from ((row, col, value) for row, value in zip(values.index.tolist(), values.tolist()))
+
+    def iter_frames(self) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """依來源順序逐張產生 (工作表名稱, DataFrame)"""
+        for sheet_name in self.sheet_names:
+            yield sheet_name, self.frame(sheet_name)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# Excel 以外的讀取器 (CSV、Parquet);依註冊順序以 accepts(source) 判斷,都不接受時視為 Excel
+SHEET_READERS: List[type] = []
+
+
+def register_sheet_reader(reader: type) -> type:
+    """註冊 SheetSource 子類別;reader.accepts(source) 為真時由 open_sheets 以 reader(source, name) 開啟"""
+    if reader not in SHEET_READERS:
+        SHEET_READERS.append(reader)
+    return reader
+
+
+def find_sheet_reader(source) -> Optional[type]:
+    """找出可讀取 source 的已註冊讀取器;Excel 檔案回傳 None"""
+    for reader in SHEET_READERS:
+        if reader.accepts(source):
+            return reader
+    return None
@@ -1,6 +1,12 @@
+// 與後端 store_batch.MAX_STORES 相同
+const MAX_STORES = 20;
+
 // 全域變數
-let uploadedFile = null;
+// 一次可上傳多家門店的檔案,各自計算後回傳跨門店彙總
+let uploadedFiles = [];
 let calculationResults = null;
+let storeOutcomes = null;
+let calculationForm = null;
 
 // DOM 載入完成後初始化
 document.addEventListener('DOMContentLoaded', function() {
@@ -22,9 +28,8 @@ function initializeUpload() {
 
     // 檔案選擇事件
     fileInput.addEventListener('change', function(e) {
-        const file = e.target.files[0];
-        if (file) {
-            handleFileUpload(file);
+        if (e.target.files.length > 0) {
+            handleFileUpload(Array.from(e.target.files));
         }
     });
 
@@ -43,14 +48,9 @@ function initializeUpload() {
         e.preventDefault();
         uploadArea.classList.remove('dragover');
 
-        const files = e.dataTransfer.files;
+        const files = Array.from(e.dataTransfer.files);
         if (files.length > 0) {
-            const file = files[0];
-            if (isValidExcelFile(file)) {
-                handleFileUpload(file);
-            } else {
-                showError('請選擇有效的Excel檔案 (.xlsx 或 .xls)');
-            }
+            handleFileUpload(files);
         }
     });
 }
@@ -62,24 +62,32 @@ function isValidExcelFile(file) {
         'application/vnd.ms-excel' // .xls
     ];
 
-    const validExtensions = ['.xlsx', '.xls'];
+    // POS 匯出的 CSV / Parquet (單檔或 zip) 與 Excel 共用同一個計算流程
+    const validExtensions = ['.xlsx', '.xls', '.csv', '.parquet', '.zip'];
     const fileName = file.name.toLowerCase();
     const hasValidExtension = validExtensions.some(ext => fileName.endsWith(ext));
 
     return validTypes.includes(file.type) || hasValidExtension;
 }
 
-// 處理檔案上傳
-function handleFileUpload(file) {
-    if (!isValidExcelFile(file)) {
-        showError('請選擇有效的Excel檔案 (.xlsx 或 .xls)');
+// 處理檔案上傳 (一個或多個門店檔案)
+function handleFileUpload(files) {
+    if (!files.every(isValidExcelFile)) {
+        showError('請選擇有效的檔案 (.xlsx、.xls、.csv、.parquet 或 .zip)');
         return;
     }
 
-    uploadedFile = file;
+    if (files.length > MAX_STORES) {
+        showError(`一次最多上傳 ${MAX_STORES} 家門店的檔案`);
+        return;
+    }
+
+    uploadedFiles = files;
 
     // 顯示檔案資訊
-    showFileStatus(`已選擇檔案: ${file.name} (${formatFileSize(file.size)})`, 'success');
+    const names = files.map(file => `${file.name} (${formatFileSize(file.size)})`).join('、');
+    showFileStatus(files.length > 1 ? `已選擇 ${files.length} 個檔案: ${names}` : `已選擇檔案: ${names}`, 'success');
+    renderStoreJobs();
 
     // 模擬Excel解析進度
     simulateExcelParsing().then(() => {
@@ -120,6 +128,48 @@ function simulateExcelParsing() {
     });
 }
 
+// 多門店時每個檔案可個別設定門店名稱與參數,留空則沿用上方共用設定
+function renderStoreJobs() {
+    const container = document.getElementById('storeJobs');
+    if (uploadedFiles.length < 2) {
+        container.style.display = 'none';
+        container.innerHTML = '';
+        return;
+    }
+
+    const rows = uploadedFiles.map((file, i) => `
+        <tr>
+            <td>${escapeHtml(file.name)}</td>
+            <td><input type="text" data-job="${i}" data-field="store" placeholder="${escapeHtml(file.name.replace(/\.[^.]+$/, ''))}"></td>
+            <td><input type="number" data-job="${i}" data-field="staff_count" min="1" placeholder="共用"></td>
+            <td><input type="text" data-job="${i}" data-field="manager_name" placeholder="共用"></td>
+            <td><input type="number" data-job="${i}" data-field="high_target" min="0" step="10000" placeholder="共用"></td>
+        </tr>
+    `).join('');
+
+    container.innerHTML = `
+        <h3>各門店設定</h3>
+        <table class="result-table">
+            <thead><tr><th>檔案</th><th>門店</th><th>總人數</th><th>店長</th><th>高標金額</th></tr></thead>
+            <tbody>${rows}</tbody>
+        </table>
+        <span class="form-help">留空的欄位沿用上方的共用設定</span>
+    `;
+    container.style.display = 'block';
+}
+
+// 收集各門店的個別參數 (依檔案順序)
+function collectStoreJobs() {
+    const jobs = uploadedFiles.map(() => ({}));
+    document.querySelectorAll('#storeJobs input[data-job]').forEach(input => {
+        const value = input.value.trim();
+        if (value) {
+            jobs[Number(input.dataset.job)][input.dataset.field] = value;
+        }
+    });
+    return jobs;
+}
+
 // 格式化檔案大小
 function formatFileSize(bytes) {
     if (bytes === 0) return '0 Bytes';
@@ -159,7 +209,7 @@ function startCalculation() {
         return;
     }
 
-    if (!uploadedFile) {
+    if (uploadedFiles.length === 0) {
         showError('請先上傳Excel檔案');
         return;
     }
@@ -169,10 +219,16 @@ function startCalculation() {
 
     // 準備表單資料
     const formData = new FormData();
-    formData.append('file', uploadedFile);
+    uploadedFiles.forEach(file => formData.append('file', file));
     formData.append('staff_count', staffCount);
     formData.append('manager_name', managerName || '');
     formData.append('high_target', highTarget || '');
+    // 以欄位清單 + 資料列回傳,回應由瀏覽器依 Content-Encoding 自動解壓縮
+    formData.append('format', 'columnar');
+    if (uploadedFiles.length > 1) {
+        formData.append('jobs', JSON.stringify(collectStoreJobs()));
+    }
+    calculationForm = formData;
 
     // 開始計算進度動畫
     startCalculationProgress();
@@ -183,8 +239,13 @@ function startCalculation() {
         body: formData
     })
     .then(response => response.json())
+    .then(unpackColumnar)
     .then(data => {
-        if (data.success) {
+        if (data.success && data.stores) {
+            displayStoreResults(data);
+            showStep(4);
+        } else if (data.success) {
+            storeOutcomes = null;
             calculationResults = data.results;
             displayResults(data.results);
             showStep(4);
@@ -200,6 +261,39 @@ function startCalculation() {
     });
 }
 
+// 還原 format=columnar 的回應 (與後端 compact_response.unpack 相同)
+function unpackColumnar(value) {
+    if (Array.isArray(value)) {
+        return value.map(unpackColumnar);
+    }
+    if (value === null || typeof value !== 'object') {
+        return value;
+    }
+    const kind = value['$columnar'];
+    if (!kind) {
+        const result = {};
+        Object.entries(value).forEach(([key, item]) => {
+            result[key] = unpackColumnar(item);
+        });
+        return result;
+    }
+    const rows = value.rows.map(row => {
+        const record = {};
+        value.fields.forEach((field, i) => {
+            record[field] = unpackColumnar(row[i]);
+        });
+        return record;
+    });
+    if (kind === 'records') {
+        return rows;
+    }
+    const mapping = {};
+    value.keys.forEach((key, i) => {
+        mapping[key] = rows[i];
+    });
+    return mapping;
+}
+
 // 開始計算進度動畫
 function startCalculationProgress() {
     const steps = ['product', 'team', 'individual', 'salary'];
@@ -249,14 +343,14 @@ function showStep(stepNumber) {
 
 // 顯示結果
 function displayResults(results) {
-    displayConsultantResults(results.consultant_bonuses);
+    displayConsultantResults(results.consultant_bonuses, results.unmatched_consultant_codes);
     displayStaffResults(results.staff_bonuses);
     displaySalaryResults(results.individual_staff_salaries);
     displaySummaryResults(results);
 }
 
 // 顯示顧問結果
-function displayConsultantResults(consultants) {
+function displayConsultantResults(consultants, unmatchedCodes) {
     const container = document.getElementById('consultantResults');
 
     if (!consultants || Object.keys(consultants).length === 0) {
@@ -297,6 +391,12 @@ function displayConsultantResults(consultants) {
         `;
     });
 
+    // 產品明細中對應不到顧問名單的代號
+    if (unmatchedCodes && Object.keys(unmatchedCodes).length > 0) {
+        const codes = Object.entries(unmatchedCodes).map(([code, count]) => `${code} (${count} 組)`).join('、');
+        html += `<div style="color: #dd6b20; font-weight: 600;">⚠️ 以下顧問代號對應不到顧問名單，未計入產品達標判斷: ${codes}</div>`;
+    }
+
     container.innerHTML = html;
 }
 
@@ -540,6 +640,63 @@ function displaySummaryResults(results) {
     container.innerHTML = html;
 }
 
+// 顯示多門店結果:統計摘要為跨門店彙總,其他選項卡顯示所選門店的明細
+function displayStoreResults(data) {
+    storeOutcomes = data.stores;
+    const succeeded = data.stores.map((outcome, i) => [outcome, i]).filter(([outcome]) => outcome.success);
+    showStoreDetail(succeeded[0][1]);
+
+    const money = ['performance', 'consumption', 'salary', 'bonus_total', 'total_cost'];
+    const labels = {
+        store: '門店', period: '期間', consultants: '顧問人數', staff: '員工人數', performance: '顧問業績',
+        consumption: '顧問消耗', salary: '底薪與津貼', bonus_total: '獎金合計', total_cost: '人事成本合計'
+    };
+    const columns = Object.keys(labels);
+    const cell = (row, column) => money.includes(column) ? formatCurrency(row[column]) : escapeHtml(String(row[column] ?? ''));
+    const body = data.summary.map(row => `<tr>${columns.map(column => `<td>${cell(row, column)}</td>`).join('')}</tr>`).join('');
+    const totals = {...data.totals, store: `合計 (${data.totals.stores} 家)`, period: ''};
+
+    const failures = data.stores.filter(outcome => !outcome.success)
+        .map(outcome => `<div style="color: #f56565; font-weight: 600;">⚠️ ${escapeHtml(outcome.store || outcome.filename)}: ${escapeHtml(outcome.error)}</div>`)
+        .join('');
+    const options = succeeded
+        .map(([outcome, i]) => `<option value="${i}">${escapeHtml(outcome.store)} (${escapeHtml(outcome.period)})</option>`)
+        .join('');
+
+    document.getElementById('summaryResults').innerHTML = `
+        <div class="result-card">
+            <h4>跨門店彙總</h4>
+            <table class="result-table">
+                <thead><tr>${columns.map(column => `<th>${labels[column]}</th>`).join('')}</tr></thead>
+                <tbody>${body}</tbody>
+                <tfoot><tr>${columns.map(column => `<td><strong>${cell(totals, column)}</strong></td>`).join('')}</tr></tfoot>
+            </table>
+            ${failures}
+            <div class="result-item">
+                <span class="result-label">查看門店明細:</span>
+                <select onchange="showStoreDetail(Number(this.value))">${options}</select>
+            </div>
+        </div>
+    `;
+    showTab('summary');
+}
+
+// 顧問、員工與薪資選項卡切換成指定門店的結果
+function showStoreDetail(index) {
+    const results = storeOutcomes[index].results;
+    calculationResults = results;
+    displayConsultantResults(results.consultant_bonuses, results.unmatched_consultant_codes);
+    displayStaffResults(results.staff_bonuses);
+    displaySalaryResults(results.individual_staff_salaries);
+}
+
+// 跳脫使用者提供的文字 (檔名、門店名稱)
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text;
+    return div.innerHTML;
+}
+
 // 格式化貨幣
 function formatCurrency(amount) {
     if (typeof amount !== 'number') {
@@ -577,8 +734,10 @@ function showTab(tabName) {
 
 // 重新計算
 function resetCalculation() {
-    uploadedFile = null;
+    uploadedFiles = [];
     calculationResults = null;
+    storeOutcomes = null;
+    renderStoreJobs();
 
     // 重置表單
     document.getElementById('configForm').reset();
@@ -590,31 +749,38 @@ function resetCalculation() {
     showStep(1);
 }
 
-// 匯出結果
+// 匯出結果 (以相同的檔案與參數向 /export 取得 Excel)
 function exportResults() {
-    if (!calculationResults) {
+    if (!calculationResults || !calculationForm) {
         showError('沒有可匯出的結果');
         return;
     }
 
-    // 這裡可以實作匯出功能，例如：
-    // 1. 產生Excel檔案
-    // 2. 產生PDF報告
-    // 3. 產生JSON格式
-
-    alert('匯出功能開發中...');
-
-    // 簡單的JSON匯出示例
-    const dataStr = JSON.stringify(calculationResults, null, 2);
-    const dataBlob = new Blob([dataStr], {type: 'application/json'});
-    const url = URL.createObjectURL(dataBlob);
-
-    const link = document.createElement('a');
-    link.href = url;
-    link.download = 'salary_calculation_results.json';
-    link.click();
-
-    URL.revokeObjectURL(url);
+    fetch('/export', {
+        method: 'POST',
+        body: calculationForm
+    })
+    .then(response => {
+        if (!response.ok) {
+            return response.json().then(data => { throw new Error(data.error || '匯出失敗'); });
+        }
+        const disposition = response.headers.get('Content-Disposition') || '';
+        const match = disposition.match(/filename\*=UTF-8''([^;]+)/);
+        const filename = match ? decodeURIComponent(match[1]) : 'salary_calculation_results.xlsx';
+        return response.blob().then(blob => ({ blob, filename }));
+    })
+    .then(({ blob, filename }) => {
+        const url = URL.createObjectURL(blob);
+        const link = document.createElement('a');
+        link.href = url;
+        link.download = filename;
+        link.click();
+        URL.revokeObjectURL(url);
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        showError(error.message || '網路錯誤或伺服器無回應');
+    });
 }
 
 // 顯示錯誤訊息
@@ -0,0 +1,153 @@
+"""
+Only Beauty 薪資計算系統 - 多門店平行計算
+
+區經理一次上傳多家門店的檔案,每個檔案連同自己的參數 (人數、店長、高標、門店、期間)
+成為一個工作,交給工作池同時計算,最後合併結果並產生跨門店彙總:
+
+    outcomes = compute_stores(jobs, compute_store_job)            # 行程池,compute 需可 pickle 且所在模組匯入時無副作用 (見 store_jobs)
+    outcomes = compute_stores(jobs, compute, processes=False)     # 執行緒池 (compute 無法 pickle 時)
+    summary = store_summary(outcomes)                             # 每家門店一列 + 合計
+
+行程池在第一次使用時建立並跨請求共用,只付一次啟動成本。每個工作的結果是
+{'store', 'filename', 'success', ...};單一門店失敗只標記該門店,不影響其他門店。
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from money import from_cents, to_cents
+from payroll_history import line_items_from_results
+from payroll_reports import BONUS_CATEGORIES, COST_CATEGORIES
+from salary_log import get_logger
+
+logger = get_logger('stores')
+
+# 一次請求最多的門店數
+MAX_STORES = 20
+
+SUMMARY_COLUMNS = ['store', 'period', 'consultants', 'staff', 'performance', 'consumption'] + COST_CATEGORIES \
+    + ['bonus_total', 'total_cost']
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def default_workers(jobs: int) -> int:
+    return max(1, min(jobs, os.cpu_count() or 1))
+
+
+def get_process_pool(workers: int) -> ProcessPoolExecutor:
+    """共用的 spawn 行程池;需要更多行程或前一個池已損壞時重新建立"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers < workers or getattr(_pool, '_broken', False):
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown_pool():
+    """關閉共用行程池 (測試或程式結束時使用)"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+        _pool, _pool_workers = None, 0
+
+
+def _outcome(job: Dict, result: Dict) -> Dict:
+    return {'store': job.get('store'), 'filename': job.get('filename'), **result}
+
+
+def _failure(job: Dict, error: BaseException) -> Dict:
+    logger.error("門店 %s 計算失敗: %s", job.get('store'), error)
+    return _outcome(job, {'success': False, 'error': f'計算過程發生錯誤: {error}'})
+
+
+def compute_stores(jobs: List[Dict], compute: Callable[[Dict], Dict], workers: int = None,
+                   processes: bool = True) -> List[Dict]:
+    """以工作池同時計算多家門店,結果依 jobs 的順序回傳
+
+    compute(job) 回傳 {'success': True, ...} 或 {'success': False, 'error': ...},拋出的例外
+    也會轉成該門店的失敗結果。只有一個工作或 workers=1 時直接在目前執行緒計算。
+    """
+    if not jobs:
+        return []
+    workers = workers or default_workers(len(jobs))
+    if workers <= 1 or len(jobs) == 1:
+        outcomes = []
+        for job in jobs:
+            try:
+                outcomes.append(_outcome(job, compute(job)))
+            except Exception as e:
+                outcomes.append(_failure(job, e))
+        return outcomes
+
+    if processes:
+        executor: Executor = get_process_pool(workers)
+    else:
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='store')
+    try:
+        futures = [executor.submit(compute, job) for job in jobs]
+        outcomes = []
+        for job, future in zip(jobs, futures):
+            try:
+                outcomes.append(_outcome(job, future.result()))
+            except Exception as e:
+                # 工作行程異常結束 (BrokenProcessPool) 時,下一次請求會重建行程池
+                outcomes.append(_failure(job, e))
+    finally:
+        if not processes:
+            executor.shutdown(wait=False)
+    logger.info("已計算 %d 家門店 (%d 家失敗, %d 個%s)", len(jobs),
+                sum(not outcome['success'] for outcome in outcomes), workers, '行程' if processes else '執行緒')
+    return outcomes
+
+
+def store_summary(outcomes: Iterable[Dict]) -> pd.DataFrame:
+    """跨門店彙總:每家成功計算的門店一列 (人數、顧問業績/消耗、各類人事成本),金額以分加總"""
+    rows = []
+    for outcome in outcomes:
+        if not outcome.get('success'):
+            continue
+        results = outcome['results']
+        consultants = results.get('consultant_bonuses') or {}
+        cents = dict.fromkeys(COST_CATEGORIES, 0)
+        for _, _, _, _, category, amount in line_items_from_results(results):
+            if category in cents:
+                cents[category] += int(to_cents(amount))
+        rows.append({
+            'store': outcome['store'],
+            'period': outcome.get('period'),
+            'consultants': len(consultants),
+            'staff': len(results.get('individual_staff_salaries') or {}),
+            'performance': sum(int(to_cents(data.get('personal_performance', 0))) for data in consultants.values()),
+            'consumption': sum(int(to_cents(data.get('personal_consumption', 0))) for data in consultants.values()),
+            **cents,
+        })
+    if not rows:
+        return pd.DataFrame(columns=SUMMARY_COLUMNS)
+    table = pd.DataFrame(rows)
+    table['bonus_total'] = table[BONUS_CATEGORIES].sum(axis=1)
+    table['total_cost'] = table['salary'] + table['bonus_total']
+    amounts = ['performance', 'consumption'] + COST_CATEGORIES + ['bonus_total', 'total_cost']
+    table[amounts] = from_cents(table[amounts].to_numpy(dtype=np.int64))
+    return table[SUMMARY_COLUMNS]
+
+
+def summary_totals(summary: pd.DataFrame) -> Dict:
+    """彙總表的合計列 (門店數、人數與各金額欄位)"""
+    totals = {'stores': len(summary)}
+    for column in SUMMARY_COLUMNS[2:]:
+        totals[column] = int(summary[column].sum()) if column in ('consultants', 'staff') else \
+            float(from_cents(int(to_cents(summary[column].to_numpy(dtype=float)).sum())))
+    return totals
@@ -0,0 +1,511 @@
+"""
+Only Beauty 薪資計算系統 - 網頁版計算器與單一門店計算工作
+
+Flask 的 /calculate、/export 與多門店工作池共用這裡的計算流程:
+
+    calculator, results, period = run_calculation(params)     # 單一門店,有誤時拋出 RequestError
+    outcomes = compute_stores(jobs, compute_store_job)          # 多門店,由 spawn 行程池執行
+
+compute_store_job 會送進 spawn 工作行程,子行程匯入的是這個模組而不是 app.py,
+因此這裡不可有匯入時的副作用 (設定日誌、開啟薪資歷史資料庫、建立 Flask app)。
+"""
+
+from typing import Dict, List
+
+import pandas as pd
+
+from consultant_directory import ConsultantDirectory
+from money import (add_amounts, divide_rounded, from_cents, mul_div, progressive_cents, rate_to_ppm,
+                   share_cents, to_cents)
+from payroll_history import resolve_period
+from salary_log import get_logger
+from salary_rules import apply_rules, load_rules
+from transaction_ledger import build_ledger
+from sheet_loader import load_latest_sheet
+from workbook_validator import validate_workbook
+
+logger = get_logger('flask')
+
+
+class OnlyBeautySalaryCalculator:
+    """薪資計算器 - 網頁版"""
+
+    def __init__(self):
+        # 級距表、分配比例與門檻由 salary_rules.json 載入 (計算時再依期間套用對應版本)
+        apply_rules(self, load_rules().for_period())
+
+        self.excel_data = None
+        self.consultant_count = 0
+        self.staff_count = 0
+        self.manager_name = None
+        self.unmatched_consultant_codes = {}
+        self.sheet_name = None
+
+    def load_excel_from_file(self, source, name: str = None) -> bool:
+        """載入Excel (或 CSV/Parquet);source 可為檔案路徑、位元組 (含 memoryview) 或檔案物件,name 為原始檔名"""
+        try:
+            # 由 workbook.xml 選出最新的數字工作表,只讀取該工作表
+            self.sheet_name, self.excel_data = load_latest_sheet(source, name)
+            return True
+
+        except Exception as e:
+            logger.error("載入Excel檔案時發生錯誤: %s", e)
+            return False
+
+    def get_consultants_data(self) -> List[Dict]:
+        """獲取顧問資料"""
+        if self.excel_data is None:
+            return []
+
+        consultants = []
+        row = 8  # A9對應index 8
+
+        while row < len(self.excel_data):
+            consultant_name = self.excel_data.iloc[row, 0]  # A欄
+
+            if pd.isna(consultant_name) or consultant_name == "":
+                break
+
+            if str(consultant_name).strip() != "公司":
+                personal_performance = self.excel_data.iloc[row, 2] if not pd.isna(self.excel_data.iloc[row, 2]) else 0
+                personal_consumption = self.excel_data.iloc[row, 6] if not pd.isna(self.excel_data.iloc[row, 6]) else 0
+
+                consultants.append({
+                    'name': consultant_name,
+                    'performance': float(personal_performance),
+                    'consumption': float(personal_consumption),
+                    'row': row + 1
+                })
+
+            row += 1
+
+        self.consultant_count = len(consultants)
+        return consultants
+
+    def calc_progressive_bonus(self, amount: float, levels: List[tuple], item: str = None) -> float:
+        """累進制計算獎金 (以分計算,依 item 的捨入規則取整)"""
+        return from_cents(progressive_cents(to_cents(amount), levels, self.rules.rounding_for(item)))
+
+    def get_product_sales_statistics(self, source) -> Dict:
+        """統計所有顧問的產品銷售組數"""
+        try:
+            # 一次掃描所有工作表建立明細總表,再由類別索引統計
+            return self.resolve_product_sales(build_ledger(source).product_sales_counts())
+
+        except Exception as e:
+            logger.error("統計產品銷售時發生錯誤: %s", e)
+            return {}
+
+    def resolve_product_sales(self, product_sales: Dict) -> Dict:
+        """將以O欄代號統計的組數對應到顧問名稱;無法對應的代號保留原樣並記在 unmatched_consultant_codes"""
+        directory = ConsultantDirectory(c['name'] for c in self.get_consultants_data())
+        resolved, self.unmatched_consultant_codes = directory.resolve_counts(product_sales)
+        resolved.update(self.unmatched_consultant_codes)
+        return resolved
+
+    def calculate_product_bonus(self, product_sales: Dict) -> Dict:
+        """計算產品達標獎金（30組以上得2000元）"""
+        product_bonuses = {}
+
+        for consultant, sales_count in product_sales.items():
+            bonus = self.rules.product_target_bonus if sales_count >= self.rules.product_target_sets else 0
+            product_bonuses[consultant] = {
+                'sales_count': sales_count,
+                'bonus': bonus,
+                'qualified': sales_count >= self.rules.product_target_sets
+            }
+
+        return product_bonuses
+
+    def calculate_consultant_bonus(self, product_bonuses: Dict = None) -> tuple:
+        """計算顧問獎金"""
+        if self.excel_data is None:
+            return {}, 0, 0
+
+        total_performance = self.excel_data.iloc[4, 4] if not pd.isna(self.excel_data.iloc[4, 4]) else 0
+        total_consumption = self.excel_data.iloc[6, 4] if not pd.isna(self.excel_data.iloc[6, 4]) else 0
+        consultants = self.get_consultants_data()
+
+        if not consultants:
+            return {}, 0, 0
+
+        performance_pool_cents, consumption_pool_cents = self.consultant_pool_cents(total_performance, total_consumption)
+        consultant_performance_pool = from_cents(performance_pool_cents)
+        consultant_consumption_pool = from_cents(consumption_pool_cents)
+
+        total_consultant_performance = sum(to_cents(c['performance']) for c in consultants)
+        total_consumption_cents = to_cents(total_consumption)
+        # 產品達標資料改以顧問名稱索引 (O欄代號經正規化/別名對應),每位顧問一次查詢
+        product_index = ConsultantDirectory(c['name'] for c in consultants).index_by_name(product_bonuses) if product_bonuses else {}
+        consultant_bonuses = {}
+
+        for consultant in consultants:
+            product_qualified = True  # 沒有產品銷售紀錄時預設達標
+            product_record = product_index.get(str(consultant['name']).strip())
+            if product_record is not None:
+                product_qualified = product_record['qualified']
+
+            perf_ok = consultant['performance'] >= self.rules.performance_bonus_gate
+            cons_ok = consultant['performance'] >= self.rules.consumption_bonus_gate
+
+            performance_bonus = 0
+            consumption_bonus = 0
+            if product_qualified:
+                if perf_ok and total_consultant_performance > 0:
+                    performance_bonus = mul_div(performance_pool_cents, to_cents(consultant['performance']),
+                                                total_consultant_performance, self.rules.rounding_for('performance_bonus'))
+                if cons_ok and total_consumption_cents > 0:
+                    consumption_bonus = mul_div(consumption_pool_cents, to_cents(consultant['consumption']),
+                                                total_consumption_cents, self.rules.rounding_for('consumption_bonus'))
+
+            consultant_bonuses[consultant['name']] = {
+                'performance_bonus': from_cents(performance_bonus),
+                'consumption_bonus': from_cents(consumption_bonus),
+                'total_bonus': from_cents(performance_bonus + consumption_bonus),
+                'personal_performance': consultant['performance'],
+                'personal_consumption': consultant['consumption'],
+                'product_qualified': product_qualified
+            }
+
+        return consultant_bonuses, consultant_performance_pool, consultant_consumption_pool
+
+    def consultant_pool_cents(self, total_performance: float, total_consumption: float) -> tuple:
+        """顧問團體業績/消耗獎金池 (分):E5/E7 累進獎金 × 顧問分配比例"""
+        rounding = self.rules.rounding_for('team_pool')
+        performance = progressive_cents(to_cents(total_performance), self.performance_bonus_levels, rounding)
+        consumption = progressive_cents(to_cents(total_consumption), self.consumption_bonus_levels, rounding)
+        return (share_cents(performance, self.rules.consultant_performance_share, rounding),
+                share_cents(consumption, self.rules.consultant_consumption_share, rounding))
+
+    def calculate_staff_bonus(self, consultant_performance_pool: float = None, consultant_consumption_pool: float = None) -> Dict:
+        """計算美容師/護士獎金"""
+        if self.excel_data is None or self.staff_count == 0:
+            return {}
+
+        if consultant_performance_pool is None or consultant_consumption_pool is None:
+            total_performance = self.excel_data.iloc[4, 4] if not pd.isna(self.excel_data.iloc[4, 4]) else 0
+            total_consumption = self.excel_data.iloc[6, 4] if not pd.isna(self.excel_data.iloc[6, 4]) else 0
+            consultant_performance_pool, consultant_consumption_pool = (
+                from_cents(pool) for pool in self.consultant_pool_cents(total_performance, total_consumption))
+
+        # 由顧問比例推算 100% 再取員工比例 (以分與 ppm 整數計算)
+        staff_performance_pool = mul_div(to_cents(consultant_performance_pool), rate_to_ppm(self.rules.staff_performance_share),
+                                         rate_to_ppm(self.rules.consultant_performance_share), self.rules.rounding_for('performance_pool'))
+        staff_consumption_pool = mul_div(to_cents(consultant_consumption_pool), rate_to_ppm(self.rules.staff_consumption_share),
+                                         rate_to_ppm(self.rules.consultant_consumption_share), self.rules.rounding_for('consumption_pool'))
+
+        performance_bonus_per_person = divide_rounded(staff_performance_pool, self.staff_count,
+                                                      self.rules.rounding_for('performance_bonus_per_person'))
+        consumption_bonus_per_person = divide_rounded(staff_consumption_pool, self.staff_count,
+                                                      self.rules.rounding_for('consumption_bonus_per_person'))
+
+        return {
+            'staff_count': self.staff_count,
+            'performance_pool': from_cents(staff_performance_pool),
+            'consumption_pool': from_cents(staff_consumption_pool),
+            'performance_bonus_per_person': from_cents(performance_bonus_per_person),
+            'consumption_bonus_per_person': from_cents(consumption_bonus_per_person),
+            'total_bonus_per_person': from_cents(performance_bonus_per_person + consumption_bonus_per_person)
+        }
+
+    def calculate_individual_bonus(self, consultant_bonuses: Dict, high_target_amount: float = None) -> Dict:
+        """計算個人業績獎金和個人消耗獎金"""
+        individual_bonuses = {}
+
+        total_performance = self.excel_data.iloc[4, 4] if not pd.isna(self.excel_data.iloc[4, 4]) else 0
+        store_achieved = high_target_amount and total_performance >= high_target_amount
+
+        for name, bonus_data in consultant_bonuses.items():
+            performance = bonus_data['personal_performance']
+            consumption = bonus_data['personal_consumption']
+
+            is_manager = (name == self.manager_name)
+
+            if is_manager:
+                perf_levels = self.manager_performance_levels
+                cons_levels = self.manager_consumption_levels
+                role = "店長"
+            else:
+                perf_levels = self.consultant_performance_levels
+                cons_levels = self.consultant_consumption_levels
+                role = "顧問"
+
+            individual_performance_bonus = self.calc_progressive_bonus(performance, perf_levels, 'individual_performance_bonus')
+            individual_consumption_bonus = self.calc_progressive_bonus(consumption, cons_levels, 'individual_consumption_bonus')
+
+            performance_incentive_bonus = 0
+            if performance >= self.rules.performance_incentive_gate and store_achieved:
+                performance_incentive_bonus = self.rules.performance_incentive_bonus
+
+            individual_bonuses[name] = {
+                'role': role,
+                'individual_performance_bonus': individual_performance_bonus,
+                'individual_consumption_bonus': individual_consumption_bonus,
+                'performance_incentive_bonus': performance_incentive_bonus,
+                'individual_total': add_amounts(individual_performance_bonus, individual_consumption_bonus)
+            }
+
+        return individual_bonuses
+
+    def get_individual_staff_data(self) -> List[Dict]:
+        """獲取個別美容師/護理師/櫃檯資料"""
+        if self.excel_data is None:
+            return []
+
+        staff_data = []
+
+        # 美容師資料 (K9-K15, L9-L15, M9-M15)
+        for row in range(8, 15):
+            if row < len(self.excel_data):
+                name = self.excel_data.iloc[row, 10]  # K欄
+                base_salary = self.rules.base_salaries['美容師']
+                hand_skill_bonus = self.excel_data.iloc[row, 12] if not pd.isna(self.excel_data.iloc[row, 12]) else 0
+
+                if pd.notna(name) and str(name).strip():
+                    staff_data.append({
+                        'name': str(name).strip(),
+                        'position': '美容師',
+                        'base_salary': float(base_salary),
+                        'hand_skill_bonus': float(hand_skill_bonus),
+                        'row': row + 1
+                    })
+
+        # 美容師資料 (N9-N15, O9-O15, P9-P15)
+        for row in range(8, 15):
+            if row < len(self.excel_data):
+                name = self.excel_data.iloc[row, 13]  # N欄
+                base_salary = self.excel_data.iloc[row, 14] if not pd.isna(self.excel_data.iloc[row, 14]) else self.rules.base_salaries['美容師']
+                hand_skill_bonus = self.excel_data.iloc[row, 15] if not pd.isna(self.excel_data.iloc[row, 15]) else 0
+
+                if pd.notna(name) and str(name).strip():
+                    staff_data.append({
+                        'name': str(name).strip(),
+                        'position': '美容師',
+                        'base_salary': float(base_salary),
+                        'hand_skill_bonus': float(hand_skill_bonus),
+                        'row': row + 1
+                    })
+
+        # 護理師資料 (Q9-Q11)
+        for row in range(8, 11):
+            if row < len(self.excel_data):
+                name = self.excel_data.iloc[row, 16]  # Q欄
+                base_salary = self.rules.base_salaries['護理師']
+                hand_skill_bonus = self.excel_data.iloc[row, 18] if not pd.isna(self.excel_data.iloc[row, 18]) else 0
+
+                if pd.notna(name) and str(name).strip():
+                    staff_data.append({
+                        'name': str(name).strip(),
+                        'position': '護理師',
+                        'base_salary': float(base_salary),
+                        'hand_skill_bonus': float(hand_skill_bonus),
+                        'row': row + 1
+                    })
+
+        # 櫃檯資料 (Q12-Q15)
+        for row in range(11, 15):
+            if row < len(self.excel_data):
+                name = self.excel_data.iloc[row, 16]  # Q欄
+                base_salary = self.rules.base_salaries['櫃檯']
+                hand_skill_bonus = self.excel_data.iloc[row, 18] if not pd.isna(self.excel_data.iloc[row, 18]) else 0
+
+                if pd.notna(name) and str(name).strip():
+                    staff_data.append({
+                        'name': str(name).strip(),
+                        'position': '櫃檯',
+                        'base_salary': float(base_salary),
+                        'hand_skill_bonus': float(hand_skill_bonus),
+                        'row': row + 1
+                    })
+
+        return staff_data
+
+    def calculate_high_target_bonus(self, high_target_amount: float = None) -> Dict:
+        """計算高標達標獎金"""
+        if high_target_amount is None:
+            return {}
+
+        total_performance = self.excel_data.iloc[4, 4] if not pd.isna(self.excel_data.iloc[4, 4]) else 0
+
+        if total_performance < high_target_amount:
+            return {}
+
+        staff_data = self.get_individual_staff_data()
+        high_target_bonuses = {}
+
+        for staff in staff_data:
+            if staff['position'] in self.high_target_bonuses:
+                bonus_amount = self.high_target_bonuses[staff['position']]
+                high_target_bonuses[staff['name']] = {
+                    'position': staff['position'],
+                    'bonus': bonus_amount
+                }
+
+        return high_target_bonuses
+
+    def calculate_individual_staff_salary(self, high_target_bonuses: Dict = None, staff_team_bonus: Dict = None, high_target_amount: float = None) -> Dict:
+        """計算個別美容師/護理師/櫃檯的完整薪資明細"""
+        staff_data = self.get_individual_staff_data()
+        salary_details = {}
+
+        total_performance = self.excel_data.iloc[4, 4] if not pd.isna(self.excel_data.iloc[4, 4]) else 0
+        total_consumption = self.excel_data.iloc[6, 4] if not pd.isna(self.excel_data.iloc[6, 4]) else 0
+
+        team_performance_bonus = 0
+        team_consumption_bonus = 0
+        if staff_team_bonus:
+            team_performance_bonus = staff_team_bonus.get('performance_bonus_per_person', 0)
+            team_consumption_bonus = staff_team_bonus.get('consumption_bonus_per_person', 0)
+
+        for staff in staff_data:
+            name = staff['name']
+            position = staff['position']
+            base_salary = staff['base_salary']
+            hand_skill_bonus = staff['hand_skill_bonus']
+
+            overtime_pay = 0
+
+            high_target_bonus = 0
+            if high_target_bonuses and name in high_target_bonuses:
+                high_target_bonus = high_target_bonuses[name]['bonus']
+
+            allowance = self.rules.allowances.get(position, {})
+            license_allowance = 0
+            full_attendance_bonus = 0
+            rank_bonus = 0
+            position_allowance = 0
+
+            consumption_achievement_bonus = 0
+            performance_500w_bonus = 0
+            store_performance_incentive = 0
+
+            if position == '護理師':
+                license_allowance = allowance.get('license_allowance', 0)
+                full_attendance_bonus = allowance.get('full_attendance_bonus', 0)
+            elif position == '櫃檯':
+                rank_bonus = allowance.get('rank_bonus', 0)
+                position_allowance = allowance.get('position_allowance', 0)
+
+                if high_target_amount and total_performance >= high_target_amount and total_consumption >= self.rules.consumption_achievement_gate:
+                    consumption_achievement_bonus = self.rules.consumption_achievement_bonus
+
+                if total_performance >= self.rules.performance_500w_gate:
+                    performance_500w_bonus = self.rules.performance_500w_bonus
+
+                if high_target_amount and total_performance >= high_target_amount:
+                    store_performance_incentive = self.rules.store_performance_incentive
+
+            if position == '美容師':
+                total_salary = add_amounts(base_salary, overtime_pay, hand_skill_bonus, license_allowance,
+                                           rank_bonus, position_allowance)
+            elif position == '護理師':
+                total_salary = add_amounts(base_salary, overtime_pay, hand_skill_bonus, license_allowance,
+                                           rank_bonus, position_allowance)
+            else:  # 櫃檯
+                total_salary = add_amounts(base_salary, overtime_pay, hand_skill_bonus, high_target_bonus, license_allowance, rank_bonus,
+                                           position_allowance, consumption_achievement_bonus, performance_500w_bonus, store_performance_incentive)
+
+            salary_details[name] = {
+                'position': position,
+                'base_salary': base_salary,
+                'overtime_pay': overtime_pay,
+                'hand_skill_bonus': hand_skill_bonus,
+                'team_performance_bonus': team_performance_bonus if position in ['美容師', '護理師'] else 0,
+                'team_consumption_bonus': team_consumption_bonus if position in ['美容師', '護理師'] else 0,
+                'high_target_bonus': high_target_bonus,
+                'license_allowance': license_allowance,
+                'full_attendance_bonus': full_attendance_bonus,
+                'rank_bonus': rank_bonus,
+                'position_allowance': position_allowance,
+                'consumption_achievement_bonus': consumption_achievement_bonus,
+                'performance_500w_bonus': performance_500w_bonus,
+                'store_performance_incentive': store_performance_incentive,
+                'total_salary': total_salary,
+                'row': staff['row']
+            }
+
+        return salary_details
+
+
+class RequestError(Exception):
+    """上傳檔或表單參數有誤;payload 為回傳給前端的 JSON"""
+
+    def __init__(self, error: str, **extra):
+        super().__init__(error)
+        self.payload = {'success': False, 'error': error, **extra}
+
+
+def run_calculation(params: Dict) -> tuple:
+    """執行完整薪資計算,回傳 (計算器, 結果, 計算期間);檔案版面或載入有誤時拋出 RequestError"""
+    file_bytes = params['file_bytes']
+    high_target_amount = params['high_target_amount']
+
+    # 先快速檢查版面,避免錯誤檔案進入完整解析流程
+    problems = validate_workbook(file_bytes)
+    if problems:
+        raise RequestError('Excel檔案版面不符: ' + '；'.join(problems), problems=problems)
+
+    # 初始化計算器
+    calculator = OnlyBeautySalaryCalculator()
+    calculator.staff_count = params['staff_count']
+    calculator.manager_name = params['manager_name'] if params['manager_name'] else None
+
+    # 載入Excel檔案
+    if not calculator.load_excel_from_file(file_bytes, params['filename']):
+        raise RequestError('Excel檔案載入失敗，請檢查檔案格式')
+
+    # 依計算期間套用當時有效的薪資規則
+    period = resolve_period(params['period'], calculator.sheet_name)
+    apply_rules(calculator, load_rules().for_period(period))
+
+    # 統計產品銷售
+    product_sales = calculator.get_product_sales_statistics(file_bytes)
+    product_bonuses = calculator.calculate_product_bonus(product_sales)
+
+    # 計算團體獎金
+    consultant_bonuses, consultant_performance_pool, consultant_consumption_pool = calculator.calculate_consultant_bonus(product_bonuses)
+    staff_bonuses = calculator.calculate_staff_bonus(consultant_performance_pool, consultant_consumption_pool)
+
+    # 計算個人獎金
+    individual_bonuses = calculator.calculate_individual_bonus(consultant_bonuses, high_target_amount)
+
+    # 計算高標達標獎金
+    high_target_bonuses = {}
+    if high_target_amount:
+        high_target_bonuses = calculator.calculate_high_target_bonus(high_target_amount)
+
+    # 計算個別員工薪資明細
+    individual_staff_salaries = calculator.calculate_individual_staff_salary(high_target_bonuses, staff_bonuses, high_target_amount)
+
+    # 準備回傳結果
+    results = {
+        'consultant_bonuses': consultant_bonuses,
+        'staff_bonuses': staff_bonuses,
+        'individual_bonuses': individual_bonuses,
+        'high_target_bonuses': high_target_bonuses,
+        'individual_staff_salaries': individual_staff_salaries,
+        'product_bonuses': product_bonuses,
+        'unmatched_consultant_codes': calculator.unmatched_consultant_codes
+    }
+    return calculator, results, period
+
+
+def history_parameters(params: Dict, calculator: OnlyBeautySalaryCalculator) -> Dict:
+    """寫入薪資歷史的計算參數"""
+    return {
+        'sheet': calculator.sheet_name,
+        'staff_count': params['staff_count'],
+        'manager': calculator.manager_name,
+        'high_target': params['high_target_amount'],
+        'rules_version': calculator.rules.version,
+    }
+
+
+def compute_store_job(params: Dict) -> Dict:
+    """多門店工作池的單一門店計算 (在 spawn 工作行程執行,不寫入薪資歷史)"""
+    try:
+        calculator, results, period = run_calculation(params)
+    except RequestError as e:
+        return e.payload
+    return {'success': True, 'period': period, 'results': results,
+            'parameters': history_parameters(params, calculator)}
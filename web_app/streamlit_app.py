@@ -1,11 +1,36 @@
 import streamlit as st
 import pandas as pd
-import os
-import tempfile
+import copy
+import time
 import traceback
 from typing import Dict, List
 import json
 
+from salary_log import configure_logging, get_logger
+from consultant_directory import ConsultantDirectory
+from calc_worker import DONE, FAILED, CalcJob, CalcWorker, Stage, job_key
+from bonus_forecast import (DEFAULT_PATHS, days_in_period, forecast_bonuses, project_product_qualified,
+                             read_daily_snapshots)
+from payroll_history import PayrollHistory, default_store_name, record_run_safely, resolve_period
+from money import (add_amounts, divide_rounded, from_cents, full_amount_cents, mul_div, progressive_cents, rate_to_ppm,
+                   share_cents, to_cents)
+from salary_rules import apply_rules, load_rules
+from tier_gaps import consultant_gaps, store_gaps
+from payroll_export import XLSX_MIME, payroll_xlsx_bytes
+from payslips import PAYSLIP_FORMATS, payslip_records, payslip_zip_bytes
+from payroll_reports import annual_employee_report, store_cost_summary, with_labels, year_to_date_report
+from store_batch import MAX_STORES, compute_stores, default_workers, store_summary, summary_totals
+from result_tables import AMOUNT_COLUMNS, CONSULTANT_LABELS, POSITIONS, SALARY_LABELS, consultant_table, salary_table
+from transaction_ledger import TransactionLedger, build_ledger
+from upload_store import UploadStore
+from sheet_loader import load_latest_sheet
+from workbook_validator import validate_workbook
+
+logger = get_logger('streamlit')
+# Streamlit 每次互動都會重跑整個腳本,只在第一次設定 handler
+if not get_logger().handlers:
+    configure_logging()
+
 # 設定頁面配置
 st.set_page_config(
     page_title="Only Beauty 薪資計算系統",
@@ -65,113 +90,54 @@ class OnlyBeautySalaryCalculator:
     """薪資計算器 - Streamlit版"""
 
     def __init__(self):
-        # 團體業績獎金等級表
-        self.performance_bonus_levels = [
-            (1800000, 2500000, 0.005),
-            (2500001, 4000000, 0.01),
-            (4000001, 6000000, 0.025),
-            (6000001, 8000000, 0.045)
-        ]
-
-        # 團體消耗獎金等級表
-        self.consumption_bonus_levels = [
-            (0, 1500000, 0.006),
-            (1500001, 2500000, 0.01),
-            (2500001, float('inf'), 0.015)
-        ]
-
-        # 個人業績獎金等級表
-        self.manager_performance_levels = [
-            (0, 1000000, 0.008),
-            (1000001, 1600000, 0.01),
-            (1600001, 2100000, 0.016),
-            (2100001, float('inf'), 0.021)
-        ]
-
-        self.consultant_performance_levels = [
-            (0, 600000, 0.004),
-            (600001, 1200000, 0.007),
-            (1200001, 1700000, 0.008),
-            (1700001, float('inf'), 0.012)
-        ]
-
-        # 個人消耗獎金等級表
-        self.manager_consumption_levels = [
-            (0, 500000, 0.012),
-            (500001, 1000000, 0.015),
-            (1000001, float('inf'), 0.024)
-        ]
-
-        self.consultant_consumption_levels = [
-            (0, 300000, 0.006),
-            (300001, 600000, 0.008),
-            (600001, float('inf'), 0.012)
-        ]
-
-        # 副店長 個人業績 / 個人消耗 等級表
-        self.deputy_performance_levels = [
-            (0, 800000, 0.005),
-            (800001, 1400000, 0.008),
-            (1400001, 1900000, 0.012),
-            (1900001, float('inf'), 0.016)
-        ]
-
-        self.deputy_consumption_levels = [
-            (0, 400000, 0.010),
-            (400001, 900000, 0.012),
-            (900001, float('inf'), 0.018)
-        ]
-
-        # 高標達標獎金設定
-        self.high_target_bonuses = {
-            '美容師': 5000,
-            '護理師': 10000
-        }
+        # 級距表、分配比例與門檻由 salary_rules.json 載入 (計算時再依期間套用對應版本)
+        apply_rules(self, load_rules().for_period())
 
         self.excel_data = None
         self.consultant_count = 0
         self.staff_count = 0
         self.manager_name = None
+        self.unmatched_consultant_codes = {}
+        self.sheet_name = None
+
+        # 交易明細總表 (依上傳檔快取)
+        self.ledger = None
+        self._ledger_source = None
+
+        # 由共用上傳儲存區載入時的來源
+        self.upload_store = None
+        self.upload_digest = None
+        # 最近一次載入失敗的原因 (由畫面端顯示;計算器本身不呼叫 st.*)
+        self.load_error = None
 
     def load_excel_from_bytes(self, file_bytes) -> bool:
         """從檔案位元組載入Excel"""
         try:
-            # 使用臨時檔案
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp_file:
-                tmp_file.write(file_bytes)
-                tmp_file_path = tmp_file.name
-
-            # 讀取所有工作表名稱
-            xl_file = pd.ExcelFile(tmp_file_path)
-            sheet_names = xl_file.sheet_names
-
-            # 篩選出數字工作表名稱
-            numeric_sheets = []
-            for sheet in sheet_names:
-                try:
-                    if sheet.isdigit() or (isinstance(sheet, str) and sheet.replace('.', '').isdigit()):
-                        numeric_sheets.append(int(float(sheet)))
-                    elif isinstance(sheet, str) and len(sheet) == 6 and sheet.isdigit():
-                        numeric_sheets.append(int(sheet))
-                except ValueError:
-                    continue
-
-            if not numeric_sheets:
-                os.unlink(tmp_file_path)
-                return False
+            # 由 workbook.xml 選出最新的數字工作表,只讀取該工作表
+            self.sheet_name, self.excel_data = load_latest_sheet(file_bytes)
+            self.load_error = None
+            return True
 
-            # 找出最大的數字工作表
-            max_sheet = str(max(numeric_sheets))
+        except Exception as e:
+            logger.exception("載入Excel檔案時發生錯誤")
+            self.load_error = str(e)
+            return False
 
-            # 讀取該工作表
-            self.excel_data = pd.read_excel(tmp_file_path, sheet_name=max_sheet, header=None)
+    def load_upload(self, store: UploadStore, digest: str, name: str = None) -> bool:
+        """從共用上傳儲存區載入;解析後的工作表與交易明細總表由所有 session 共用
 
-            # 清理臨時檔案
-            os.unlink(tmp_file_path)
+        name 為上傳檔名,單一 CSV/Parquet 檔以它作為工作表名稱 (例如 202412.csv),因此也納入快取鍵。
+        """
+        try:
+            self.sheet_name, self.excel_data = store.derived(
+                digest, f'latest_sheet:{name or ""}', lambda data: load_latest_sheet(data, name))
+            self.upload_store, self.upload_digest = store, digest
+            self.load_error = None
             return True
 
         except Exception as e:
-            st.error(f"載入Excel檔案時發生錯誤: {e}")
+            logger.exception("載入Excel檔案時發生錯誤")
+            self.load_error = str(e)
             return False
 
     def get_consultants_data(self) -> List[Dict]:
@@ -204,117 +170,64 @@ class OnlyBeautySalaryCalculator:
         self.consultant_count = len(consultants)
         return consultants
 
-    def calc_progressive_bonus(self, amount: float, levels: List[tuple]) -> float:
-        """累進制計算獎金"""
-        total = 0
-        for min_val, max_val, rate in levels:
-            if amount > min_val:
-                upper_bound = min(amount, max_val)
-                taxable_amount = upper_bound - min_val
-                bonus_for_this_level = taxable_amount * rate
-                total += bonus_for_this_level
-            if amount <= max_val:
-                break
-        return total
-
-    def calc_full_amount_bonus(self, amount: float, levels: List[tuple]) -> float:
-        """全額抽成:整筆金額 × 所落最高級距的單一費率"""
-        selected_rate = levels[0][2]
-        for min_val, max_val, rate in levels:
-            if amount > min_val:
-                selected_rate = rate
-        return amount * selected_rate
-
-    def get_vip_statistics(self, file_bytes) -> Dict:
-        """統計所有 sheet 的 VIP 項目 (D17 以下 = VIP, E 欄 = 項目名稱)"""
-        try:
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp_file:
-                tmp_file.write(file_bytes)
-                tmp_file_path = tmp_file.name
-
-            xl_file = pd.ExcelFile(tmp_file_path)
-            sheet_names = xl_file.sheet_names
-            vip_statistics = {}
-
-            for sheet_name in sheet_names:
-                try:
-                    df = pd.read_excel(tmp_file_path, sheet_name=sheet_name, header=None)
-
-                    # 從第17行開始 (index 16)
-                    for row_idx in range(16, len(df)):
-                        d_cell = df.iloc[row_idx, 3] if row_idx < len(df) and 3 < len(df.columns) else None
+    def calc_progressive_bonus(self, amount: float, levels: List[tuple], item: str = None) -> float:
+        """累進制計算獎金 (以分計算,依 item 的捨入規則取整)"""
+        return from_cents(progressive_cents(to_cents(amount), levels, self.rules.rounding_for(item)))
 
-                        # 檢查 D 欄是否包含 "VIP"
-                        if pd.notna(d_cell) and "VIP" in str(d_cell):
-                            e_cell = df.iloc[row_idx, 4] if row_idx < len(df) and 4 < len(df.columns) else None
+    def calc_full_amount_bonus(self, amount: float, levels: List[tuple], item: str = None) -> float:
+        """全額抽成:整筆金額 × 所落最高級距的單一費率 (以分計算)"""
+        return from_cents(full_amount_cents(to_cents(amount), levels, self.rules.rounding_for(item)))
 
-                            if pd.notna(e_cell):
-                                item_name = str(e_cell).strip()
+    def get_ledger(self, file_bytes=None) -> TransactionLedger:
+        """取得交易明細總表;同一份上傳檔只掃描一次,VIP 與產品統計共用
 
-                                if item_name not in vip_statistics:
-                                    vip_statistics[item_name] = 0
+        未指定 file_bytes 時使用 load_upload 載入的檔案,總表存放在共用儲存區供所有 session 使用。
+        """
+        if file_bytes is None:
+            return self.upload_store.derived(self.upload_digest, 'ledger', build_ledger)
+        if self.ledger is None or self._ledger_source is not file_bytes:
+            self.ledger = build_ledger(file_bytes)
+            self._ledger_source = file_bytes
+        return self.ledger
 
-                                vip_statistics[item_name] += 1
+    def get_vip_statistics(self, file_bytes=None) -> Dict:
+        """統計所有 sheet 的 VIP 項目 (D17 以下 = VIP, E 欄 = 項目名稱)
 
-                except Exception:
-                    continue
-
-            os.unlink(tmp_file_path)
-            return vip_statistics
-
-        except Exception as e:
-            st.error(f"統計 VIP 項目時發生錯誤: {e}")
-            return {}
-
-    def get_product_sales_statistics(self, file_bytes) -> Dict:
-        """統計所有顧問的產品銷售組數"""
+        會在背景計算執行緒呼叫,錯誤記錄後往上拋出,由 CalcJob 標記為失敗並在畫面顯示。
+        """
         try:
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp_file:
-                tmp_file.write(file_bytes)
-                tmp_file_path = tmp_file.name
-
-            xl_file = pd.ExcelFile(tmp_file_path)
-            sheet_names = xl_file.sheet_names
-            consultant_product_sales = {}
-
-            for sheet_name in sheet_names:
-                try:
-                    df = pd.read_excel(tmp_file_path, sheet_name=sheet_name, header=None)
+            return self.get_ledger(file_bytes).vip_item_counts()
 
-                    for row_idx in range(16, len(df)):
-                        f_cell = df.iloc[row_idx, 5] if row_idx < len(df) and 5 < len(df.columns) else None
+        except Exception:
+            logger.exception("統計 VIP 項目時發生錯誤")
+            raise
 
-                        if pd.notna(f_cell) and str(f_cell).strip() == "購產品":
-                            o_cell = df.iloc[row_idx, 14] if row_idx < len(df) and 14 < len(df.columns) else None
-
-                            if pd.notna(o_cell):
-                                consultant_code = str(o_cell).strip()
-
-                                if consultant_code not in consultant_product_sales:
-                                    consultant_product_sales[consultant_code] = 0
-
-                                consultant_product_sales[consultant_code] += 1
-
-                except Exception:
-                    continue
+    def get_product_sales_statistics(self, file_bytes=None) -> Dict:
+        """統計所有顧問的產品銷售組數 (錯誤記錄後往上拋出,同 get_vip_statistics)"""
+        try:
+            return self.resolve_product_sales(self.get_ledger(file_bytes).product_sales_counts())
 
-            os.unlink(tmp_file_path)
-            return consultant_product_sales
+        except Exception:
+            logger.exception("統計產品銷售時發生錯誤")
+            raise
 
-        except Exception as e:
-            st.error(f"統計產品銷售時發生錯誤: {e}")
-            return {}
+    def resolve_product_sales(self, product_sales: Dict) -> Dict:
+        """將以O欄代號統計的組數對應到顧問名稱;無法對應的代號保留原樣並記在 unmatched_consultant_codes"""
+        directory = ConsultantDirectory(c['name'] for c in self.get_consultants_data())
+        resolved, self.unmatched_consultant_codes = directory.resolve_counts(product_sales)
+        resolved.update(self.unmatched_consultant_codes)
+        return resolved
 
     def calculate_product_bonus(self, product_sales: Dict) -> Dict:
         """計算產品達標獎金（30組以上得2000元）"""
         product_bonuses = {}
 
         for consultant, sales_count in product_sales.items():
-            bonus = 2000 if sales_count >= 30 else 0
+            bonus = self.rules.product_target_bonus if sales_count >= self.rules.product_target_sets else 0
             product_bonuses[consultant] = {
                 'sales_count': sales_count,
                 'bonus': bonus,
-                'qualified': sales_count >= 30
+                'qualified': sales_count >= self.rules.product_target_sets
             }
 
         return product_bonuses
@@ -331,40 +244,39 @@ class OnlyBeautySalaryCalculator:
         if not consultants:
             return {}, 0, 0
 
-        consultant_performance_pool = self.calc_progressive_bonus(total_performance, self.performance_bonus_levels) * 0.7
-        consultant_consumption_pool = self.calc_progressive_bonus(total_consumption, self.consumption_bonus_levels) * 0.4
+        performance_pool_cents, consumption_pool_cents = self.consultant_pool_cents(total_performance, total_consumption)
+        consultant_performance_pool = from_cents(performance_pool_cents)
+        consultant_consumption_pool = from_cents(consumption_pool_cents)
 
-        total_consultant_performance = sum(c['performance'] for c in consultants)
+        total_consultant_performance = sum(to_cents(c['performance']) for c in consultants)
+        total_consumption_cents = to_cents(total_consumption)
+        # 產品達標資料改以顧問名稱索引 (O欄代號經正規化/別名對應),每位顧問一次查詢
+        product_index = ConsultantDirectory(c['name'] for c in consultants).index_by_name(product_bonuses) if product_bonuses else {}
         consultant_bonuses = {}
 
         for consultant in consultants:
-            product_qualified = True
-            if product_bonuses and consultant['name'] in product_bonuses:
-                product_qualified = product_bonuses[consultant['name']]['qualified']
+            product_qualified = True  # 沒有產品銷售紀錄時預設達標
+            product_record = product_index.get(str(consultant['name']).strip())
+            if product_record is not None:
+                product_qualified = product_record['qualified']
 
-            perf_ok = consultant['performance'] >= 1680000
-            cons_ok = consultant['performance'] >= 1200000
+            perf_ok = consultant['performance'] >= self.rules.performance_bonus_gate
+            cons_ok = consultant['performance'] >= self.rules.consumption_bonus_gate
 
-            if not product_qualified:
-                performance_bonus = 0
-                consumption_bonus = 0
-            else:
+            performance_bonus = 0
+            consumption_bonus = 0
+            if product_qualified:
                 if perf_ok and total_consultant_performance > 0:
-                    performance_ratio = consultant['performance'] / total_consultant_performance
-                    performance_bonus = consultant_performance_pool * performance_ratio
-                else:
-                    performance_bonus = 0
-
-                if cons_ok and total_consumption > 0:
-                    consumption_ratio = consultant['consumption'] / total_consumption
-                    consumption_bonus = consultant_consumption_pool * consumption_ratio
-                else:
-                    consumption_bonus = 0
+                    performance_bonus = mul_div(performance_pool_cents, to_cents(consultant['performance']),
+                                                total_consultant_performance, self.rules.rounding_for('performance_bonus'))
+                if cons_ok and total_consumption_cents > 0:
+                    consumption_bonus = mul_div(consumption_pool_cents, to_cents(consultant['consumption']),
+                                                total_consumption_cents, self.rules.rounding_for('consumption_bonus'))
 
             consultant_bonuses[consultant['name']] = {
-                'performance_bonus': performance_bonus,
-                'consumption_bonus': consumption_bonus,
-                'total_bonus': performance_bonus + consumption_bonus,
+                'performance_bonus': from_cents(performance_bonus),
+                'consumption_bonus': from_cents(consumption_bonus),
+                'total_bonus': from_cents(performance_bonus + consumption_bonus),
                 'personal_performance': consultant['performance'],
                 'personal_consumption': consultant['consumption'],
                 'product_qualified': product_qualified
@@ -372,6 +284,14 @@ class OnlyBeautySalaryCalculator:
 
         return consultant_bonuses, consultant_performance_pool, consultant_consumption_pool
 
+    def consultant_pool_cents(self, total_performance: float, total_consumption: float) -> tuple:
+        """顧問團體業績/消耗獎金池 (分):E5/E7 累進獎金 × 顧問分配比例"""
+        rounding = self.rules.rounding_for('team_pool')
+        performance = progressive_cents(to_cents(total_performance), self.performance_bonus_levels, rounding)
+        consumption = progressive_cents(to_cents(total_consumption), self.consumption_bonus_levels, rounding)
+        return (share_cents(performance, self.rules.consultant_performance_share, rounding),
+                share_cents(consumption, self.rules.consultant_consumption_share, rounding))
+
     def calculate_staff_bonus(self, consultant_performance_pool: float = None, consultant_consumption_pool: float = None) -> Dict:
         """計算美容師/護士獎金"""
         if self.excel_data is None or self.staff_count == 0:
@@ -380,22 +300,27 @@ class OnlyBeautySalaryCalculator:
         if consultant_performance_pool is None or consultant_consumption_pool is None:
             total_performance = self.excel_data.iloc[4, 4] if not pd.isna(self.excel_data.iloc[4, 4]) else 0
             total_consumption = self.excel_data.iloc[6, 4] if not pd.isna(self.excel_data.iloc[6, 4]) else 0
-            consultant_performance_pool = self.calc_progressive_bonus(total_performance, self.performance_bonus_levels) * 0.7
-            consultant_consumption_pool = self.calc_progressive_bonus(total_consumption, self.consumption_bonus_levels) * 0.4
+            consultant_performance_pool, consultant_consumption_pool = (
+                from_cents(pool) for pool in self.consultant_pool_cents(total_performance, total_consumption))
 
-        staff_performance_pool = consultant_performance_pool / 0.7 * 0.3
-        staff_consumption_pool = consultant_consumption_pool / 0.4 * 0.6
+        # 由顧問比例推算 100% 再取員工比例 (以分與 ppm 整數計算)
+        staff_performance_pool = mul_div(to_cents(consultant_performance_pool), rate_to_ppm(self.rules.staff_performance_share),
+                                         rate_to_ppm(self.rules.consultant_performance_share), self.rules.rounding_for('performance_pool'))
+        staff_consumption_pool = mul_div(to_cents(consultant_consumption_pool), rate_to_ppm(self.rules.staff_consumption_share),
+                                         rate_to_ppm(self.rules.consultant_consumption_share), self.rules.rounding_for('consumption_pool'))
 
-        performance_bonus_per_person = staff_performance_pool / self.staff_count
-        consumption_bonus_per_person = staff_consumption_pool / self.staff_count
+        performance_bonus_per_person = divide_rounded(staff_performance_pool, self.staff_count,
+                                                      self.rules.rounding_for('performance_bonus_per_person'))
+        consumption_bonus_per_person = divide_rounded(staff_consumption_pool, self.staff_count,
+                                                      self.rules.rounding_for('consumption_bonus_per_person'))
 
         return {
             'staff_count': self.staff_count,
-            'performance_pool': staff_performance_pool,
-            'consumption_pool': staff_consumption_pool,
-            'performance_bonus_per_person': performance_bonus_per_person,
-            'consumption_bonus_per_person': consumption_bonus_per_person,
-            'total_bonus_per_person': performance_bonus_per_person + consumption_bonus_per_person
+            'performance_pool': from_cents(staff_performance_pool),
+            'consumption_pool': from_cents(staff_consumption_pool),
+            'performance_bonus_per_person': from_cents(performance_bonus_per_person),
+            'consumption_bonus_per_person': from_cents(consumption_bonus_per_person),
+            'total_bonus_per_person': from_cents(performance_bonus_per_person + consumption_bonus_per_person)
         }
 
     def calculate_individual_bonus(self, consultant_bonuses: Dict, high_target_amount: float = None, role_config: Dict = None) -> Dict:
@@ -425,12 +350,12 @@ class OnlyBeautySalaryCalculator:
                 cons_levels = self.consultant_consumption_levels
 
             calc = self.calc_full_amount_bonus if mode == '全額' else self.calc_progressive_bonus
-            individual_performance_bonus = calc(performance, perf_levels)
-            individual_consumption_bonus = calc(consumption, cons_levels)
+            individual_performance_bonus = calc(performance, perf_levels, item='individual_performance_bonus')
+            individual_consumption_bonus = calc(consumption, cons_levels, item='individual_consumption_bonus')
 
             performance_incentive_bonus = 0
-            if performance >= 1680000 and store_achieved:
-                performance_incentive_bonus = 10000
+            if performance >= self.rules.performance_incentive_gate and store_achieved:
+                performance_incentive_bonus = self.rules.performance_incentive_bonus
 
             individual_bonuses[name] = {
                 'role': role,
@@ -438,7 +363,7 @@ class OnlyBeautySalaryCalculator:
                 'individual_performance_bonus': individual_performance_bonus,
                 'individual_consumption_bonus': individual_consumption_bonus,
                 'performance_incentive_bonus': performance_incentive_bonus,
-                'individual_total': individual_performance_bonus + individual_consumption_bonus
+                'individual_total': add_amounts(individual_performance_bonus, individual_consumption_bonus)
             }
 
         return individual_bonuses
@@ -454,7 +379,7 @@ class OnlyBeautySalaryCalculator:
         for row in range(8, 15):
             if row < len(self.excel_data):
                 name = self.excel_data.iloc[row, 10]  # K欄
-                base_salary = 31054
+                base_salary = self.rules.base_salaries['美容師']
                 hand_skill_bonus = self.excel_data.iloc[row, 12] if not pd.isna(self.excel_data.iloc[row, 12]) else 0
 
                 if pd.notna(name) and str(name).strip():
@@ -470,7 +395,7 @@ class OnlyBeautySalaryCalculator:
         for row in range(8, 15):
             if row < len(self.excel_data):
                 name = self.excel_data.iloc[row, 13]  # N欄
-                base_salary = self.excel_data.iloc[row, 14] if not pd.isna(self.excel_data.iloc[row, 14]) else 31054
+                base_salary = self.excel_data.iloc[row, 14] if not pd.isna(self.excel_data.iloc[row, 14]) else self.rules.base_salaries['美容師']
                 hand_skill_bonus = self.excel_data.iloc[row, 15] if not pd.isna(self.excel_data.iloc[row, 15]) else 0
 
                 if pd.notna(name) and str(name).strip():
@@ -486,7 +411,7 @@ class OnlyBeautySalaryCalculator:
         for row in range(8, 11):
             if row < len(self.excel_data):
                 name = self.excel_data.iloc[row, 16]  # Q欄
-                base_salary = 31175
+                base_salary = self.rules.base_salaries['護理師']
                 hand_skill_bonus = self.excel_data.iloc[row, 18] if not pd.isna(self.excel_data.iloc[row, 18]) else 0
 
                 if pd.notna(name) and str(name).strip():
@@ -502,7 +427,7 @@ class OnlyBeautySalaryCalculator:
         for row in range(11, 15):
             if row < len(self.excel_data):
                 name = self.excel_data.iloc[row, 16]  # Q欄
-                base_salary = 31054
+                base_salary = self.rules.base_salaries['櫃檯']
                 hand_skill_bonus = self.excel_data.iloc[row, 18] if not pd.isna(self.excel_data.iloc[row, 18]) else 0
 
                 if pd.notna(name) and str(name).strip():
@@ -565,6 +490,7 @@ class OnlyBeautySalaryCalculator:
             if high_target_bonuses and name in high_target_bonuses:
                 high_target_bonus = high_target_bonuses[name]['bonus']
 
+            allowance = self.rules.allowances.get(position, {})
             license_allowance = 0
             full_attendance_bonus = 0
             rank_bonus = 0
@@ -575,32 +501,30 @@ class OnlyBeautySalaryCalculator:
             store_performance_incentive = 0
 
             if position == '護理師':
-                license_allowance = 5000
-                full_attendance_bonus = 2000
+                license_allowance = allowance.get('license_allowance', 0)
+                full_attendance_bonus = allowance.get('full_attendance_bonus', 0)
             elif position == '櫃檯':
-                rank_bonus = 1946
-                position_allowance = 2000
+                rank_bonus = allowance.get('rank_bonus', 0)
+                position_allowance = allowance.get('position_allowance', 0)
 
-                if high_target_amount and total_performance >= high_target_amount and total_consumption >= 3000000:
-                    consumption_achievement_bonus = 3000
+                if high_target_amount and total_performance >= high_target_amount and total_consumption >= self.rules.consumption_achievement_gate:
+                    consumption_achievement_bonus = self.rules.consumption_achievement_bonus
 
-                if total_performance >= 5000000:
-                    performance_500w_bonus = 5000
+                if total_performance >= self.rules.performance_500w_gate:
+                    performance_500w_bonus = self.rules.performance_500w_bonus
 
                 if high_target_amount and total_performance >= high_target_amount:
-                    store_performance_incentive = 5000
+                    store_performance_incentive = self.rules.store_performance_incentive
 
             if position == '美容師':
-                total_salary = (base_salary + overtime_pay + hand_skill_bonus +
-                              license_allowance + rank_bonus + position_allowance)
+                total_salary = add_amounts(base_salary, overtime_pay, hand_skill_bonus, license_allowance,
+                                           rank_bonus, position_allowance)
             elif position == '護理師':
-                total_salary = (base_salary + overtime_pay + hand_skill_bonus +
-                              license_allowance + rank_bonus + position_allowance)
+                total_salary = add_amounts(base_salary, overtime_pay, hand_skill_bonus, license_allowance,
+                                           rank_bonus, position_allowance)
             else:  # 櫃檯
-                total_salary = (base_salary + overtime_pay + hand_skill_bonus + high_target_bonus +
-                              license_allowance +
-                              rank_bonus + position_allowance + consumption_achievement_bonus +
-                              performance_500w_bonus + store_performance_incentive)
+                total_salary = add_amounts(base_salary, overtime_pay, hand_skill_bonus, high_target_bonus, license_allowance, rank_bonus,
+                                           position_allowance, consumption_achievement_bonus, performance_500w_bonus, store_performance_incentive)
 
             salary_details[name] = {
                 'position': position,
@@ -623,12 +547,626 @@ class OnlyBeautySalaryCalculator:
 
         return salary_details
 
+def calculation_stages(calculator: OnlyBeautySalaryCalculator, high_target_amount: float, role_config: Dict,
+                       history: PayrollHistory, store: str, period: str, source_file: str) -> List[Stage]:
+    """薪資計算流程的各個階段 (在背景執行緒執行,不可呼叫 st.*);結果寫入 context['results']"""
+
+    def vip(ctx):
+        ctx['vip_statistics'] = calculator.get_vip_statistics()
+
+    def products(ctx):
+        product_sales = calculator.get_product_sales_statistics()
+        ctx['product_bonuses'] = calculator.calculate_product_bonus(product_sales)
+
+    def team(ctx):
+        ctx['consultant_bonuses'], performance_pool, consumption_pool = \
+            calculator.calculate_consultant_bonus(ctx['product_bonuses'])
+        ctx['staff_bonuses'] = calculator.calculate_staff_bonus(performance_pool, consumption_pool)
+
+    def individual(ctx):
+        ctx['individual_bonuses'] = calculator.calculate_individual_bonus(
+            ctx['consultant_bonuses'], high_target_amount, role_config)
+
+    def high_target(ctx):
+        ctx['high_target_bonuses'] = {}
+        if high_target_amount:
+            ctx['high_target_bonuses'] = calculator.calculate_high_target_bonus(high_target_amount)
+
+    def salaries(ctx):
+        ctx['individual_staff_salaries'] = calculator.calculate_individual_staff_salary(
+            ctx['high_target_bonuses'], ctx['staff_bonuses'], high_target_amount)
+
+    def record(ctx):
+        ctx['results'] = {
+            'consultant_bonuses': ctx['consultant_bonuses'],
+            'staff_bonuses': ctx['staff_bonuses'],
+            'individual_bonuses': ctx['individual_bonuses'],
+            'high_target_bonuses': ctx['high_target_bonuses'],
+            'individual_staff_salaries': ctx['individual_staff_salaries'],
+            'product_bonuses': ctx['product_bonuses'],
+            'unmatched_consultant_codes': calculator.unmatched_consultant_codes,
+            'vip_statistics': ctx['vip_statistics']
+        }
+        ctx['store'], ctx['period'] = store, period
+        # 寫入薪資歷史 (失敗不影響計算結果)
+        ctx['run_id'] = record_run_safely(history, store, period, ctx['results'], {
+            'sheet': calculator.sheet_name,
+            'staff_count': calculator.staff_count,
+            'manager': calculator.manager_name,
+            'high_target': high_target_amount,
+            'role_config': role_config,
+            'rules_version': calculator.rules.version,
+        }, source_file)
+
+    return [
+        ('統計 VIP 項目', vip),
+        ('統計產品銷售', products),
+        ('計算團體獎金', team),
+        ('計算個人獎金', individual),
+        ('計算高標達標獎金', high_target),
+        ('計算薪資明細', salaries),
+        ('寫入薪資歷史', record),
+    ]
+
+
+def store_batch_stages(jobs: List[Dict], history: PayrollHistory) -> List[Stage]:
+    """多門店計算的階段:每批門店 (批量 = 執行緒數) 以執行緒池同時跑完整的 calculation_stages,再產生跨門店彙總
+
+    每批是一個階段,取消會在批與批之間生效。context['stores'] 為各門店結果;
+    context['results'] 等欄位取第一家成功的門店,供結果分頁預設顯示。
+    """
+
+    def compute(job):
+        ctx = {}
+        for _, stage in calculation_stages(job['calculator'], job['high_target_amount'], {}, history,
+                                           job['store'], job['period'], job['filename']):
+            stage(ctx)
+        return {'success': True, 'period': ctx['period'], 'results': ctx['results'], 'run_id': ctx['run_id']}
+
+    def batch(chunk):
+        def stores(ctx):
+            # 階段函式是這個腳本裡的閉包,無法送進行程池,改用執行緒池
+            ctx.setdefault('stores', []).extend(compute_stores(chunk, compute, workers, processes=False))
+        return stores
+
+    def summary(ctx):
+        succeeded = [outcome for outcome in ctx['stores'] if outcome['success']]
+        if not succeeded:
+            raise RuntimeError('所有門店計算失敗: ' + '；'.join(
+                f"{outcome['store']}: {outcome['error']}" for outcome in ctx['stores']))
+        ctx['results'], ctx['store'], ctx['period'] = \
+            succeeded[0]['results'], succeeded[0]['store'], succeeded[0]['period']
+        ctx['summary'] = store_summary(ctx['stores'])
+
+    workers = default_workers(len(jobs))
+    chunks = [jobs[start:start + workers] for start in range(0, len(jobs), workers)]
+    return [
+        (f"計算門店: {'、'.join(job['store'] for job in chunk)}", batch(chunk)) for chunk in chunks
+    ] + [('產生跨門店彙總', summary)]
+
+
+@st.fragment(run_every=0.5)
+def calculation_status():
+    """輪詢背景計算的進度;結束後把結果放進 session 並重跑整頁顯示結果"""
+    job = st.session_state.calc_worker.job
+    if job.finished:
+        if job.state == DONE:
+            st.session_state.results = job.context['results']
+            st.session_state.results_store = job.context['store']
+            st.session_state.results_period = job.context['period']
+            st.session_state.store_outcomes = job.context.get('stores')
+            st.session_state.store_summary = job.context.get('summary')
+        st.session_state.applied_job = job
+        st.rerun()
+
+    done, total = job.progress()
+    with st.status(f"正在計算薪資: {job.stage_label or '準備中'} ({done}/{total})", expanded=True) as status:
+        st.progress(done / total)
+        if job.cancel_requested:
+            status.update(label="正在取消計算...")
+        else:
+            st.button("⏹ 取消計算", key='cancel_calculation', on_click=job.cancel)
+
+
+def show_job_outcome(job: CalcJob):
+    """顯示最近一次背景計算的結果狀態"""
+    if job.state == DONE:
+        st.success("🎉 薪資計算完成！請查看下方結果。")
+        if job.context.get('run_id') is not None:
+            st.caption(f"已寫入薪資歷史 (紀錄編號 {job.context['run_id']})")
+        for outcome in job.context.get('stores') or []:
+            if not outcome['success']:
+                st.warning(f"⚠️ {outcome['store']} 計算失敗: {outcome['error']}")
+    elif job.state == FAILED:
+        st.error(f"❌ 計算過程發生錯誤 (「{job.stage_label}」階段): {job.error}")
+    else:
+        done, total = job.progress()
+        st.warning(f"計算已取消 (完成 {done}/{total} 個階段)")
+
+
+def load_store_uploads(files) -> List[Dict]:
+    """多門店上傳:每個檔案存入共用儲存區、檢查版面並載入自己的計算器;同一組檔案在重跑時不重新解析"""
+    ids = [file.file_id for file in files]
+    cached = st.session_state.get('store_uploads')
+    if cached and cached['ids'] == ids:
+        return cached['entries']
+
+    store = get_upload_store()
+    entries = []
+    for file in files:
+        entry = {'name': file.name, 'calculator': None, 'error': None}
+        try:
+            upload = store.put(file.getvalue())
+            problems = store.derived(upload.digest, 'problems', validate_workbook)
+            if problems:
+                entry['error'] = "Excel檔案版面不符: " + "；".join(problems)
+            else:
+                calculator = OnlyBeautySalaryCalculator()
+                if calculator.load_upload(store, upload.digest, file.name):
+                    # 保留 handle:只要這組上傳仍在 session 中,儲存區就不會移除檔案與其衍生結果
+                    entry['calculator'], entry['digest'], entry['upload'] = calculator, upload.digest, upload
+                else:
+                    entry['error'] = f"Excel檔案解析失敗: {calculator.load_error}"
+        except Exception as e:
+            entry['error'] = f"檔案處理錯誤: {e}"
+        entries.append(entry)
+    st.session_state.store_uploads = {'ids': ids, 'entries': entries}
+    return entries
+
+
+def render_store_batch(files):
+    """多門店模式:每個檔案一列參數 (可直接在表格中修改),一次送出平行計算"""
+    if len(files) > MAX_STORES:
+        st.error(f"❌ 一次最多上傳 {MAX_STORES} 家門店的檔案")
+        return
+    with st.spinner('正在解析Excel檔案...'):
+        entries = load_store_uploads(files)
+    for entry in entries:
+        if entry['error']:
+            st.error(f"❌ {entry['name']}: {entry['error']}")
+    ready = [entry for entry in entries if entry['calculator'] is not None]
+    if not ready:
+        return
+    st.success(f"✅ 已載入 {len(ready)} 家門店的檔案")
+
+    st.markdown("---")
+    st.markdown('<div class="step-header">⚙️ 步驟 2: 各門店參數</div>', unsafe_allow_html=True)
+    st.caption("每列一家門店;顧問角色依預設 (店長名稱欄的人為店長,其餘為顧問・階梯)")
+    defaults = pd.DataFrame([{
+        'file': entry['name'],
+        'store': default_store_name(entry['name']),
+        'period': resolve_period(sheet_name=entry['calculator'].sheet_name),
+        'staff_count': 5,
+        'manager_name': '',
+        'high_target': 4000000,
+    } for entry in ready])
+    params = st.data_editor(
+        defaults,
+        key='store_jobs_' + job_key([entry['digest'] for entry in ready])[:12],
+        disabled=['file'],
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            'file': '檔案',
+            'store': st.column_config.TextColumn('門店名稱', required=True),
+            'period': st.column_config.TextColumn('計算期間 (YYYY-MM)', required=True),
+            'staff_count': st.column_config.NumberColumn('美容師/護理師總人數', min_value=1, max_value=50,
+                                                         step=1, required=True),
+            'manager_name': st.column_config.TextColumn('店長名稱'),
+            'high_target': st.column_config.NumberColumn('高標達標金額', min_value=0, step=100000, format="%d"),
+        },
+    )
+
+    st.markdown("---")
+    st.markdown('<div class="step-header">🔢 步驟 3: 開始計算</div>', unsafe_allow_html=True)
+    worker = st.session_state.calc_worker
+    if st.button(f"🚀 計算全部門店 ({len(ready)} 家)", type="primary", use_container_width=True):
+        try:
+            jobs, inputs = [], []
+            for entry, row in zip(ready, params.to_dict(orient='records')):
+                # 每家門店使用自己計算器的副本,依各自的計算期間套用薪資規則
+                calculator = copy.copy(entry['calculator'])
+                calculator.staff_count = int(row['staff_count'])
+                manager = str(row['manager_name'] or '').strip()
+                calculator.manager_name = manager or None
+                high_target = row['high_target']
+                high_target_amount = high_target if high_target and high_target > 0 else None
+                calc_period = resolve_period(str(row['period'] or '').strip() or None, calculator.sheet_name)
+                apply_rules(calculator, load_rules().for_period(calc_period))
+                store = str(row['store'] or '').strip() or default_store_name(entry['name'])
+                jobs.append({'calculator': calculator, 'high_target_amount': high_target_amount, 'store': store,
+                             'period': calc_period, 'filename': entry['name']})
+                inputs.append({'upload': entry['digest'], 'staff_count': calculator.staff_count,
+                               'manager': calculator.manager_name, 'high_target': high_target_amount,
+                               'period': calc_period, 'store': store, 'rules_version': calculator.rules.version})
+            _, started = worker.submit(job_key(inputs), store_batch_stages(jobs, get_history()))
+            if not started:
+                st.info("相同條件的計算已在進行中或已完成,未重複送出")
+        except Exception as e:
+            logger.exception("計算過程發生錯誤")
+            st.error(f"❌ 計算過程發生錯誤: {str(e)}")
+
+    if worker.busy or (worker.job is not None and st.session_state.get('applied_job') is not worker.job):
+        calculation_status()
+    elif worker.job is not None:
+        show_job_outcome(worker.job)
+
+
+def render_store_summary(outcomes: List[Dict], summary: pd.DataFrame) -> Dict:
+    """跨門店彙總表與門店選單;回傳選中門店的結果,供下方分頁顯示明細"""
+    st.markdown("#### 🏬 跨門店彙總")
+    totals = summary_totals(summary)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("門店數", totals['stores'])
+    with col2:
+        st.metric("獎金合計", format_currency(totals['bonus_total']))
+    with col3:
+        st.metric("人事成本合計", format_currency(totals['total_cost']))
+    st.dataframe(with_labels(summary), use_container_width=True, hide_index=True)
+
+    succeeded = [outcome for outcome in outcomes if outcome['success']]
+    index = st.selectbox("查看門店明細", range(len(succeeded)), key='results_store_index',
+                         format_func=lambda i: f"{succeeded[i]['store']} ({succeeded[i]['period']})")
+    return succeeded[min(index or 0, len(succeeded) - 1)]
+
+
+@st.cache_resource
+def get_history() -> PayrollHistory:
+    """整個 Streamlit 程序共用一個薪資歷史資料庫物件"""
+    return PayrollHistory()
+
+
+@st.cache_resource
+def get_upload_store() -> UploadStore:
+    """整個 Streamlit 程序共用的上傳檔儲存區;相同內容的檔案只保存與解析一次"""
+    return UploadStore()
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def cached_consultants(file_digest: str, _calculator: OnlyBeautySalaryCalculator) -> List[Dict]:
+    """同一份上傳檔案 (以內容雜湊識別) 的顧問名單只讀一次 Excel 列,之後的重跑直接取快取"""
+    return _calculator.get_consultants_data()
+
+
+@st.fragment
+def role_config_grid(consultants: List[Dict]):
+    """顧問角色/計算方式選單;變更選項只重跑這個區塊,設定寫入 st.session_state.role_config"""
+    role_config = {}
+    if consultants:
+        for c in consultants:
+            cname = str(c['name']).strip()
+            col_a, col_b, col_c = st.columns([2, 2, 2])
+            with col_a:
+                st.write(cname)
+            with col_b:
+                role = st.selectbox(
+                    "角色", ['顧問', '副店長', '店長'],
+                    index=0,
+                    key=f"role_{cname}"
+                )
+            with col_c:
+                mode = st.selectbox(
+                    "計算方式", ['階梯', '全額'],
+                    index=0,
+                    key=f"mode_{cname}"
+                )
+            role_config[cname] = {'role': role, 'mode': mode}
+    else:
+        st.info("上傳的 Excel 尚未讀到顧問名單。")
+    st.session_state.role_config = role_config
+
+
+# 結果分頁的顯示方式:表格 (每個分頁一個表格,點選列查看明細) 或逐人卡片
+RESULT_VIEWS = ['表格', '逐人卡片']
+
+def table_column_config(labels: Dict[str, str]) -> Dict:
+    """由欄位標題建立 st.dataframe 的 column_config;金額欄位取整數顯示"""
+    config = {}
+    for column, label in labels.items():
+        if column in AMOUNT_COLUMNS or column == 'row':
+            config[column] = st.column_config.NumberColumn(label, format="%d")
+        elif column == 'product_qualified':
+            config[column] = st.column_config.CheckboxColumn(label)
+        else:
+            config[column] = label
+    return config
+
+
+CONSULTANT_COLUMN_CONFIG = table_column_config(CONSULTANT_LABELS)
+SALARY_COLUMN_CONFIG = {
+    **table_column_config(SALARY_LABELS),
+    'separate_total': st.column_config.NumberColumn(SALARY_LABELS['separate_total'], format="%d",
+                                                    help="團體獎金、全勤與高標達標獎金,另行發放"),
+}
+
+
 def format_currency(amount):
     """格式化貨幣顯示"""
     if isinstance(amount, (int, float)):
         return f"NT$ {amount:,.0f}"
     return "NT$ 0"
 
+
+def render_consultant_card(name, data: Dict, individual_data: Dict = None):
+    """單一顧問的獎金明細 (指標卡片)"""
+    st.markdown(f"**{name}**")
+
+    # 第一行：個人業績和消耗
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("個人業績", format_currency(data['personal_performance']))
+    with col2:
+        st.metric("個人消耗", format_currency(data['personal_consumption']))
+    with col3:
+        st.metric("團體業績獎金", format_currency(data['performance_bonus']))
+    with col4:
+        st.metric("團體消耗獎金", format_currency(data['consumption_bonus']))
+
+    # 第二行：個人業績獎金和個人消耗獎金
+    if individual_data:
+        _role = individual_data.get('role', '顧問')
+        _mode = individual_data.get('mode', '階梯')
+        st.markdown(f"#### 個人獎金（{_role}・{_mode}）")
+        col1, col2, col3, col4 = st.columns(4)
+
+        with col1:
+            st.metric("個人業績獎金", format_currency(individual_data['individual_performance_bonus']))
+        with col2:
+            st.metric("個人消耗獎金", format_currency(individual_data['individual_consumption_bonus']))
+        with col3:
+            if individual_data.get('performance_incentive_bonus', 0) > 0:
+                st.metric("業績激勵獎金", format_currency(individual_data['performance_incentive_bonus']))
+        with col4:
+            st.metric("個人獎金小計", format_currency(individual_data['individual_total']))
+
+    total_bonus = data['performance_bonus'] + data['consumption_bonus']
+    st.metric("**團體總獎金**", format_currency(total_bonus))
+
+    if not data.get('product_qualified', True):
+        st.warning("⚠️ 產品未達標，團體獎金已清零")
+
+
+def selected_key(table: pd.DataFrame, event, records: Dict):
+    """表格中被點選的那一列對應到 records 的鍵;沒有點選時回傳 None"""
+    rows = event.selection.rows if event is not None else []
+    if not rows:
+        return None
+    keys = {str(key): key for key in records}
+    return keys.get(table.loc[rows[0], 'name'])
+
+
+@st.fragment
+def render_consultant_tab(results: Dict):
+    """顧問獎金分頁 (獨立重跑,不影響其他分頁)"""
+    st.subheader("顧問獎金明細")
+    if not results['consultant_bonuses']:
+        st.info("無顧問獎金資料")
+        return
+
+    individual_bonuses = results.get('individual_bonuses') or {}
+    if st.session_state.get('results_view', RESULT_VIEWS[0]) == '表格':
+        # 全部顧問放在同一個表格,點選一列才展開該顧問的明細
+        table = consultant_table(results)
+        event = st.dataframe(table, column_config=CONSULTANT_COLUMN_CONFIG, use_container_width=True,
+                             hide_index=True, on_select='rerun', selection_mode='single-row', key='consultant_table')
+        name = selected_key(table, event, results['consultant_bonuses'])
+        if name is None:
+            st.caption("點選表格中的一列查看該顧問的明細")
+        else:
+            with st.container(border=True):
+                render_consultant_card(name, results['consultant_bonuses'][name], individual_bonuses.get(name))
+        return
+
+    for name, data in results['consultant_bonuses'].items():
+        with st.container():
+            render_consultant_card(name, data, individual_bonuses.get(name))
+            st.markdown("---")
+
+
+@st.fragment
+def render_staff_tab(results: Dict):
+    """美容師/護理師團體獎金分頁 (獨立重跑,不影響其他分頁)"""
+    st.subheader("美容師/護理師團體獎金")
+    if results['staff_bonuses']:
+        data = results['staff_bonuses']
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("總人數", f"{data['staff_count']} 人")
+        with col2:
+            st.metric("業績獎金池", format_currency(data['performance_pool']))
+        with col3:
+            st.metric("消耗獎金池", format_currency(data['consumption_pool']))
+
+        st.markdown("### 每人獎金分配")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("每人業績獎金", format_currency(data['performance_bonus_per_person']))
+        with col2:
+            st.metric("每人消耗獎金", format_currency(data['consumption_bonus_per_person']))
+        with col3:
+            st.metric("每人總獎金", format_currency(data['total_bonus_per_person']))
+    else:
+        st.info("無員工獎金資料")
+
+
+def render_salary_card(salary_data: Dict):
+    """單一員工的薪資明細"""
+    position = salary_data['position']
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.write("**基本薪資**")
+        st.write(f"底薪: {format_currency(salary_data['base_salary'])}")
+        if salary_data['hand_skill_bonus'] > 0:
+            st.write(f"手技獎金: {format_currency(salary_data['hand_skill_bonus'])}")
+
+    with col2:
+        st.write("**津貼獎金**")
+        if salary_data['license_allowance'] > 0:
+            st.write(f"執照津貼: {format_currency(salary_data['license_allowance'])}")
+        if salary_data['rank_bonus'] > 0:
+            st.write(f"職等獎金: {format_currency(salary_data['rank_bonus'])}")
+        if salary_data['position_allowance'] > 0:
+            st.write(f"職務津貼: {format_currency(salary_data['position_allowance'])}")
+
+    with col3:
+        st.write("**特殊獎金**")
+        if salary_data.get('consumption_achievement_bonus', 0) > 0:
+            st.write(f"門店業績達標+消耗300萬獎金: {format_currency(salary_data['consumption_achievement_bonus'])}")
+        if salary_data.get('performance_500w_bonus', 0) > 0:
+            st.write(f"業績500萬獎金: {format_currency(salary_data['performance_500w_bonus'])}")
+        if salary_data.get('store_performance_incentive', 0) > 0:
+            st.write(f"門店業績激勵獎金: {format_currency(salary_data['store_performance_incentive'])}")
+
+    st.markdown("---")
+    st.markdown(f"**當月總薪資: {format_currency(salary_data['total_salary'])}**")
+
+    # 不計入當月總薪資的項目
+    if position in ['美容師', '護理師']:
+        separate_items = []
+        if salary_data['team_performance_bonus'] > 0:
+            separate_items.append(f"團體業績獎金: {format_currency(salary_data['team_performance_bonus'])}")
+        if salary_data['team_consumption_bonus'] > 0:
+            separate_items.append(f"團體消耗獎金: {format_currency(salary_data['team_consumption_bonus'])}")
+        if position == '護理師' and salary_data['full_attendance_bonus'] > 0:
+            separate_items.append(f"全勤獎金: {format_currency(salary_data['full_attendance_bonus'])}")
+        if salary_data['high_target_bonus'] > 0:
+            separate_items.append(f"高標達標獎金: {format_currency(salary_data['high_target_bonus'])}")
+
+        if separate_items:
+            st.info("**不計入當月總薪資的項目:**\n" + "\n".join([f"• {item}" for item in separate_items]))
+
+
+@st.fragment
+def render_salary_tab(results: Dict):
+    """個別員工薪資明細分頁 (獨立重跑,不影響其他分頁)"""
+    st.subheader("個別員工薪資明細")
+    salaries = results['individual_staff_salaries']
+    if not salaries:
+        st.info("無薪資明細資料")
+        return
+
+    if st.session_state.get('results_view', RESULT_VIEWS[0]) == '表格':
+        table = salary_table(results)
+        event = st.dataframe(table, column_config=SALARY_COLUMN_CONFIG, use_container_width=True,
+                             hide_index=True, on_select='rerun', selection_mode='single-row', key='salary_table')
+        name = selected_key(table, event, salaries)
+        if name is None:
+            st.caption("點選表格中的一列查看該員工的薪資明細")
+        else:
+            with st.container(border=True):
+                st.markdown(f"### {name} (第{salaries[name]['row']}行)")
+                render_salary_card(salaries[name])
+        return
+
+    # 按職位分組顯示
+    for position in POSITIONS:
+        position_staff = {name: data for name, data in salaries.items() if data['position'] == position}
+        if position_staff:
+            st.markdown(f"### {position}")
+            for name, salary_data in position_staff.items():
+                with st.expander(f"{name} (第{salary_data['row']}行)"):
+                    render_salary_card(salary_data)
+
+
+@st.fragment
+def render_summary_tab(results: Dict):
+    """統計摘要分頁 (獨立重跑,不影響其他分頁)"""
+    st.subheader("統計摘要")
+
+    # 計算總計數據
+    total_consultant_bonus = 0
+    total_consultants = 0
+    if results['consultant_bonuses']:
+        for data in results['consultant_bonuses'].values():
+            total_consultant_bonus += data['performance_bonus'] + data['consumption_bonus']
+            total_consultants += 1
+
+    total_staff_salary = 0
+    total_staff = 0
+    if results['individual_staff_salaries']:
+        for data in results['individual_staff_salaries'].values():
+            total_staff_salary += data['total_salary']
+            total_staff += 1
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.markdown("### 👥 人員統計")
+        st.metric("顧問人數", f"{total_consultants} 人")
+        st.metric("員工人數", f"{total_staff} 人")
+        st.metric("總人數", f"{total_consultants + total_staff} 人")
+
+    with col2:
+        st.markdown("### 💰 金額統計")
+        st.metric("顧問總獎金", format_currency(total_consultant_bonus))
+        st.metric("員工總薪資", format_currency(total_staff_salary))
+        st.metric("**總支出**", format_currency(total_consultant_bonus + total_staff_salary))
+
+    # 產品銷售統計
+    if results['product_bonuses']:
+        st.markdown("### 🛍️ 產品銷售統計")
+        product_data = []
+        for consultant, data in results['product_bonuses'].items():
+            product_data.append({
+                '顧問': consultant,
+                '銷售組數': data['sales_count'],
+                '獎金': format_currency(data['bonus']),
+                '達標狀況': '✅ 達標' if data['qualified'] else '❌ 未達標'
+            })
+
+        if product_data:
+            df = pd.DataFrame(product_data)
+            st.dataframe(df, use_container_width=True)
+
+    unmatched_codes = results.get('unmatched_consultant_codes') or {}
+    if unmatched_codes:
+        st.warning("以下產品明細的顧問代號 (O欄) 對應不到顧問名單,未計入任何顧問的產品達標判斷: "
+                   + '、'.join(f"{code} ({count} 組)" for code, count in unmatched_codes.items()))
+
+
+@st.fragment
+def render_vip_tab(results: Dict):
+    """VIP 項目統計分頁 (獨立重跑,不影響其他分頁)"""
+    st.subheader("VIP 項目統計")
+
+    if results.get('vip_statistics'):
+        vip_stats = results['vip_statistics']
+
+        # 顯示總計
+        total_vip_count = sum(vip_stats.values())
+        st.markdown(f"### 📊 VIP 總數: {total_vip_count}")
+
+        st.markdown("---")
+        st.markdown("### 📋 項目明細")
+
+        # 建立表格資料
+        vip_data = []
+        for item_name, count in sorted(vip_stats.items(), key=lambda x: x[1], reverse=True):
+            vip_data.append({
+                'VIP 項目': item_name,
+                '數量': count
+            })
+
+        if vip_data:
+            df = pd.DataFrame(vip_data)
+            st.dataframe(df, use_container_width=True, hide_index=True)
+
+            # 視覺化圖表
+            st.markdown("---")
+            st.markdown("### 📊 項目分布圖")
+
+            # 使用 Streamlit 內建的條形圖
+            chart_df = df.set_index('VIP 項目')
+            st.bar_chart(chart_df)
+        else:
+            st.info("目前沒有 VIP 項目資料")
+    else:
+        st.info("目前沒有 VIP 項目資料")
+
+
 def main():
     """主應用程式"""
     # 標題
@@ -642,6 +1180,8 @@ def main():
         st.session_state.results = None
     if 'file_uploaded' not in st.session_state:
         st.session_state.file_uploaded = False
+    if 'calc_worker' not in st.session_state:
+        st.session_state.calc_worker = CalcWorker()
 
     # 側邊欄配置
     with st.sidebar:
@@ -656,31 +1196,51 @@ def main():
     # 步驟1: 檔案上傳
     st.markdown('<div class="step-header">📁 步驟 1: 上傳Excel檔案</div>', unsafe_allow_html=True)
 
-    uploaded_file = st.file_uploader(
+    uploaded_files = st.file_uploader(
         "選擇Excel檔案",
-        type=['xlsx', 'xls'],
-        help="請上傳包含薪資資料的Excel檔案"
+        type=['xlsx', 'xls', 'csv', 'parquet', 'zip'],
+        accept_multiple_files=True,
+        help="請上傳包含薪資資料的Excel檔案;也可上傳 POS 匯出的 CSV/Parquet (多張工作表請打包成 zip)。"
+             "一次選擇多家門店的檔案時,各門店平行計算並產生跨門店彙總"
     )
-
-    if uploaded_file is not None:
+    multi_store = len(uploaded_files) > 1
+    uploaded_file = uploaded_files[0] if len(uploaded_files) == 1 else None
+
+    if multi_store:
+        render_store_batch(uploaded_files)
+    elif uploaded_file is not None and uploaded_file.file_id == st.session_state.get('uploaded_file_id') \
+            and st.session_state.file_uploaded:
+        # 同一份檔案在互動重跑時不重新解析
+        st.success(f"✅ 檔案 '{uploaded_file.name}' 上傳成功！")
+    elif uploaded_file is not None:
         try:
-            # 讀取檔案
-            file_bytes = uploaded_file.read()
-
-            with st.spinner('正在解析Excel檔案...'):
-                if st.session_state.calculator.load_excel_from_bytes(file_bytes):
-                    st.session_state.file_uploaded = True
-                    st.session_state.uploaded_file_bytes = file_bytes
-                    st.success(f"✅ 檔案 '{uploaded_file.name}' 上傳成功！")
-                else:
-                    st.error("❌ Excel檔案解析失敗，請檢查檔案格式")
-                    st.session_state.file_uploaded = False
+            # 存入共用儲存區,session 只保留 handle (內容雜湊)
+            store = get_upload_store()
+            upload = store.put(uploaded_file.getvalue())
+
+            # 先快速檢查版面,有問題就不進入完整解析
+            problems = store.derived(upload.digest, 'problems', validate_workbook)
+            if problems:
+                st.error("❌ Excel檔案版面不符:\n" + "\n".join(f"- {p}" for p in problems))
+                st.session_state.file_uploaded = False
+            else:
+                with st.spinner('正在解析Excel檔案...'):
+                    if st.session_state.calculator.load_upload(store, upload.digest, uploaded_file.name):
+                        st.session_state.file_uploaded = True
+                        st.session_state.upload = upload
+                        st.session_state.uploaded_file_name = uploaded_file.name
+                        st.session_state.uploaded_file_id = uploaded_file.file_id
+                        st.session_state.uploaded_file_digest = upload.digest
+                        st.success(f"✅ 檔案 '{uploaded_file.name}' 上傳成功！")
+                    else:
+                        st.error(f"❌ Excel檔案解析失敗，請檢查檔案格式: {st.session_state.calculator.load_error}")
+                        st.session_state.file_uploaded = False
         except Exception as e:
             st.error(f"❌ 檔案處理錯誤: {str(e)}")
             st.session_state.file_uploaded = False
 
     # 步驟2: 基本設定
-    if st.session_state.file_uploaded:
+    if st.session_state.file_uploaded and not multi_store:
         st.markdown("---")
         st.markdown('<div class="step-header">⚙️ 步驟 2: 基本資料設定</div>', unsafe_allow_html=True)
 
@@ -712,334 +1272,209 @@ def main():
                 help="設定高標達標獎金的業績門檻"
             )
 
+        col4, col5 = st.columns(2)
+
+        with col4:
+            store_name = st.text_input(
+                "門店名稱",
+                value=default_store_name(st.session_state.get('uploaded_file_name')),
+                help="寫入薪資歷史時使用,預設為檔名"
+            )
+
+        with col5:
+            period = st.text_input(
+                "計算期間 (YYYY-MM)",
+                value=resolve_period(sheet_name=st.session_state.calculator.sheet_name),
+                help="預設為 YYYYMM 工作表名稱或本月"
+            )
+
         # 步驟 2.5: 顧問角色與計算方式
         st.markdown("---")
         st.markdown('<div class="step-header">🧑‍💼 步驟 3: 顧問角色與計算方式</div>', unsafe_allow_html=True)
         st.caption("預設「顧問・階梯」;「店長名稱」欄填的人會自動設為店長。需要的人改成 店長/副店長 或 全額。")
 
-        consultants = st.session_state.calculator.get_consultants_data()
+        consultants = cached_consultants(st.session_state.get('uploaded_file_digest'), st.session_state.calculator)
         # 「店長名稱」欄位填寫/變更時,將該人預設角色設為店長(之後仍可手動調整)
         _mgr = manager_name.strip() if manager_name else ''
         if _mgr and _mgr != st.session_state.get('_prev_manager_name'):
             st.session_state[f"role_{_mgr}"] = '店長'
             st.session_state['_prev_manager_name'] = _mgr
-        role_config = {}
-        if consultants:
-            for c in consultants:
-                cname = str(c['name']).strip()
-                col_a, col_b, col_c = st.columns([2, 2, 2])
-                with col_a:
-                    st.write(cname)
-                with col_b:
-                    role = st.selectbox(
-                        "角色", ['顧問', '副店長', '店長'],
-                        index=0,
-                        key=f"role_{cname}"
-                    )
+        role_config_grid(consultants)
+        role_config = st.session_state.role_config
+
+        # 月中預測:以目前的日報模擬月底,不影響下方的正式計算
+        with st.expander("🔮 月底獎金預測 (依目前日報模擬)"):
+            try:
+                forecast_period = resolve_period(period.strip() or None, st.session_state.calculator.sheet_name)
+            except ValueError:
+                forecast_period = resolve_period(sheet_name=st.session_state.calculator.sheet_name)
+            col_a, col_b = st.columns(2)
+            with col_a:
+                forecast_days = st.number_input("當月天數", min_value=1, max_value=31,
+                                                value=days_in_period(forecast_period))
+            with col_b:
+                forecast_paths = st.select_slider("模擬路徑數", options=[1000, 2000, 5000, 10000, 20000],
+                                                  value=DEFAULT_PATHS)
+            if st.button("執行預測"):
+                try:
+                    calculator = st.session_state.calculator
+                    calculator.manager_name = manager_name if manager_name else None
+                    apply_rules(calculator, load_rules().for_period(forecast_period))
+                    snapshots = get_upload_store().derived(calculator.upload_digest, 'daily_snapshots',
+                                                           read_daily_snapshots)
+                    product_qualified = project_product_qualified(
+                        calculator.get_product_sales_statistics(), int(snapshots.days[-1]), forecast_days,
+                        calculator.rules.product_target_sets)
+                    st.session_state.forecast = forecast_bonuses(
+                        calculator, snapshots, forecast_days, high_target if high_target > 0 else None,
+                        role_config, product_qualified, paths=forecast_paths)
+                except Exception as e:
+                    logger.exception("月底預測失敗")
+                    st.error(f"月底預測失敗: {e}")
+                    st.session_state.forecast = None
+
+            forecast = st.session_state.get('forecast')
+            if forecast is not None:
+                summary = forecast.store_summary()
+                col_a, col_b, col_c = st.columns(3)
+                for column, field, label in ((col_a, 'performance', '門店業績'), (col_b, 'consumption', '門店消耗')):
+                    data = summary[field]
+                    with column:
+                        st.metric(f"{label} 月底中位數", format_currency(data['p50']),
+                                  delta=format_currency(data['p50'] - data['current']))
+                        st.caption(f"P10 {format_currency(data['p10'])} ~ P90 {format_currency(data['p90'])}")
+                        if data['next_tier'] is not None:
+                            st.caption(f"跨過下一級 ({format_currency(data['next_tier'])}) 機率: "
+                                       f"{data['next_tier_probability']:.0%}")
                 with col_c:
-                    mode = st.selectbox(
-                        "計算方式", ['階梯', '全額'],
-                        index=0,
-                        key=f"mode_{cname}"
-                    )
-                role_config[cname] = {'role': role, 'mode': mode}
-        else:
-            st.info("上傳的 Excel 尚未讀到顧問名單。")
-        st.session_state.role_config = role_config
+                    if 'high_target_probability' in summary:
+                        st.metric("達高標機率", f"{summary['high_target_probability']:.0%}")
+                frame = forecast.consultant_frame()
+                st.dataframe(
+                    frame[['name', 'expected_bonus', 'p10', 'p50', 'p90', 'threshold_probability']].rename(columns={
+                        'name': '顧問', 'expected_bonus': '預期獎金', 'p10': 'P10', 'p50': 'P50', 'p90': 'P90',
+                        'threshold_probability': '業績達168萬機率'}),
+                    use_container_width=True, hide_index=True)
+                st.caption(f"{summary['paths']} 條模擬路徑;產品達標依目前組數的日均進度推估")
+
+        # 距離下一級:以目前數字直接求解,不需模擬
+        with st.expander("🎯 距離下一級 / 門檻的差額"):
+            if st.toggle("計算差額", key="show_tier_gaps"):
+                calculator = st.session_state.calculator
+                calculator.manager_name = manager_name if manager_name else None
+                data = calculator.excel_data
+                totals = [data.iloc[r, 4] if not pd.isna(data.iloc[r, 4]) else 0 for r in (4, 6)]  # E5 / E7
+                gaps = store_gaps(calculator, *totals)
+                col_a, col_b = st.columns(2)
+                for column, field, label in ((col_a, 'performance', '門店業績'), (col_b, 'consumption', '門店消耗')):
+                    with column:
+                        data = gaps[field]
+                        if data['next_tier'] is None:
+                            st.metric(f"{label} 已達最高級距", format_currency(data['amount']))
+                        else:
+                            st.metric(f"{label} 距下一級", format_currency(data['gap']),
+                                      help=f"超過 {format_currency(data['next_tier'])} 後獎金池增加 "
+                                           f"{format_currency(data['pool_gain'])}")
+                try:
+                    frame = consultant_gaps(calculator, consultants, role_config,
+                                            calculator.get_product_sales_statistics())
+                except Exception as e:
+                    st.error(f"統計產品銷售時發生錯誤: {e}")
+                    frame = None
+                if frame is not None:
+                    st.dataframe(
+                        frame[['name', 'role', 'performance', 'performance_gap', 'performance_gain',
+                               'performance_marginal_rate', 'consumption_gap', 'team_gate_gap', 'product_gap']],
+                        column_config={
+                            'name': '顧問', 'role': '角色',
+                            'performance': st.column_config.NumberColumn('個人業績', format="%d"),
+                            'performance_gap': st.column_config.NumberColumn('業績距下一級', format="%d"),
+                            'performance_gain': st.column_config.NumberColumn('達標後獎金增加', format="%d"),
+                            'performance_marginal_rate': st.column_config.NumberColumn('每多 1 元', format="%.3f"),
+                            'consumption_gap': st.column_config.NumberColumn('消耗距下一級', format="%d"),
+                            'team_gate_gap': st.column_config.NumberColumn('距 168 萬門檻', format="%d"),
+                            'product_gap': st.column_config.NumberColumn('產品還差 (組)', format="%d"),
+                        },
+                        use_container_width=True, hide_index=True)
 
         # 步驟3: 開始計算
         st.markdown("---")
         st.markdown('<div class="step-header">🔢 步驟 4: 開始計算</div>', unsafe_allow_html=True)
 
+        worker = st.session_state.calc_worker
         if st.button("🚀 開始計算薪資", type="primary", use_container_width=True):
             try:
-                with st.spinner('正在計算薪資，請稍候...'):
-                    # 設定參數
-                    st.session_state.calculator.staff_count = staff_count
-                    st.session_state.calculator.manager_name = manager_name if manager_name else None
-                    high_target_amount = high_target if high_target > 0 else None
-
-                    # 統計 VIP 項目
-                    with st.status("統計 VIP 項目中...", expanded=True) as status:
-                        vip_statistics = st.session_state.calculator.get_vip_statistics(st.session_state.uploaded_file_bytes)
-                        status.update(label="VIP 項目統計完成!", state="complete")
-
-                    # 統計產品銷售
-                    with st.status("統計產品銷售中...", expanded=True) as status:
-                        product_sales = st.session_state.calculator.get_product_sales_statistics(st.session_state.uploaded_file_bytes)
-                        product_bonuses = st.session_state.calculator.calculate_product_bonus(product_sales)
-                        status.update(label="產品銷售統計完成!", state="complete")
-
-                    # 計算團體獎金
-                    with st.status("計算團體獎金中...", expanded=True) as status:
-                        consultant_bonuses, consultant_performance_pool, consultant_consumption_pool = st.session_state.calculator.calculate_consultant_bonus(product_bonuses)
-                        staff_bonuses = st.session_state.calculator.calculate_staff_bonus(consultant_performance_pool, consultant_consumption_pool)
-                        status.update(label="團體獎金計算完成!", state="complete")
-
-                    # 計算個人獎金
-                    with st.status("計算個人獎金中...", expanded=True) as status:
-                        individual_bonuses = st.session_state.calculator.calculate_individual_bonus(
-                            consultant_bonuses,
-                            high_target_amount,
-                            st.session_state.get('role_config')
-                        )
-                        status.update(label="個人獎金計算完成!", state="complete")
-
-                    # 計算高標達標獎金
-                    with st.status("計算高標達標獎金中...", expanded=True) as status:
-                        high_target_bonuses = {}
-                        if high_target_amount:
-                            high_target_bonuses = st.session_state.calculator.calculate_high_target_bonus(high_target_amount)
-                        status.update(label="高標達標獎金計算完成!", state="complete")
-
-                    # 計算個別員工薪資明細
-                    with st.status("計算薪資明細中...", expanded=True) as status:
-                        individual_staff_salaries = st.session_state.calculator.calculate_individual_staff_salary(high_target_bonuses, staff_bonuses, high_target_amount)
-                        status.update(label="薪資明細計算完成!", state="complete")
-
-                    # 儲存結果
-                    st.session_state.results = {
-                        'consultant_bonuses': consultant_bonuses,
-                        'staff_bonuses': staff_bonuses,
-                        'individual_bonuses': individual_bonuses,
-                        'high_target_bonuses': high_target_bonuses,
-                        'individual_staff_salaries': individual_staff_salaries,
-                        'product_bonuses': product_bonuses,
-                        'vip_statistics': vip_statistics
-                    }
-
-                    st.success("🎉 薪資計算完成！請查看下方結果。")
+                # 背景工作使用計算器的副本,計算期間畫面仍可操作且不會互相影響
+                calculator = copy.copy(st.session_state.calculator)
+                calculator.staff_count = staff_count
+                calculator.manager_name = manager_name if manager_name else None
+                high_target_amount = high_target if high_target > 0 else None
+
+                # 依計算期間套用當時有效的薪資規則
+                calc_period = resolve_period(period.strip() or None, calculator.sheet_name)
+                apply_rules(calculator, load_rules().for_period(calc_period))
+
+                role_config = st.session_state.get('role_config') or {}
+                store = store_name.strip() or default_store_name(None)
+                key = job_key({
+                    'upload': st.session_state.get('uploaded_file_digest'),
+                    'staff_count': staff_count,
+                    'manager': calculator.manager_name,
+                    'high_target': high_target_amount,
+                    'period': calc_period,
+                    'store': store,
+                    'role_config': role_config,
+                    'rules_version': calculator.rules.version,
+                })
+                _, started = worker.submit(key, calculation_stages(
+                    calculator, high_target_amount, role_config, get_history(), store, calc_period,
+                    st.session_state.get('uploaded_file_name')))
+                if not started:
+                    st.info("相同條件的計算已在進行中或已完成,未重複送出")
 
             except Exception as e:
+                logger.exception("計算過程發生錯誤")
                 st.error(f"❌ 計算過程發生錯誤: {str(e)}")
                 st.exception(e)
 
+        if worker.busy or (worker.job is not None and st.session_state.get('applied_job') is not worker.job):
+            calculation_status()
+        elif worker.job is not None:
+            show_job_outcome(worker.job)
+
     # 步驟4: 顯示結果
     if st.session_state.results:
         st.markdown("---")
         st.markdown('<div class="step-header">📊 步驟 5: 計算結果</div>', unsafe_allow_html=True)
 
         results = st.session_state.results
+        store = st.session_state.get('results_store') or default_store_name(None)
+        result_period = st.session_state.get('results_period') or ''
+        outcomes = st.session_state.get('store_outcomes')
+        if outcomes:
+            outcome = render_store_summary(outcomes, st.session_state.store_summary)
+            results, store, result_period = outcome['results'], outcome['store'], outcome['period']
+
+        st.radio("顯示方式", RESULT_VIEWS, horizontal=True, key='results_view',
+                 help="表格模式每個分頁只有一個表格,人數多時較快;點選一列可查看該人的明細")
 
         # 建立分頁
         tab1, tab2, tab3, tab4, tab5 = st.tabs(["👥 顧問獎金", "🏢 員工獎金", "💰 薪資明細", "📈 統計摘要", "💎 VIP 項目統計"])
 
         with tab1:
-            st.subheader("顧問獎金明細")
-            if results['consultant_bonuses']:
-                for name, data in results['consultant_bonuses'].items():
-                    with st.container():
-                        st.markdown(f"**{name}**")
-
-                        # 第一行：個人業績和消耗
-                        col1, col2, col3, col4 = st.columns(4)
-                        with col1:
-                            st.metric("個人業績", format_currency(data['personal_performance']))
-                        with col2:
-                            st.metric("個人消耗", format_currency(data['personal_consumption']))
-                        with col3:
-                            st.metric("團體業績獎金", format_currency(data['performance_bonus']))
-                        with col4:
-                            st.metric("團體消耗獎金", format_currency(data['consumption_bonus']))
-
-                        # 第二行：個人業績獎金和個人消耗獎金
-                        if results.get('individual_bonuses') and name in results['individual_bonuses']:
-                            individual_data = results['individual_bonuses'][name]
-
-                            _role = individual_data.get('role', '顧問')
-                            _mode = individual_data.get('mode', '階梯')
-                            st.markdown(f"#### 個人獎金（{_role}・{_mode}）")
-                            col1, col2, col3, col4 = st.columns(4)
-
-                            with col1:
-                                st.metric("個人業績獎金", format_currency(individual_data['individual_performance_bonus']))
-                            with col2:
-                                st.metric("個人消耗獎金", format_currency(individual_data['individual_consumption_bonus']))
-                            with col3:
-                                if individual_data.get('performance_incentive_bonus', 0) > 0:
-                                    st.metric("業績激勵獎金", format_currency(individual_data['performance_incentive_bonus']))
-                            with col4:
-                                st.metric("個人獎金小計", format_currency(individual_data['individual_total']))
-
-                        total_bonus = data['performance_bonus'] + data['consumption_bonus']
-                        st.metric("**團體總獎金**", format_currency(total_bonus))
-
-                        if not data.get('product_qualified', True):
-                            st.warning("⚠️ 產品未達標，團體獎金已清零")
-
-                        st.markdown("---")
-            else:
-                st.info("無顧問獎金資料")
+            render_consultant_tab(results)
 
         with tab2:
-            st.subheader("美容師/護理師團體獎金")
-            if results['staff_bonuses']:
-                data = results['staff_bonuses']
-
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    st.metric("總人數", f"{data['staff_count']} 人")
-                with col2:
-                    st.metric("業績獎金池", format_currency(data['performance_pool']))
-                with col3:
-                    st.metric("消耗獎金池", format_currency(data['consumption_pool']))
-
-                st.markdown("### 每人獎金分配")
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    st.metric("每人業績獎金", format_currency(data['performance_bonus_per_person']))
-                with col2:
-                    st.metric("每人消耗獎金", format_currency(data['consumption_bonus_per_person']))
-                with col3:
-                    st.metric("每人總獎金", format_currency(data['total_bonus_per_person']))
-            else:
-                st.info("無員工獎金資料")
+            render_staff_tab(results)
 
         with tab3:
-            st.subheader("個別員工薪資明細")
-            if results['individual_staff_salaries']:
-                # 按職位分組顯示
-                positions = ['美容師', '護理師', '櫃檯']
-
-                for position in positions:
-                    position_staff = {name: data for name, data in results['individual_staff_salaries'].items()
-                                    if data['position'] == position}
-
-                    if position_staff:
-                        st.markdown(f"### {position}")
-
-                        for name, salary_data in position_staff.items():
-                            with st.expander(f"{name} (第{salary_data['row']}行)"):
-                                col1, col2, col3 = st.columns(3)
-
-                                with col1:
-                                    st.write("**基本薪資**")
-                                    st.write(f"底薪: {format_currency(salary_data['base_salary'])}")
-                                    if salary_data['hand_skill_bonus'] > 0:
-                                        st.write(f"手技獎金: {format_currency(salary_data['hand_skill_bonus'])}")
-
-                                with col2:
-                                    st.write("**津貼獎金**")
-                                    if salary_data['license_allowance'] > 0:
-                                        st.write(f"執照津貼: {format_currency(salary_data['license_allowance'])}")
-                                    if salary_data['rank_bonus'] > 0:
-                                        st.write(f"職等獎金: {format_currency(salary_data['rank_bonus'])}")
-                                    if salary_data['position_allowance'] > 0:
-                                        st.write(f"職務津貼: {format_currency(salary_data['position_allowance'])}")
-
-                                with col3:
-                                    st.write("**特殊獎金**")
-                                    if salary_data.get('consumption_achievement_bonus', 0) > 0:
-                                        st.write(f"門店業績達標+消耗300萬獎金: {format_currency(salary_data['consumption_achievement_bonus'])}")
-                                    if salary_data.get('performance_500w_bonus', 0) > 0:
-                                        st.write(f"業績500萬獎金: {format_currency(salary_data['performance_500w_bonus'])}")
-                                    if salary_data.get('store_performance_incentive', 0) > 0:
-                                        st.write(f"門店業績激勵獎金: {format_currency(salary_data['store_performance_incentive'])}")
-
-                                st.markdown("---")
-                                st.markdown(f"**當月總薪資: {format_currency(salary_data['total_salary'])}**")
-
-                                # 不計入當月總薪資的項目
-                                if position in ['美容師', '護理師']:
-                                    separate_items = []
-                                    if salary_data['team_performance_bonus'] > 0:
-                                        separate_items.append(f"團體業績獎金: {format_currency(salary_data['team_performance_bonus'])}")
-                                    if salary_data['team_consumption_bonus'] > 0:
-                                        separate_items.append(f"團體消耗獎金: {format_currency(salary_data['team_consumption_bonus'])}")
-                                    if position == '護理師' and salary_data['full_attendance_bonus'] > 0:
-                                        separate_items.append(f"全勤獎金: {format_currency(salary_data['full_attendance_bonus'])}")
-                                    if salary_data['high_target_bonus'] > 0:
-                                        separate_items.append(f"高標達標獎金: {format_currency(salary_data['high_target_bonus'])}")
-
-                                    if separate_items:
-                                        st.info("**不計入當月總薪資的項目:**\n" + "\n".join([f"• {item}" for item in separate_items]))
-            else:
-                st.info("無薪資明細資料")
+            render_salary_tab(results)
 
         with tab4:
-            st.subheader("統計摘要")
-
-            # 計算總計數據
-            total_consultant_bonus = 0
-            total_consultants = 0
-            if results['consultant_bonuses']:
-                for data in results['consultant_bonuses'].values():
-                    total_consultant_bonus += data['performance_bonus'] + data['consumption_bonus']
-                    total_consultants += 1
-
-            total_staff_salary = 0
-            total_staff = 0
-            if results['individual_staff_salaries']:
-                for data in results['individual_staff_salaries'].values():
-                    total_staff_salary += data['total_salary']
-                    total_staff += 1
-
-            col1, col2 = st.columns(2)
-
-            with col1:
-                st.markdown("### 👥 人員統計")
-                st.metric("顧問人數", f"{total_consultants} 人")
-                st.metric("員工人數", f"{total_staff} 人")
-                st.metric("總人數", f"{total_consultants + total_staff} 人")
-
-            with col2:
-                st.markdown("### 💰 金額統計")
-                st.metric("顧問總獎金", format_currency(total_consultant_bonus))
-                st.metric("員工總薪資", format_currency(total_staff_salary))
-                st.metric("**總支出**", format_currency(total_consultant_bonus + total_staff_salary))
-
-            # 產品銷售統計
-            if results['product_bonuses']:
-                st.markdown("### 🛍️ 產品銷售統計")
-                product_data = []
-                for consultant, data in results['product_bonuses'].items():
-                    product_data.append({
-                        '顧問': consultant,
-                        '銷售組數': data['sales_count'],
-                        '獎金': format_currency(data['bonus']),
-                        '達標狀況': '✅ 達標' if data['qualified'] else '❌ 未達標'
-                    })
-
-                if product_data:
-                    df = pd.DataFrame(product_data)
-                    st.dataframe(df, use_container_width=True)
+            render_summary_tab(results)
 
         with tab5:
-            st.subheader("VIP 項目統計")
-
-            if results.get('vip_statistics'):
-                vip_stats = results['vip_statistics']
-
-                # 顯示總計
-                total_vip_count = sum(vip_stats.values())
-                st.markdown(f"### 📊 VIP 總數: {total_vip_count}")
-
-                st.markdown("---")
-                st.markdown("### 📋 項目明細")
-
-                # 建立表格資料
-                vip_data = []
-                for item_name, count in sorted(vip_stats.items(), key=lambda x: x[1], reverse=True):
-                    vip_data.append({
-                        'VIP 項目': item_name,
-                        '數量': count
-                    })
-
-                if vip_data:
-                    df = pd.DataFrame(vip_data)
-                    st.dataframe(df, use_container_width=True, hide_index=True)
-
-                    # 視覺化圖表
-                    st.markdown("---")
-                    st.markdown("### 📊 項目分布圖")
-
-                    # 使用 Streamlit 內建的條形圖
-                    chart_df = df.set_index('VIP 項目')
-                    st.bar_chart(chart_df)
-                else:
-                    st.info("目前沒有 VIP 項目資料")
-            else:
-                st.info("目前沒有 VIP 項目資料")
+            render_vip_tab(results)
 
         # 匯出功能
         st.markdown("---")
@@ -1051,6 +1486,58 @@ def main():
                 file_name="salary_calculation_results.json",
                 mime="application/json"
             )
+        # Excel 以 write-only 模式串流產生,每個區段一張工作表;多門店時所有門店寫入同一本活頁簿
+        if st.button("📊 匯出計算結果 (Excel)", use_container_width=True):
+            batches = [(outcome['store'], outcome['results']) for outcome in outcomes or [] if outcome['success']]
+            st.download_button(
+                label="下載 Excel 檔案",
+                data=payroll_xlsx_bytes(batches or [(store, results)]),
+                file_name="_".join(filter(None, [f"{len(batches)}家門店" if batches else store, result_period,
+                                                 "薪資"])) + ".xlsx",
+                mime=XLSX_MIME
+            )
+        # 每位員工一份薪資單,完成一份就寫入 zip 一份
+        payslip_format = st.radio("薪資單格式", PAYSLIP_FORMATS, horizontal=True, key='payslip_format',
+                                  help="PDF 需安裝 weasyprint")
+        if st.button("🧾 產生個人薪資單 (zip)", use_container_width=True):
+            try:
+                with st.spinner("產生薪資單中..."):
+                    data = payslip_zip_bytes(payslip_records(store, result_period, results), payslip_format)
+                st.download_button(
+                    label="下載薪資單 zip",
+                    data=data,
+                    file_name="_".join(filter(None, [store, result_period, "薪資單"])) + ".zip",
+                    mime="application/zip"
+                )
+            except ValueError as e:
+                st.error(f"❌ {e}")
+
+    # 歷史報表 (只讀薪資歷史的月合計,不需上傳檔案)
+    st.markdown("---")
+    with st.expander("📚 年度 / 年初至今報表"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            report_year = st.number_input("年度", min_value=2000, max_value=2099,
+                                          value=time.localtime().tm_year, step=1, format="%d")
+        with col2:
+            report_through = st.selectbox("期間", ['全年'] + [f"{report_year:04d}-{m:02d} 止" for m in range(1, 13)])
+        with col3:
+            report_kind = st.radio("報表", ['員工獎金', '門店人事成本'], horizontal=True)
+
+        history = get_history()
+        through = None if report_through == '全年' else report_through.split(' ')[0]
+        if report_kind == '門店人事成本':
+            report = store_cost_summary(history, period_from=f"{report_year:04d}-01",
+                                        period_to=through or f"{report_year:04d}-12")
+        elif through:
+            report = year_to_date_report(history, through)
+        else:
+            report = annual_employee_report(history, report_year)
+
+        if report.empty:
+            st.info("這段期間沒有薪資歷史紀錄")
+        else:
+            st.dataframe(with_labels(report), use_container_width=True, hide_index=True)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
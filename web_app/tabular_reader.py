@@ -0,0 +1,258 @@
+"""
+Only Beauty 薪資計算系統 - CSV / Parquet 工作表來源
+
+POS 可以把每天的日報匯出成 CSV (或 Parquet),解析速度比 xlsx 快一個數量級。
+這裡把它們讀成與 Excel 工作表相同的儲存格版面,計算流程 (E5/E7 合計、A9 起的顧問、
+K9:Q15 的員工、第 17 列起的交易明細) 不需任何修改:
+
+    with open_sheets('新竹店_202412.zip') as sheets:    # 每個 CSV/Parquet 檔是一張工作表
+        df = sheets.frame(sheets.latest)
+
+- 單一檔案:一張工作表,名稱取檔名 (不含副檔名),例如 202412.csv → 202412;
+  不符合數字工作表命名時,唯一的工作表即為最新工作表
+- zip 壓縮檔或資料夾:每個 .csv / .parquet 檔一張工作表,名稱同上
+- CSV 沒有標題列,第 1 列就是 Excel 第 1 列;UTF-8 (可含 BOM) 或 Big5 (cp950) 編碼
+- Parquet 欄位名稱為 Excel 欄名 (A、B、…、AA) 時依欄名放置,否則依欄位順序;資料列從第 1 列開始
+
+數字文字 (含千分位逗號) 轉成 int/float,空字串視為空白,與 xlsx 讀出的值型別一致。
+"""
+
+import csv
+import io
+import os
+import re
+import sys
+import zipfile
+from abc import abstractmethod
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from sheet_source import SheetSource
+from workbook_reader import (
+    OLE2_SIGNATURE,
+    WorkbookFormatError,
+    as_file,
+    column_index,
+    read_head,
+    select_latest_sheet,
+)
+
+DEFAULT_SHEET_NAME = 'Sheet1'
+CSV_ENCODINGS = ('utf-8-sig', 'cp950')
+
+ZIP_SIGNATURE = b'PK\x03\x04'
+PARQUET_SIGNATURE = b'PAR1'
+# xlsx 也是 zip,以這個項目區分活頁簿與 CSV/Parquet 壓縮檔
+XLSX_CONTENT_TYPES = '[Content_Types].xml'
+
+# 數字文字 (可含千分位逗號);其餘文字維持原樣
+NUMBER_PATTERN = re.compile(r'[+-]?(?:(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?')
+# 以 0 開頭的數字文字 (顧問代號 007、電話 0912345678) 在 xlsx 裡是文字,維持字串
+LEADING_ZERO_PATTERN = re.compile(r'[+-]?0[\d,]')
+# Excel 數值只有 15 位有效數字,更長的整數 (身分證號、會員編號) 只能以文字保存
+MAX_NUMBER_DIGITS = 15
+COLUMN_NAME_PATTERN = re.compile(r'^[A-Z]{1,3}$')
+
+
+def cell_value(value):
+    """文字儲存格轉成與 xlsx 相同的值:數字轉成 int/float,空字串與缺值為 NaN,其餘維持原樣
+
+    以 0 開頭 (007) 或超過 15 位的整數文字在 xlsx 中是文字儲存格,維持字串才能與 xlsx 讀出的代號一致。
+    """
+    if isinstance(value, str):
+        if not value:
+            return np.nan
+        text = value.strip()
+        if text and text[-1].isdigit() and NUMBER_PATTERN.fullmatch(text) and not LEADING_ZERO_PATTERN.match(text):
+            digits = text.replace(',', '')
+            if digits.lstrip('+-').isdigit():
+                if len(digits.lstrip('+-')) <= MAX_NUMBER_DIGITS:
+                    return int(digits)
+            else:
+                number = float(digits)
+                return int(number) if number.is_integer() else number
+        return sys.intern(value)
+    if value is None or value is pd.NA or value != value:
+        return np.nan
+    return value
+
+
+def to_sheet_frame(rows: List[list]) -> pd.DataFrame:
+    """逐列的儲存格值 → A1 為原點的 DataFrame;去除結尾的空白列與欄,版面與 read_sheet_frame 相同"""
+    used = [max((i + 1 for i, value in enumerate(row) if value == value), default=0) for row in rows]
+    while used and not used[-1]:
+        used.pop()
+    width = max(used, default=0)
+    return pd.DataFrame([row[:width] + [np.nan] * (width - len(row)) for row in rows[:len(used)]])
+
+
+def _decode_csv(data: bytes) -> str:
+    for encoding in CSV_ENCODINGS:
+        try:
+            return data.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    raise WorkbookFormatError(f'CSV 編碼無法辨識 (支援 {"、".join(CSV_ENCODINGS)})')
+
+
+def read_csv_sheet(data: bytes) -> pd.DataFrame:
+    """CSV (無標題列,每列長度可不同) → 工作表 DataFrame"""
+    reader = csv.reader(io.StringIO(_decode_csv(data), newline=''))
+    return to_sheet_frame([[cell_value(value) for value in row] for row in reader])
+
+
+def read_parquet_sheet(data: bytes) -> pd.DataFrame:
+    """Parquet → 工作表 DataFrame;欄位名稱為 Excel 欄名時依欄名放置"""
+    try:
+        table = pd.read_parquet(io.BytesIO(data))
+    except ImportError as e:
+        raise WorkbookFormatError('讀取 Parquet 需要安裝 pyarrow') from e
+    names = [str(name) for name in table.columns]
+    if names and all(COLUMN_NAME_PATTERN.match(name) for name in names):
+        positions = [column_index(name) for name in names]
+    else:
+        positions = list(range(len(names)))
+    width = max(positions, default=-1) + 1
+    rows = [[np.nan] * width for _ in range(len(table))]
+    for i, col in enumerate(positions):
+        for row, value in zip(rows, table.iloc[:, i].tolist()):
+            row[col] = cell_value(value)
+    return to_sheet_frame(rows)
+
+
+def _sheet_name(filename: str) -> str:
+    return os.path.splitext(os.path.basename(filename))[0].strip()
+
+
+def _looks_like_csv(head: bytes) -> bool:
+    """沒有檔名可判斷時:可解碼的純文字且含有欄位分隔逗號才視為 CSV"""
+    if not head or b'\x00' in head or b',' not in head:
+        return False
+    # 開頭片段可能切在多位元組字元中間,忽略最後幾個位元組
+    sample = head[:-4] if len(head) > 4 else head
+    for encoding in CSV_ENCODINGS:
+        try:
+            sample.decode(encoding)
+            return True
+        except UnicodeDecodeError:
+            continue
+    return False
+
+
+class TabularSheets(SheetSource):
+    """一組 CSV/Parquet 檔案組成的工作表來源;每張工作表第一次讀取時才解析並保留在 session 內"""
+
+    EXTENSION = ''
+
+    def __init__(self, source, name: str = None):
+        super().__init__()
+        self._zf: Optional[zipfile.ZipFile] = None
+        self._frames: Dict[str, pd.DataFrame] = {}
+        self._parts: Dict[str, object] = {}
+        if isinstance(source, str) and os.path.isdir(os.path.expanduser(source)):
+            directory = os.path.expanduser(source)
+            for filename in sorted(os.listdir(directory)):
+                if filename.lower().endswith(self.EXTENSION):
+                    self._parts[_sheet_name(filename)] = os.path.join(directory, filename)
+        elif read_head(source, 4) == ZIP_SIGNATURE:
+            self._zf = zipfile.ZipFile(os.path.expanduser(source) if isinstance(source, str) else as_file(source))
+            for info in self._zf.infolist():
+                if not info.is_dir() and info.filename.lower().endswith(self.EXTENSION):
+                    self._parts[_sheet_name(info.filename)] = info
+        else:
+            if name is None and isinstance(source, str):
+                name = source
+            self._parts[_sheet_name(name) if name else DEFAULT_SHEET_NAME] = source
+        self.sheet_names = list(self._parts)
+        self.latest = select_latest_sheet(self.sheet_names)
+        if self.latest is None and len(self.sheet_names) == 1:
+            self.latest = self.sheet_names[0]
+
+    @classmethod
+    def accepts(cls, source) -> bool:
+        """source 是否為本格式的單一檔案、zip 壓縮檔 (不含 xlsx) 或含有本格式檔案的資料夾"""
+        if isinstance(source, str):
+            path = os.path.expanduser(source)
+            if os.path.isdir(path):
+                return any(filename.lower().endswith(cls.EXTENSION) for filename in os.listdir(path))
+            if path.lower().endswith(cls.EXTENSION):
+                return True
+            if not os.path.isfile(path):
+                return False
+        head = read_head(source, 4096)
+        if head.startswith(ZIP_SIGNATURE):
+            try:
+                with zipfile.ZipFile(os.path.expanduser(source) if isinstance(source, str) else as_file(source)) as zf:
+                    names = zf.namelist()
+            except (zipfile.BadZipFile, OSError):
+                return False
+            return XLSX_CONTENT_TYPES not in names and any(n.lower().endswith(cls.EXTENSION) for n in names)
+        return not head.startswith(OLE2_SIGNATURE) and cls.matches_head(head)
+
+    @classmethod
+    @abstractmethod
+    def matches_head(cls, head: bytes) -> bool:
+        """檔案開頭是否為本格式 (不含 zip 壓縮檔)"""
+
+    @staticmethod
+    @abstractmethod
+    def parse(data: bytes) -> pd.DataFrame:
+        """把單一檔案內容解析成工作表 DataFrame"""
+
+    def _read(self, part) -> bytes:
+        if isinstance(part, zipfile.ZipInfo):
+            return self._zf.read(part)
+        if isinstance(part, str):
+            with open(os.path.expanduser(part), 'rb') as fh:
+                return fh.read()
+        if isinstance(part, (bytes, bytearray, memoryview)):
+            return bytes(part)
+        position = part.tell()
+        data = part.read()
+        part.seek(position)
+        return data
+
+    def frame(self, sheet_name: str) -> pd.DataFrame:
+        frame = self._frames.get(sheet_name)
+        if frame is None:
+            try:
+                part = self._parts[sheet_name]
+            except KeyError:
+                raise WorkbookFormatError(f'找不到工作表: {sheet_name}') from None
+            frame = self._frames[sheet_name] = self.parse(self._read(part))
+        return frame
+
+    def close(self):
+        if self._zf is not None:
+            self._zf.close()
+        self._frames.clear()
+
+
+class ParquetSheets(TabularSheets):
+    """Parquet 檔案 (單檔、zip 或資料夾)"""
+
+    EXTENSION = '.parquet'
+
+    @classmethod
+    def matches_head(cls, head: bytes) -> bool:
+        return head.startswith(PARQUET_SIGNATURE)
+
+    @staticmethod
+    def parse(data: bytes) -> pd.DataFrame:
+        return read_parquet_sheet(data)
+
+
+class CsvSheets(TabularSheets):
+    """CSV 檔案 (單檔、zip 或資料夾)"""
+
+    EXTENSION = '.csv'
+
+    @classmethod
+    def matches_head(cls, head: bytes) -> bool:
+        return not head.startswith(PARQUET_SIGNATURE) and _looks_like_csv(head)
+
+    @staticmethod
+    def parse(data: bytes) -> pd.DataFrame:
+        return read_csv_sheet(data)
@@ -0,0 +1,181 @@
+"""
+Only Beauty 薪資計算系統 - 距離下一級的差額
+
+輔導顧問時常需要回答「還差多少業績到下一級?」「還差多少到 168 萬的團體獎金門檻?」
+「產品還差幾組?」。累進制與全額制的級距函數都是分段線性,這裡直接以級距表求解
+(反函數、下一級起點、目前位置的邊際獎金),所有顧問一次以 NumPy 陣列計算:
+
+    frame = consultant_gaps(calculator, calculator.get_consultants_data(), product_sales=sales)
+    store = store_gaps(calculator, total_performance, total_consumption)
+    inverse_progressive([5000, 12000], calculator.consultant_performance_levels)   # 需要的業績
+
+級距判斷與計算器相同:金額「大於」某級下限才適用該級費率 (例如 600001 仍是第一級)。
+"""
+
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from bonus_forecast import full_amount_bonus, individual_levels, progressive_bonus
+
+
+def _table(levels: List[tuple]):
+    mins = np.array([level[0] for level in levels], dtype=float)
+    maxs = np.array([level[1] for level in levels], dtype=float)
+    rates = np.array([level[2] for level in levels], dtype=float)
+    return mins, maxs, rates
+
+
+def tier_index(amounts, levels: List[tuple]) -> np.ndarray:
+    """目前所在級距 (0 起算);低於第一級下限時為 0"""
+    mins = _table(levels)[0]
+    return np.clip(np.searchsorted(mins, np.asarray(amounts, dtype=float), side='left') - 1, 0, None)
+
+
+def tiers_reached(amounts, levels: List[tuple]) -> np.ndarray:
+    """已超過幾個級距下限 (1 = 第一級);0 表示尚未進入任何級距"""
+    mins = _table(levels)[0]
+    return np.searchsorted(mins, np.asarray(amounts, dtype=float), side='left')
+
+
+def next_tier_floors(amounts, levels: List[tuple]) -> np.ndarray:
+    """下一個級距的下限 (金額需大於此值);已在最高級時為 NaN"""
+    mins = _table(levels)[0]
+    position = np.searchsorted(mins, np.asarray(amounts, dtype=float), side='left')
+    floors = np.append(mins, np.nan)
+    return floors[position]
+
+
+def gap_above(amounts, floors) -> np.ndarray:
+    """金額要「大於」floors 所需的最少增加額 (以元為單位);floors 為 NaN 時為 NaN"""
+    amounts = np.asarray(amounts, dtype=float)
+    return np.maximum(np.floor(floors - amounts) + 1, 0)
+
+
+def gap_to_reach(amounts, target: float) -> np.ndarray:
+    """金額要「大於或等於」target 所需的增加額"""
+    return np.maximum(np.ceil(target - np.asarray(amounts, dtype=float)), 0)
+
+
+def progressive_marginal_rate(amounts, levels: List[tuple]) -> np.ndarray:
+    """累進制在目前金額多 1 元可多拿的獎金 (所在級距的費率;級距之間或超過上限為 0)"""
+    mins, maxs, rates = _table(levels)
+    amounts = np.asarray(amounts, dtype=float)[..., None]
+    inside = (amounts >= mins) & (amounts < maxs)
+    return (inside * rates).sum(axis=-1)
+
+
+def full_amount_marginal_rate(amounts, levels: List[tuple]) -> np.ndarray:
+    """全額制在同一級距內多 1 元可多拿的獎金 (跨級時另有整筆重算的跳升)"""
+    return _table(levels)[2][tier_index(amounts, levels)]
+
+
+def inverse_progressive(bonuses, levels: List[tuple]) -> np.ndarray:
+    """累進制的反函數:達到指定獎金所需的最低金額;超過級距表能給的上限時為 NaN"""
+    mins, maxs, rates = _table(levels)
+    bonuses = np.asarray(bonuses, dtype=float)
+    widths = (maxs - mins) * rates
+    ends = np.cumsum(widths)
+    starts = np.concatenate([[0.0], ends[:-1]])
+    position = np.searchsorted(ends, bonuses, side='left')
+    reachable = position < len(levels)
+    position = np.minimum(position, len(levels) - 1)
+    amounts = mins[position] + (bonuses - starts[position]) / rates[position]
+    amounts = np.where(bonuses <= 0, 0.0, amounts)
+    return np.where(reachable, amounts, np.nan)
+
+
+def inverse_full_amount(bonuses, levels: List[tuple]) -> np.ndarray:
+    """全額制的反函數:達到指定獎金所需的最低金額 (以元為單位)
+
+    第 t 級適用於 (下限_t, 下限_t+1],候選金額為 max(獎金 / 費率_t, 下限_t + 1),
+    落在該級範圍內的候選中取最小值。
+    """
+    mins, _, rates = _table(levels)
+    bonuses = np.asarray(bonuses, dtype=float)[..., None]
+    lower = np.concatenate([[0.0], mins[1:] + 1])
+    upper = np.append(mins[1:], np.inf)
+    candidates = np.maximum(np.ceil(bonuses / rates), lower)
+    candidates = np.where(candidates <= upper, candidates, np.inf)
+    amounts = candidates.min(axis=-1)
+    return np.where(np.isinf(amounts), np.nan, amounts)
+
+
+def _tier_gap_columns(prefix: str, amounts: np.ndarray, levels: List[tuple], mode: str) -> Dict[str, np.ndarray]:
+    bonus = full_amount_bonus if mode == '全額' else progressive_bonus
+    marginal = full_amount_marginal_rate if mode == '全額' else progressive_marginal_rate
+    floors = next_tier_floors(amounts, levels)
+    gaps = gap_above(amounts, floors)
+    current = bonus(amounts, levels)
+    return {
+        f'{prefix}_tier': tiers_reached(amounts, levels),
+        f'{prefix}_next_tier': floors,
+        f'{prefix}_gap': gaps,
+        f'{prefix}_gain': bonus(amounts + np.nan_to_num(gaps), levels) - current,
+        f'{prefix}_marginal_rate': marginal(amounts, levels),
+    }
+
+
+def consultant_gaps(calculator, consultants: List[Dict], role_config: Dict = None,
+                    product_sales: Dict[str, int] = None) -> pd.DataFrame:
+    """每位顧問到下一級個人業績/消耗級距、168 萬門檻與 30 組產品的差額
+
+    *_gap 為需要增加的金額,*_gain 為補足差額後個人獎金的增加額,
+    *_marginal_rate 為目前位置每多 1 元的獎金。相同級距表的顧問一起以陣列計算。
+    """
+    role_config = role_config or {}
+    product_sales = product_sales or {}
+    names = [str(c['name']).strip() for c in consultants]
+    settings = [individual_levels(calculator, name, role_config.get(name)) for name in names]
+    groups: Dict[tuple, List[int]] = {}
+    for i, (_, mode, perf_levels, cons_levels) in enumerate(settings):
+        groups.setdefault((id(perf_levels), id(cons_levels), mode), []).append(i)
+
+    performance = np.array([c['performance'] for c in consultants], dtype=float)
+    consumption = np.array([c['consumption'] for c in consultants], dtype=float)
+    columns: Dict[str, np.ndarray] = {}
+    for indices in groups.values():
+        _, mode, perf_levels, cons_levels = settings[indices[0]]
+        rows = np.array(indices)
+        for prefix, amounts, levels in (('performance', performance, perf_levels),
+                                        ('consumption', consumption, cons_levels)):
+            for key, values in _tier_gap_columns(prefix, amounts[rows], levels, mode).items():
+                columns.setdefault(key, np.full(len(names), np.nan))[rows] = values
+    for prefix in ('performance', 'consumption'):
+        if f'{prefix}_tier' in columns:
+            columns[f'{prefix}_tier'] = columns[f'{prefix}_tier'].astype(int)
+
+    sales = np.array([product_sales.get(name, 0) for name in names], dtype=float)
+    return pd.DataFrame({
+        'name': names,
+        'role': [setting[0] for setting in settings],
+        'mode': [setting[1] for setting in settings],
+        'performance': performance,
+        'consumption': consumption,
+        **columns,
+        'team_gate_gap': gap_to_reach(performance, calculator.rules.performance_bonus_gate),
+        'product_sales': sales.astype(int),
+        'product_gap': gap_to_reach(sales, calculator.rules.product_target_sets).astype(int),
+    })
+
+
+def store_gaps(calculator, total_performance: float, total_consumption: float) -> Dict[str, Dict[str, float]]:
+    """門店業績 (E5) / 消耗 (E7) 到下一個團體獎金級距的差額與顧問獎金池的變化"""
+    result = {}
+    for field, amount, levels, pool_rate in (
+            ('performance', total_performance, calculator.performance_bonus_levels,
+             calculator.rules.consultant_performance_share),
+            ('consumption', total_consumption, calculator.consumption_bonus_levels,
+             calculator.rules.consultant_consumption_share)):
+        columns = _tier_gap_columns(field, np.array([amount], dtype=float), levels, '階梯')
+        floor = columns[f'{field}_next_tier'][0]
+        result[field] = {
+            'amount': float(amount),
+            'tier': int(columns[f'{field}_tier'][0]),
+            'next_tier': None if np.isnan(floor) else float(floor),
+            'gap': None if np.isnan(floor) else float(columns[f'{field}_gap'][0]),
+            'pool_gain': float(columns[f'{field}_gain'][0] * pool_rate),
+            'pool_marginal_rate': float(columns[f'{field}_marginal_rate'][0] * pool_rate),
+        }
+    return result
@@ -0,0 +1,227 @@
+"""
+Only Beauty 薪資計算系統 - 交易明細總表
+
+每張工作表第 17 列以下是當日交易明細 (D=VIP 標記, E=項目, F=類別,
+G=金額, O=顧問代號)。這裡一次掃描所有工作表,把明細整理成一張正規化的
+總表,並依顧問代號與類別建立雜湊索引:
+
+    ledger = build_ledger(file_bytes)
+    ledger.product_sales_counts()   # {顧問代號: 購產品組數}
+    ledger.vip_item_counts()        # {項目: VIP 次數}
+    ledger.rows_for_consultant('王小美')
+
+新增的統計只要查索引,不必再掃描一次工作表。
+
+活頁簿每天多一張工作表,月中會反覆上傳重算;每張工作表解析出的明細依
+內容指紋 (工作表 XML 的 CRC/大小 + 用到的共用字串) 快取在行程內,
+重新上傳時只掃描新增或有變動的工作表,其餘直接併入總表。
+"""
+
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import pandas as pd
+
+from salary_log import get_logger
+from sheet_loader import open_sheets
+from sheet_source import SheetSource
+from workbook_reader import column_index
+
+logger = get_logger('ledger')
+
+# 交易明細從第 17 列開始 (index 16)
+LEDGER_FIRST_ROW = 16
+
+# 欄位名稱 → 工作表欄位
+LEDGER_COLUMNS = {
+    'vip_tag': 'D',
+    'item': 'E',
+    'category': 'F',
+    'amount': 'G',
+    'consultant_code': 'O',
+}
+
+PRODUCT_CATEGORY = '購產品'
+VIP_MARKER = 'VIP'
+
+# 跨活頁簿快取的工作表明細數 (約 8 本整月活頁簿)
+SHEET_RECORDS_CACHE_SIZE = 256
+
+_COLUMN_FIELDS = {column_index(column): field for field, column in LEDGER_COLUMNS.items()}
+_WANTED_COLUMNS = frozenset(_COLUMN_FIELDS)
+
+
+class LedgerRecord(NamedTuple):
+    """單筆交易明細;文字欄位已去除前後空白,空白儲存格為 None"""
+    sheet: str
+    row: int
+    vip_tag: Optional[str]
+    item: Optional[str]
+    category: Optional[str]
+    amount: Optional[float]
+    consultant_code: Optional[str]
+
+
+def _text(value) -> Optional[str]:
+    return None if value is None else str(value).strip()
+
+
+def _number(value) -> Optional[float]:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    return None
+
+
+class TransactionLedger:
+    """所有工作表的交易明細,附顧問代號與類別的雜湊索引 (值為 records 的位置)"""
+
+    def __init__(self, records: Iterable[LedgerRecord] = ()):
+        self.records: List[LedgerRecord] = []
+        self.by_consultant: Dict[str, List[int]] = {}
+        self.by_category: Dict[str, List[int]] = {}
+        self.vip_rows: List[int] = []
+        # 本次建立時實際重新掃描的工作表 (其餘沿用快取)
+        self.scanned_sheets: List[str] = []
+        for record in records:
+            self.append(record)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def append(self, record: LedgerRecord):
+        position = len(self.records)
+        self.records.append(record)
+        if record.consultant_code is not None:
+            self.by_consultant.setdefault(record.consultant_code, []).append(position)
+        if record.category is not None:
+            self.by_category.setdefault(record.category, []).append(position)
+        if record.vip_tag is not None and VIP_MARKER in record.vip_tag:
+            self.vip_rows.append(position)
+
+    def rows_for_consultant(self, code: str) -> List[LedgerRecord]:
+        return [self.records[i] for i in self.by_consultant.get(code, ())]
+
+    def rows_for_category(self, category: str) -> List[LedgerRecord]:
+        return [self.records[i] for i in self.by_category.get(category, ())]
+
+    def product_sales_counts(self) -> Dict[str, int]:
+        """每位顧問 (O 欄代號) 的「購產品」組數"""
+        counts: Dict[str, int] = {}
+        for i in self.by_category.get(PRODUCT_CATEGORY, ()):
+            code = self.records[i].consultant_code
+            if code is not None:
+                counts[code] = counts.get(code, 0) + 1
+        return counts
+
+    def vip_item_counts(self) -> Dict[str, int]:
+        """D 欄含 VIP 的明細,依 E 欄項目計次"""
+        counts: Dict[str, int] = {}
+        for i in self.vip_rows:
+            item = self.records[i].item
+            if item is not None:
+                counts[item] = counts.get(item, 0) + 1
+        return counts
+
+    def counts_by_sheet(self, category: str) -> Dict[str, int]:
+        """指定類別在每張工作表的筆數"""
+        return dict(Counter(self.records[i].sheet for i in self.by_category.get(category, ())))
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.records, columns=LedgerRecord._fields)
+
+
+class _SheetEntry(NamedTuple):
+    records: Tuple[LedgerRecord, ...]
+    string_refs: Tuple[Tuple[int, str], ...]
+
+
+_sheet_records_cache: "OrderedDict[tuple, _SheetEntry]" = OrderedDict()
+_sheet_records_lock = threading.Lock()
+
+
+def read_sheet_records(session: SheetSource, sheet_name: str,
+                       string_refs: Dict[int, str] = None) -> List[LedgerRecord]:
+    """串流讀取單張工作表的明細列 (只看 D/E/F/G/O 欄)"""
+    rows: Dict[int, Dict[str, object]] = {}
+    for row, col, value in session.iter_values(sheet_name, LEDGER_FIRST_ROW, _WANTED_COLUMNS, string_refs):
+        rows.setdefault(row, {})[_COLUMN_FIELDS[col]] = value
+    records = []
+    for row in sorted(rows):
+        fields = rows[row]
+        records.append(LedgerRecord(
+            sheet=sheet_name,
+            row=row + 1,
+            vip_tag=_text(fields.get('vip_tag')),
+            item=_text(fields.get('item')),
+            category=_text(fields.get('category')),
+            amount=_number(fields.get('amount')),
+            consultant_code=_text(fields.get('consultant_code')),
+        ))
+    return records
+
+
+def _cache_key(session: SheetSource, sheet_name: str) -> Optional[tuple]:
+    fingerprint = session.sheet_fingerprint(sheet_name)
+    if fingerprint is None:
+        return None
+    return (sheet_name,) + fingerprint + (session.tables.date_styles,)
+
+
+def _cached_records(session: SheetSource, key: tuple) -> Optional[Tuple[LedgerRecord, ...]]:
+    """指紋相同且用到的共用字串都沒變時回傳快取的明細"""
+    with _sheet_records_lock:
+        entry = _sheet_records_cache.get(key)
+        if entry is None:
+            return None
+        _sheet_records_cache.move_to_end(key)
+    strings = session.tables.strings
+    for index, text in entry.string_refs:
+        if index >= len(strings) or strings[index] != text:
+            return None
+    return entry.records
+
+
+def load_sheet_records(session: SheetSource, sheet_name: str) -> Tuple[Tuple[LedgerRecord, ...], bool]:
+    """讀取單張工作表的明細,內容未變動時沿用快取;回傳 (明細, 是否重新掃描)"""
+    key = _cache_key(session, sheet_name)
+    if key is not None:
+        records = _cached_records(session, key)
+        if records is not None:
+            return records, False
+    string_refs: Dict[int, str] = {}
+    records = tuple(read_sheet_records(session, sheet_name, string_refs))
+    if key is not None:
+        with _sheet_records_lock:
+            _sheet_records_cache[key] = _SheetEntry(records, tuple(string_refs.items()))
+            while len(_sheet_records_cache) > SHEET_RECORDS_CACHE_SIZE:
+                _sheet_records_cache.popitem(last=False)
+    return records, True
+
+
+def build_ledger(source) -> TransactionLedger:
+    """一次掃描活頁簿所有工作表建立交易明細總表;source 可為路徑、位元組 (含 memoryview)、檔案物件或已開啟的 SheetSource
+
+    內容未變動的工作表沿用快取的明細,只有新增或變動的工作表會重新解析。
+    無法讀取的工作表會略過並記錄 debug 日誌,與原本逐表統計的行為相同。
+    """
+    if isinstance(source, SheetSource):
+        return _build_from_session(source)
+    with open_sheets(source) as session:
+        return _build_from_session(session)
+
+
+def _build_from_session(session: SheetSource) -> TransactionLedger:
+    ledger = TransactionLedger()
+    for sheet_name in session.sheet_names:
+        try:
+            records, scanned = load_sheet_records(session, sheet_name)
+        except Exception as e:
+            logger.debug("明細總表跳過工作表 %s: %s", sheet_name, e)
+            continue
+        if scanned:
+            ledger.scanned_sheets.append(sheet_name)
+        for record in records:
+            ledger.append(record)
+    logger.debug("明細總表: %d 張工作表,重新掃描 %d 張", len(session.sheet_names), len(ledger.scanned_sheets))
+    return ledger
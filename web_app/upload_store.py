@@ -0,0 +1,165 @@
+"""
+Only Beauty 薪資計算系統 - 共用上傳檔案儲存區
+
+整個程序只保存一份相同內容的上傳檔 (以 SHA-256 為鍵),由它解析出的工作表、
+交易明細總表等結果也一併共用。每個 session 只持有一個 UploadHandle (內含雜湊),
+handle 被回收時參照數自動減一;沒有任何參照的檔案在閒置超過 TTL 或總大小
+超過上限時依最久未使用的順序移除:
+
+    store = UploadStore()
+    handle = store.put(file_bytes)                                  # 相同內容只存一份
+    store.get(handle.digest)                                        # 原始位元組
+    store.derived(handle.digest, 'latest_sheet', load_latest_sheet) # 解析結果同樣共用
+    del handle                                                      # 最後一個參照消失後才可被移除
+
+derived 的結果由所有 session 共用,呼叫端不可修改 (例如 DataFrame 只讀取)。
+"""
+
+import hashlib
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from salary_log import get_logger
+
+logger = get_logger('uploads')
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_TTL = 60 * 60
+
+
+def content_digest(data) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class UploadHandle:
+    """session 對某個上傳檔的參照;只保存雜湊,被回收時自動釋放參照"""
+    __slots__ = ('digest', '__weakref__')
+
+    def __init__(self, digest: str):
+        self.digest = digest
+
+    def __repr__(self):
+        return f'UploadHandle({self.digest[:12]})'
+
+
+class _Entry:
+    __slots__ = ('data', 'refs', 'last_access', 'derived', 'lock')
+
+    def __init__(self, data: bytes, now: float):
+        self.data = data
+        self.refs = 0
+        self.last_access = now
+        self.derived: Dict[str, object] = {}
+        self.lock = threading.Lock()
+
+
+class UploadStore:
+    """以內容雜湊為鍵、具參照計數與 TTL/LRU 移除的上傳檔儲存區 (執行緒安全)"""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, ttl: float = DEFAULT_TTL,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+
+    def put(self, data) -> UploadHandle:
+        """存入上傳檔 (已存在時共用同一份),回傳持有參照的 handle"""
+        data = bytes(data)
+        digest = content_digest(data)
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                entry = self._entries[digest] = _Entry(data, self._clock())
+                self._bytes += len(data)
+                logger.info("新增上傳檔 %s (%d bytes,共 %d 個檔案)", digest[:12], len(data), len(self._entries))
+            handle = self._acquire_locked(digest, entry)
+            self._evict_locked()
+        return handle
+
+    def acquire(self, digest: str) -> UploadHandle:
+        """對已存在的檔案取得新的參照;不存在時拋出 KeyError"""
+        with self._lock:
+            return self._acquire_locked(digest, self._entries[digest])
+
+    def _acquire_locked(self, digest: str, entry: _Entry) -> UploadHandle:
+        entry.refs += 1
+        self._touch_locked(digest, entry)
+        handle = UploadHandle(digest)
+        weakref.finalize(handle, self._release, digest)
+        return handle
+
+    def _touch_locked(self, digest: str, entry: _Entry):
+        entry.last_access = self._clock()
+        self._entries.move_to_end(digest)
+
+    def _release(self, digest: str):
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                entry.refs -= 1
+            self._evict_locked()
+
+    def get(self, digest: str) -> Optional[bytes]:
+        """取得原始位元組;已被移除時回傳 None"""
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            self._touch_locked(digest, entry)
+            return entry.data
+
+    def derived(self, digest: str, name: str, factory: Callable[[bytes], object]):
+        """由檔案內容衍生的結果 (例如解析後的工作表),每個檔案每種結果只計算一次
+
+        同時有多個 session 要求同一結果時,只有一個執行 factory,其餘等待並共用結果。
+        檔案不存在時拋出 KeyError。
+        """
+        with self._lock:
+            entry = self._entries[digest]
+            self._touch_locked(digest, entry)
+        with entry.lock:
+            if name not in entry.derived:
+                entry.derived[name] = factory(entry.data)
+            return entry.derived[name]
+
+    def evict(self) -> int:
+        """立即移除過期或超出容量的未參照檔案,回傳移除數量"""
+        with self._lock:
+            return self._evict_locked()
+
+    def _evict_locked(self) -> int:
+        now = self._clock()
+        removed = 0
+        for digest in list(self._entries):
+            entry = self._entries[digest]
+            expired = now - entry.last_access > self.ttl
+            if entry.refs <= 0 and (expired or self._bytes > self.max_bytes):
+                del self._entries[digest]
+                self._bytes -= len(entry.data)
+                removed += 1
+                logger.info("移除上傳檔 %s (%s)", digest[:12], '逾時' if expired else '超過容量')
+        if self._bytes > self.max_bytes:
+            logger.warning("上傳檔總大小 %d bytes 超過上限,但仍有 session 使用中", self._bytes)
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'references': sum(entry.refs for entry in self._entries.values()),
+            }
+
+    def __contains__(self, digest: str) -> bool:
+        with self._lock:
+            return digest in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
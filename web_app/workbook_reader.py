@@ -0,0 +1,627 @@
+"""
+Only Beauty 薪資計算系統 - 輕量 xlsx 讀取工具
+
+直接解析 xlsx 壓縮檔內的 XML,不經過 openpyxl:
+- workbook.xml + 關聯檔 → 工作表名稱與對應的 XML 檔路徑
+- 工作表以 iterparse 串流讀取,可在指定列數後提前停止
+- 共用字串表只讀到實際需要的索引為止
+
+適合在完整解析前做快速檢查 (例如版面驗證)。需要逐張讀取多張工作表時請用
+WorkbookSession:共用字串與樣式整本只解析一次,每張工作表都以同一份對照表串流讀取。
+
+WorkbookSession 實作 sheet_source.SheetSource 介面;計算流程一律經由 sheet_loader.open_sheets()
+開啟來源,POS 匯出的 CSV / Parquet 由 tabular_reader 讀取,儲存格位置與 Excel 相同。
+
+數字工作表命名規則 (其餘名稱一律不視為日報工作表):
+- 日期:1 ~ 31,不補零 (例: 1、15、31)
+- 年月:YYYYMM,年份 2000 ~ 2099、月份 01 ~ 12 (例: 202412)
+「1.5」、「05」、「2024-12」、「說明」等名稱都不符合。
+排序沿用原本的數值比較,同時有年月與日期工作表時年月工作表優先。
+"""
+
+import io
+import os
+import posixpath
+import re
+import sys
+import threading
+import zipfile
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from salary_log import get_logger
+from sheet_source import SheetSource
+
+logger = get_logger('reader')
+
+# 舊版 .xls (OLE2 複合文件) 的檔頭
+OLE2_SIGNATURE = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+
+REL_OFFICE_DOCUMENT = 'officeDocument'
+REL_SHARED_STRINGS = 'sharedStrings'
+REL_STYLES = 'styles'
+
+# 內建的日期/時間數值格式代碼 (ECMA-376 18.8.30)
+BUILTIN_DATE_FORMATS = frozenset(range(14, 23)) | frozenset(range(45, 48))
+# 自訂格式去除引號字串、跳脫字元與顏色/條件區段後,含有這些字元即視為日期
+DATE_FORMAT_PATTERN = re.compile(r'[dmyhs]', re.IGNORECASE)
+DATE_FORMAT_STRIP = re.compile(r'"[^"]*"|\\.|\[[^\]]*\]')
+EXCEL_EPOCH = datetime(1899, 12, 30)
+
+DAY_SHEET_PATTERN = re.compile(r'^(?:[1-9]|[12][0-9]|3[01])$')
+MONTH_SHEET_PATTERN = re.compile(r'^20[0-9]{2}(?:0[1-9]|1[0-2])$')
+
+# 工作表索引快取的最大筆數
+SHEET_INDEX_CACHE_SIZE = 64
+# 共用字串/樣式對照表快取的最大筆數 (字串表可能很大,保留少量即可)
+SHARED_TABLES_CACHE_SIZE = 8
+
+
+class WorkbookFormatError(ValueError):
+    """檔案不是可讀取的 xlsx 活頁簿"""
+
+
+_local_names: Dict[str, str] = {}
+
+
+def _local(tag: str) -> str:
+    """去除 XML 命名空間,只留標籤名稱 (同時相容 transitional / strict 兩種命名空間)"""
+    name = _local_names.get(tag)
+    if name is None:
+        name = _local_names[tag] = tag.rsplit('}', 1)[-1]
+    return name
+
+
+def column_index(ref: str) -> int:
+    """儲存格位址轉欄號 (從 0 起算),例: 'E5' → 4, 'AA1' → 26"""
+    index = 0
+    for ch in ref:
+        if 'A' <= ch <= 'Z':
+            index = index * 26 + (ord(ch) - 64)
+        elif 'a' <= ch <= 'z':
+            index = index * 26 + (ord(ch) - 96)
+        else:
+            break
+    return index - 1
+
+
+def split_ref(ref: str) -> Tuple[int, int]:
+    """儲存格位址轉 (列, 欄),皆從 0 起算,例: 'E5' → (4, 4)"""
+    digits = ref.lstrip('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz')
+    return int(digits) - 1, column_index(ref)
+
+
+def expand_range(cell_range: str) -> List[str]:
+    """展開儲存格範圍,例: 'K9:L10' → ['K9', 'L9', 'K10', 'L10']"""
+    if ':' not in cell_range:
+        return [cell_range]
+    start, end = cell_range.split(':')
+    start_row, start_col = split_ref(start)
+    end_row, end_col = split_ref(end)
+    refs = []
+    for row in range(start_row, end_row + 1):
+        for col in range(start_col, end_col + 1):
+            refs.append(f'{column_letter(col)}{row + 1}')
+    return refs
+
+
+def column_letter(col: int) -> str:
+    """欄號 (從 0 起算) 轉欄位字母,例: 4 → 'E'"""
+    col += 1
+    letters = ''
+    while col:
+        col, rem = divmod(col - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def read_head(source, size: int) -> bytes:
+    """讀取來源開頭的 size 個位元組;檔案物件讀完後回到原本位置"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source[:size])
+    if isinstance(source, str):
+        with open(os.path.expanduser(source), 'rb') as fh:
+            return fh.read(size)
+    position = source.tell()
+    head = source.read(size)
+    source.seek(position)
+    return head
+
+
+def is_legacy_xls(source) -> bool:
+    """判斷是否為舊版 .xls 檔 (無法以 zip 方式讀取)"""
+    return read_head(source, 8) == OLE2_SIGNATURE
+
+
+class BufferReader(io.RawIOBase):
+    """唯讀、可 seek 的記憶體緩衝區檔案物件;直接讀取 bytearray/memoryview,不複製整份內容"""
+
+    def __init__(self, buffer):
+        self._view = memoryview(buffer).cast('B')
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self._view)}[whence]
+        if base + offset < 0:
+            raise OSError('seek 位置不可為負數')
+        self._pos = base + offset
+        return self._pos
+
+    def read(self, size: int = -1) -> bytes:
+        end = len(self._view) if size is None or size < 0 else min(self._pos + size, len(self._view))
+        data = self._view[self._pos:end].tobytes() if end > self._pos else b''
+        self._pos = max(self._pos, end)
+        return data
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def as_file(source):
+    """記憶體中的活頁簿 → 可 seek 的檔案物件;路徑與檔案物件原樣回傳
+
+    bytes 以 BytesIO 包裝 (CPython 在寫入前共用原緩衝區),bytearray/memoryview 以 BufferReader
+    直接讀取,兩者都不會複製整份上傳檔。
+    """
+    if isinstance(source, bytes):
+        return io.BytesIO(source)
+    if isinstance(source, (bytearray, memoryview)):
+        return BufferReader(source)
+    return source
+
+
+def open_xlsx(source) -> zipfile.ZipFile:
+    """開啟 xlsx 壓縮檔,source 可為路徑、bytes/bytearray/memoryview 或檔案物件 (例如 BytesIO)"""
+    source = as_file(source)
+    if isinstance(source, str):
+        source = os.path.expanduser(source)
+    try:
+        return zipfile.ZipFile(source)
+    except (zipfile.BadZipFile, OSError) as e:
+        raise WorkbookFormatError('不是有效的 Excel (.xlsx) 檔案') from e
+
+
+def _read_relationships(zf: zipfile.ZipFile, rels_path: str, base_dir: str) -> Dict[str, Tuple[str, str]]:
+    """讀取關聯檔,回傳 {rId: (關聯類型, 壓縮檔內完整路徑)}"""
+    relationships = {}
+    if rels_path not in zf.NameToInfo:
+        return relationships
+    root = ET.fromstring(zf.read(rels_path))
+    for rel in root:
+        target = rel.get('Target', '')
+        if rel.get('TargetMode') == 'External':
+            continue
+        if target.startswith('/'):
+            path = target.lstrip('/')
+        else:
+            path = posixpath.normpath(posixpath.join(base_dir, target))
+        rel_type = rel.get('Type', '').rsplit('/', 1)[-1]
+        relationships[rel.get('Id')] = (rel_type, path)
+    return relationships
+
+
+def workbook_part(zf: zipfile.ZipFile) -> str:
+    """找出 workbook.xml 在壓縮檔內的路徑"""
+    for rel_type, path in _read_relationships(zf, '_rels/.rels', '').values():
+        if rel_type == REL_OFFICE_DOCUMENT:
+            return path
+    if 'xl/workbook.xml' in zf.NameToInfo:
+        return 'xl/workbook.xml'
+    raise WorkbookFormatError('Excel 檔案缺少 workbook.xml')
+
+
+def _workbook_rels(zf: zipfile.ZipFile, wb_part: str) -> Dict[str, Tuple[str, str]]:
+    base_dir = posixpath.dirname(wb_part)
+    rels_path = posixpath.join(base_dir, '_rels', posixpath.basename(wb_part) + '.rels')
+    return _read_relationships(zf, rels_path, base_dir)
+
+
+def read_sheet_entries(zf: zipfile.ZipFile) -> List[Tuple[str, str]]:
+    """依活頁簿順序回傳 [(工作表名稱, XML 路徑), ...],只讀 workbook.xml 與其關聯檔"""
+    wb_part = workbook_part(zf)
+    if wb_part not in zf.NameToInfo:
+        raise WorkbookFormatError('Excel 檔案缺少 workbook.xml')
+    rels = _workbook_rels(zf, wb_part)
+    entries = []
+    root = ET.fromstring(zf.read(wb_part))
+    for elem in root.iter():
+        if _local(elem.tag) != 'sheet':
+            continue
+        rel_id = next((value for key, value in elem.attrib.items() if _local(key) == 'id'), None)
+        rel = rels.get(rel_id)
+        # 圖表工作表 (chartsheet) 沒有儲存格資料,略過
+        if rel is None or rel[0] != 'worksheet':
+            continue
+        entries.append((elem.get('name'), rel[1]))
+    return entries
+
+
+def _related_part(zf: zipfile.ZipFile, wanted_type: str) -> str:
+    for rel_type, path in _workbook_rels(zf, workbook_part(zf)).values():
+        if rel_type == wanted_type and path in zf.NameToInfo:
+            return path
+    return None
+
+
+def shared_strings_part(zf: zipfile.ZipFile) -> str:
+    """共用字串表的路徑,沒有時回傳 None"""
+    return _related_part(zf, REL_SHARED_STRINGS)
+
+
+def styles_part(zf: zipfile.ZipFile) -> str:
+    """樣式表的路徑,沒有時回傳 None"""
+    return _related_part(zf, REL_STYLES)
+
+
+def read_shared_strings(zf: zipfile.ZipFile, limit: int = None, part: str = None) -> List[str]:
+    """串流讀取共用字串表;指定 limit 時讀到第 limit 個 (含) 即停止"""
+    part = part or shared_strings_part(zf)
+    strings = []
+    if part is None:
+        return strings
+    with zf.open(part) as fh:
+        for _, elem in ET.iterparse(fh):
+            if _local(elem.tag) != 'si':
+                continue
+            # 重複出現的字串 (顧問代號、類別) 共用同一個物件
+            strings.append(sys.intern(_string_item_text(elem)))
+            elem.clear()
+            if limit is not None and len(strings) > limit:
+                break
+    return strings
+
+
+def _string_item_text(elem) -> str:
+    """組合 <si>/<is> 內所有文字片段 (忽略注音 rPh)"""
+    parts = []
+    for child in elem:
+        tag = _local(child.tag)
+        if tag == 't':
+            parts.append(child.text or '')
+        elif tag == 'r':
+            for run_child in child:
+                if _local(run_child.tag) == 't':
+                    parts.append(run_child.text or '')
+    return ''.join(parts)
+
+
+def is_date_format(num_fmt_id: int, format_code: str = None) -> bool:
+    """判斷數值格式是否為日期/時間"""
+    if num_fmt_id in BUILTIN_DATE_FORMATS:
+        return True
+    if not format_code:
+        return False
+    return bool(DATE_FORMAT_PATTERN.search(DATE_FORMAT_STRIP.sub('', format_code)))
+
+
+def read_date_styles(zf: zipfile.ZipFile, part: str = None) -> FrozenSet[int]:
+    """讀取樣式表,回傳套用日期格式的儲存格樣式索引 (cellXfs 中的位置)"""
+    part = part or styles_part(zf)
+    if part is None:
+        return frozenset()
+    root = ET.fromstring(zf.read(part))
+    custom_formats = {}
+    date_styles = set()
+    for elem in root:
+        tag = _local(elem.tag)
+        if tag == 'numFmts':
+            for fmt in elem:
+                custom_formats[int(fmt.get('numFmtId', -1))] = fmt.get('formatCode', '')
+        elif tag == 'cellXfs':
+            for style_idx, xf in enumerate(elem):
+                num_fmt_id = int(xf.get('numFmtId', 0))
+                if is_date_format(num_fmt_id, custom_formats.get(num_fmt_id)):
+                    date_styles.add(style_idx)
+    return frozenset(date_styles)
+
+
+def iter_sheet_cells(zf: zipfile.ZipFile, part: str, max_row: int = None) -> Iterator[Tuple[int, int, str, str, str]]:
+    """串流讀取工作表儲存格,產生 (列, 欄, 型別, 原始值, 樣式索引),列/欄從 0 起算
+
+    型別沿用 xlsx 的 t 屬性: n=數字, s=共用字串索引, str=公式字串, inlineStr, b=布林, e=錯誤。
+    指定 max_row 時,讀到該列 (不含) 就停止,不必解析整張工作表。
+    """
+    local_names = _local_names
+    with zf.open(part) as fh:
+        # 只處理 end 事件:列號取自儲存格參照 (例如 B17),沒有參照時才依順序推算
+        row_idx = -1
+        col_idx = -1
+        row_started = False
+        for _, elem in ET.iterparse(fh):
+            tag = local_names.get(elem.tag) or _local(elem.tag)
+            if tag == 'c':
+                ref = elem.get('r')
+                if ref:
+                    row_idx, col_idx = split_ref(ref)
+                else:
+                    if not row_started:
+                        row_idx += 1
+                    col_idx += 1
+                row_started = True
+                if max_row is not None and row_idx >= max_row:
+                    return
+                cell_type = elem.get('t', 'n')
+                value = None
+                if cell_type == 'inlineStr':
+                    for child in elem:
+                        if _local(child.tag) == 'is':
+                            value = _string_item_text(child)
+                else:
+                    for child in elem:
+                        if _local(child.tag) == 'v':
+                            value = child.text
+                            break
+                if value is not None:
+                    yield row_idx, col_idx, cell_type, value, elem.get('s')
+                elem.clear()
+            elif tag == 'row':
+                r = elem.get('r')
+                if r:
+                    row_idx = int(r) - 1
+                elif not row_started:
+                    row_idx += 1
+                row_started = False
+                col_idx = -1
+                if max_row is not None and row_idx + 1 >= max_row:
+                    return
+                elem.clear()
+
+
+def convert_value(cell_type: str, raw: str, shared_strings: List[str]):
+    """將原始值轉成 Python 值 (字串、float、bool);錯誤值 (#N/A 等) 視為空白"""
+    if cell_type == 'n':
+        return float(raw)
+    if cell_type == 's':
+        return shared_strings[int(raw)]
+    if cell_type == 'b':
+        return raw == '1'
+    if cell_type == 'e':
+        return None
+    # 行內字串/公式字串也 intern,與共用字串一樣重複值只保留一份
+    return sys.intern(raw)
+
+
+def read_cells(zf: zipfile.ZipFile, part: str, refs: Iterable[str]) -> Dict[str, object]:
+    """只讀取指定儲存格,讀到最大列即停止;不存在或空白的儲存格值為 None"""
+    refs = list(refs)
+    wanted = {split_ref(ref): ref for ref in refs}
+    max_row = max(row for row, _ in wanted) + 1 if wanted else 0
+    raw_values = {}
+    for row, col, cell_type, raw, _ in iter_sheet_cells(zf, part, max_row=max_row):
+        ref = wanted.get((row, col))
+        if ref is not None:
+            raw_values[ref] = (cell_type, raw)
+
+    string_indices = [int(raw) for cell_type, raw in raw_values.values() if cell_type == 's']
+    shared_strings = read_shared_strings(zf, limit=max(string_indices)) if string_indices else []
+
+    values = {ref: None for ref in refs}
+    for ref, (cell_type, raw) in raw_values.items():
+        values[ref] = convert_value(cell_type, raw, shared_strings)
+    return values
+
+
+def sheet_sort_key(name) -> Optional[int]:
+    """符合數字工作表命名規則時回傳排序用數值,否則回傳 None"""
+    if not isinstance(name, str):
+        return None
+    if DAY_SHEET_PATTERN.match(name) or MONTH_SHEET_PATTERN.match(name):
+        return int(name)
+    return None
+
+
+def select_latest_sheet(sheet_names: Iterable[str]) -> Optional[str]:
+    """依命名規則挑出數值最大的工作表名稱 (保留原始名稱),沒有時回傳 None"""
+    best_name, best_key = None, None
+    for name in sheet_names:
+        key = sheet_sort_key(name)
+        if key is not None and (best_key is None or key > best_key):
+            best_name, best_key = name, key
+    return best_name
+
+
+class SheetIndex:
+    """活頁簿的工作表名稱 → XML 路徑對照 (只由 workbook.xml 建立,不開啟任何工作表)"""
+
+    def __init__(self, entries: List[Tuple[str, str]]):
+        self.entries = tuple(entries)
+        self.parts = dict(entries)
+        self.latest = select_latest_sheet(name for name, _ in entries)
+
+    @property
+    def names(self) -> List[str]:
+        return [name for name, _ in self.entries]
+
+    def part(self, name: str) -> str:
+        return self.parts[name]
+
+
+_sheet_index_cache: "OrderedDict[tuple, SheetIndex]" = OrderedDict()
+_sheet_index_lock = threading.Lock()
+
+
+def _metadata_key(zf: zipfile.ZipFile, wb_part: str) -> tuple:
+    """以壓縮目錄中 workbook.xml 與其關聯檔的 CRC/大小當作快取鍵,不需解壓縮"""
+    rels_path = posixpath.join(posixpath.dirname(wb_part), '_rels', posixpath.basename(wb_part) + '.rels')
+    key = []
+    for name in (wb_part, rels_path):
+        info = zf.NameToInfo.get(name)
+        key.append((name, info.CRC, info.file_size) if info else (name, None, None))
+    return tuple(key)
+
+
+def load_sheet_index(zf: zipfile.ZipFile) -> SheetIndex:
+    """取得工作表索引;相同 workbook.xml 內容的檔案會共用快取結果"""
+    wb_part = workbook_part(zf)
+    key = _metadata_key(zf, wb_part)
+    with _sheet_index_lock:
+        index = _sheet_index_cache.get(key)
+        if index is not None:
+            _sheet_index_cache.move_to_end(key)
+            return index
+    index = SheetIndex(read_sheet_entries(zf))
+    with _sheet_index_lock:
+        _sheet_index_cache[key] = index
+        while len(_sheet_index_cache) > SHEET_INDEX_CACHE_SIZE:
+            _sheet_index_cache.popitem(last=False)
+    return index
+
+
+class SharedTables:
+    """整本活頁簿共用的對照表:共用字串 (已 intern 的 tuple) 與日期樣式索引"""
+
+    __slots__ = ('strings', 'date_styles')
+
+    def __init__(self, strings: Iterable[str], date_styles: FrozenSet[int]):
+        self.strings = tuple(strings)
+        self.date_styles = date_styles
+
+
+_shared_tables_cache: "OrderedDict[tuple, SharedTables]" = OrderedDict()
+_shared_tables_lock = threading.Lock()
+
+
+def load_shared_tables(zf: zipfile.ZipFile) -> SharedTables:
+    """解析共用字串與樣式表;內容相同 (壓縮目錄 CRC/大小相同) 的活頁簿共用快取結果"""
+    parts = (shared_strings_part(zf), styles_part(zf))
+    key = tuple((part, zf.NameToInfo[part].CRC, zf.NameToInfo[part].file_size) if part else None
+                for part in parts)
+    with _shared_tables_lock:
+        tables = _shared_tables_cache.get(key)
+        if tables is not None:
+            _shared_tables_cache.move_to_end(key)
+            return tables
+    tables = SharedTables(read_shared_strings(zf, part=parts[0]) if parts[0] else (),
+                          read_date_styles(zf, part=parts[1]) if parts[1] else frozenset())
+    with _shared_tables_lock:
+        _shared_tables_cache[key] = tables
+        while len(_shared_tables_cache) > SHARED_TABLES_CACHE_SIZE:
+            _shared_tables_cache.popitem(last=False)
+    return tables
+
+
+def iter_sheet_values(zf: zipfile.ZipFile, part: str, tables: SharedTables, min_row: int = 0,
+                      columns: FrozenSet[int] = None, string_refs: Dict[int, str] = None,
+                      max_row: int = None) -> Iterator[Tuple[int, int, object]]:
+    """串流產生非空白儲存格 (列, 欄, 值),值的型別與 read_sheet_frame 相同
+
+    min_row 之前的列與 columns 以外的欄直接略過,不做型別轉換;讀到 max_row (不含) 即停止。
+    傳入 string_refs 時,會記錄用到的共用字串 {索引: 字串},供快取驗證使用。
+    """
+    shared_strings = tables.strings
+    date_styles = tables.date_styles
+    for row, col, cell_type, raw, style in iter_sheet_cells(zf, part, max_row=max_row):
+        if row < min_row or (columns is not None and col not in columns):
+            continue
+        value = convert_value(cell_type, raw, shared_strings)
+        if string_refs is not None and cell_type == 's':
+            string_refs[int(raw)] = value
+        if value is None or value == '':
+            continue
+        if isinstance(value, float):
+            if date_styles and style is not None and int(style) in date_styles:
+                value = EXCEL_EPOCH + timedelta(days=value)
+            elif value.is_integer():
+                value = int(value)
+        yield row, col, value
+
+
+def read_sheet_frame(zf: zipfile.ZipFile, part: str, tables: SharedTables = None) -> pd.DataFrame:
+    """將單一工作表讀成與 pd.read_excel(header=None) 相同版面的 DataFrame
+
+    以 A1 為原點,空白儲存格為 NaN,整數值的數字轉成 int,日期格式的數字轉成 datetime。
+    """
+    if tables is None:
+        tables = load_shared_tables(zf)
+    rows: List[list] = []
+    for row, col, value in iter_sheet_values(zf, part, tables):
+        while len(rows) <= row:
+            rows.append([])
+        cells = rows[row]
+        if len(cells) <= col:
+            cells.extend([np.nan] * (col + 1 - len(cells)))
+        cells[col] = value
+    width = max((len(cells) for cells in rows), default=0)
+    return pd.DataFrame([cells + [np.nan] * (width - len(cells)) for cells in rows])
+
+
+class WorkbookSession(SheetSource):
+    """一次開啟活頁簿,供多次讀取工作表使用
+
+    xlsx 的工作表索引、共用字串與樣式只解析一次 (並跨 session 快取),
+    之後每張工作表都串流讀取;舊版 .xls 則共用同一個 pd.ExcelFile。
+    source 可為路徑、bytes/bytearray/memoryview 或檔案物件,記憶體中的來源不另存暫存檔。
+
+        with WorkbookSession(file_bytes) as session:
+            for sheet_name in session.sheet_names:
+                df = session.frame(sheet_name)
+    """
+
+    def __init__(self, source):
+        super().__init__()
+        self._zf = None
+        self._xl_file = None
+        self._tables = None
+        if is_legacy_xls(source):
+            self._xl_file = pd.ExcelFile(as_file(source))
+            self.sheet_names = [str(name) for name in self._xl_file.sheet_names]
+            self.latest = select_latest_sheet(self.sheet_names)
+        else:
+            self._zf = open_xlsx(source)
+            self._index = load_sheet_index(self._zf)
+            self.sheet_names = self._index.names
+            self.latest = self._index.latest
+
+    @property
+    def tables(self) -> SharedTables:
+        """共用字串與樣式對照表 (第一次讀取工作表時才解析)"""
+        if self._tables is None:
+            self._tables = load_shared_tables(self._zf)
+        return self._tables
+
+    def frame(self, sheet_name: str) -> pd.DataFrame:
+        """讀取單一工作表,版面與 pd.read_excel(header=None) 相同"""
+        if self._xl_file is not None:
+            return self._xl_file.parse(sheet_name, header=None)
+        return read_sheet_frame(self._zf, self._index.part(sheet_name), self.tables)
+
+    def sheet_fingerprint(self, sheet_name: str) -> Optional[tuple]:
+        """工作表 XML 的內容指紋 (壓縮目錄中的 CRC 與大小),不需解壓縮;舊版 .xls 回傳 None
+
+        工作表用到的共用字串另存在 sharedStrings.xml,指紋相同時仍須確認那些字串沒有變動。
+        """
+        if self._zf is None:
+            return None
+        info = self._zf.getinfo(self._index.part(sheet_name))
+        return info.CRC, info.file_size
+
+    def iter_values(self, sheet_name: str, min_row: int = 0, columns: FrozenSet[int] = None,
+                    string_refs: Dict[int, str] = None, max_row: int = None) -> Iterator[Tuple[int, int, object]]:
+        """串流產生單一工作表的非空白儲存格 (列, 欄, 值),xlsx 不建立 DataFrame"""
+        if self._xl_file is not None:
+            yield from super().iter_values(sheet_name, min_row, columns, string_refs, max_row)
+            return
+        yield from iter_sheet_values(self._zf, self._index.part(sheet_name), self.tables, min_row, columns,
+                                     string_refs, max_row)
+
+    def close(self):
+        if self._zf is not None:
+            self._zf.close()
+        if self._xl_file is not None:
+            self._xl_file.close()
@@ -0,0 +1,129 @@
+"""
+Only Beauty 薪資計算系統 - Excel 版面預先檢查
+
+在完整解析 (pd.ExcelFile + pd.read_excel) 之前,只讀 workbook.xml 與
+最新數字工作表前 15 列的必要儲存格,幾毫秒內回報所有版面問題。
+"""
+
+from typing import Dict, List
+
+import numpy as np
+
+from sheet_loader import find_sheet_reader
+from workbook_reader import (
+    WorkbookFormatError,
+    expand_range,
+    is_legacy_xls,
+    load_sheet_index,
+    open_xlsx,
+    read_cells,
+    split_ref,
+)
+
+# 必須是數字的儲存格
+NUMERIC_CELLS = {
+    'E5': '當月實際總業績',
+    'E7': '當月總消耗',
+}
+
+# 員工名稱欄 (有填時必須是文字) 與數值欄 (有填時必須是數字)
+STAFF_NAME_COLUMNS = {'K': '美容師名稱', 'N': '美容師名稱', 'Q': '護理師/櫃檯名稱'}
+STAFF_NUMBER_COLUMNS = {'M': '手技獎金', 'O': '底薪', 'P': '手技獎金'}
+STAFF_BLOCK = 'K9:Q15'
+
+CHECKED_REFS = list(NUMERIC_CELLS) + ['A9'] + expand_range(STAFF_BLOCK)
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _is_blank(value) -> bool:
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def validate_workbook(source) -> List[str]:
+    """檢查活頁簿版面,回傳問題清單 (空清單代表可以進行完整計算)
+
+    source 可為檔案路徑、位元組 (含 memoryview) 或檔案物件。舊版 .xls 無法用 zip 方式讀取,不做預先檢查;
+    CSV/Parquet 來源讀出最新工作表後檢查相同的儲存格。
+    """
+    try:
+        reader = find_sheet_reader(source)
+        if reader is not None:
+            return _validate_sheets(reader, source)
+        if is_legacy_xls(source):
+            return []
+        zf = open_xlsx(source)
+    except (WorkbookFormatError, OSError) as e:
+        return [str(e) if isinstance(e, WorkbookFormatError) else f'無法讀取檔案: {e}']
+
+    with zf:
+        try:
+            index = load_sheet_index(zf)
+        except (WorkbookFormatError, KeyError) as e:
+            return [str(e)]
+        except Exception as e:
+            return [f'workbook.xml 格式錯誤: {e}']
+
+        if index.latest is None:
+            names = '、'.join(index.names) or '(無)'
+            return [f'找不到數字名稱的工作表 (例如 1、2、202412),目前工作表: {names}']
+
+        sheet_name = index.latest
+        part = index.part(sheet_name)
+        try:
+            cells = read_cells(zf, part, CHECKED_REFS)
+        except Exception as e:
+            return [f"工作表 '{sheet_name}' 無法讀取: {e}"]
+
+    return _check_cells(sheet_name, cells)
+
+
+def _validate_sheets(reader: type, source) -> List[str]:
+    """CSV/Parquet:讀出最新工作表,由 DataFrame 取出要檢查的儲存格"""
+    with reader(source) as sheets:
+        if sheets.latest is None:
+            names = '、'.join(sheets.sheet_names) or '(無)'
+            return [f'找不到數字名稱的工作表 (例如 1、2、202412),目前工作表: {names}']
+        sheet_name = sheets.latest
+        try:
+            frame = sheets.frame(sheet_name)
+        except Exception as e:
+            return [f"工作表 '{sheet_name}' 無法讀取: {e}"]
+    cells = {}
+    for ref in CHECKED_REFS:
+        row, col = split_ref(ref)
+        value = frame.iat[row, col] if row < frame.shape[0] and col < frame.shape[1] else None
+        if isinstance(value, np.generic):
+            value = value.item()
+        cells[ref] = None if value is None or value != value else value
+    return _check_cells(sheet_name, cells)
+
+
+def _check_cells(sheet_name: str, cells: Dict[str, object]) -> List[str]:
+    problems = []
+    for ref, label in NUMERIC_CELLS.items():
+        value = cells[ref]
+        if _is_blank(value):
+            problems.append(f"工作表 '{sheet_name}' 的 {ref} ({label}) 是空白")
+        elif not _is_number(value):
+            problems.append(f"工作表 '{sheet_name}' 的 {ref} ({label}) 不是數字: {value!r}")
+
+    first_consultant = cells['A9']
+    if _is_blank(first_consultant):
+        problems.append(f"工作表 '{sheet_name}' 的 A9 (第一位顧問名稱) 是空白")
+    elif _is_number(first_consultant):
+        problems.append(f"工作表 '{sheet_name}' 的 A9 (第一位顧問名稱) 應為文字,卻是數字: {first_consultant:g}")
+
+    for ref in expand_range(STAFF_BLOCK):
+        value = cells[ref]
+        if _is_blank(value):
+            continue
+        column = ref.rstrip('0123456789')
+        if column in STAFF_NAME_COLUMNS and _is_number(value):
+            problems.append(f"工作表 '{sheet_name}' 的 {ref} ({STAFF_NAME_COLUMNS[column]}) 應為文字,卻是數字: {value:g}")
+        elif column in STAFF_NUMBER_COLUMNS and not _is_number(value):
+            problems.append(f"工作表 '{sheet_name}' 的 {ref} ({STAFF_NUMBER_COLUMNS[column]}) 不是數字: {value!r}")
+
+    return problems